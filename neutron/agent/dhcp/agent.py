@@ -14,12 +14,14 @@
 #    under the License.
 
 import collections
+import hashlib
 import os
 
 import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
+from oslo_serialization import jsonutils
 from oslo_service import loopingcall
 from oslo_utils import importutils
 
@@ -38,6 +40,36 @@ from neutron import manager
 
 LOG = logging.getLogger(__name__)
 
+SYNC_NETWORKS_MAX_CHUNK_SIZE = 256
+SYNC_NETWORKS_MIN_CHUNK_SIZE = 32
+# Network, subnet and port attributes which change without affecting the
+# configuration of the DHCP server. The 'subnet' key is added to the fixed IPs
+# of the DHCP port by the DeviceManager and is never sent by the server.
+FINGERPRINT_IGNORED_KEYS = frozenset(['status', 'created_at', 'updated_at',
+                                      'subnet', 'revision'])
+# Port binding attributes are not used by the DHCP server either
+FINGERPRINT_IGNORED_PREFIX = 'binding:'
+
+
+def network_fingerprint(network):
+    """Return a digest of the DHCP related state of a network."""
+    def _strip(item):
+        if isinstance(item, (dict, dhcp.CompactModel)):
+            return dict((key, _strip(value)) for key, value in item.items()
+                        if not key.startswith('_') and
+                        not key.startswith(FINGERPRINT_IGNORED_PREFIX) and
+                        key not in FINGERPRINT_IGNORED_KEYS)
+        if isinstance(item, (list, tuple)):
+            return [_strip(value) for value in item]
+        return item
+
+    state = _strip(network)
+    # the server does not guarantee any ordering of subnets and ports
+    for key in ('subnets', 'ports'):
+        state[key] = sorted(state.get(key) or [], key=lambda x: x['id'])
+    data = jsonutils.dumps(state, sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
 
 class DhcpAgent(manager.Manager):
     """DHCP agent service manager.
@@ -61,11 +93,15 @@ class DhcpAgent(manager.Manager):
         # create dhcp dir to store dhcp info
         dhcp_dir = os.path.dirname("/%s/dhcp/" % self.conf.state_path)
         utils.ensure_dir(dhcp_dir)
+        self.sync_networks_chunk_size = SYNC_NETWORKS_MAX_CHUNK_SIZE
         self.dhcp_version = self.dhcp_driver_cls.check_version()
         self._populate_networks_cache()
         # keep track of mappings between networks and routers for
         # metadata processing
         self._metadata_routers = {}  # {network_id: router_id}
+        # Networks whose DHCP server and metadata proxy were set up by this
+        # agent process, and are monitored by its process monitor
+        self._configured_networks = set()
         self._process_monitor = external_process.ProcessMonitor(
             config=self.conf,
             resource_type='dhcp')
@@ -97,19 +133,21 @@ class DhcpAgent(manager.Manager):
         self.sync_state()
         self.periodic_resync()
 
+    def _get_driver(self, network):
+        # the Driver expects something that is duck typed similar to
+        # the base models.
+        return self.dhcp_driver_cls(self.conf,
+                                    network,
+                                    self._process_monitor,
+                                    self.dhcp_version,
+                                    self.plugin_rpc)
+
     def call_driver(self, action, network, **action_kwargs):
         """Invoke an action on a DHCP driver instance."""
         LOG.debug('Calling driver for network: %(net)s action: %(action)s',
                   {'net': network.id, 'action': action})
         try:
-            # the Driver expects something that is duck typed similar to
-            # the base models.
-            driver = self.dhcp_driver_cls(self.conf,
-                                          network,
-                                          self._process_monitor,
-                                          self.dhcp_version,
-                                          self.plugin_rpc)
-            getattr(driver, action)(**action_kwargs)
+            getattr(self._get_driver(network), action)(**action_kwargs)
             return True
         except exceptions.Conflict:
             # No need to resync here, the agent will receive the event related
@@ -151,7 +189,7 @@ class DhcpAgent(manager.Manager):
         known_network_ids = set(self.cache.get_network_ids())
 
         try:
-            active_networks = self.plugin_rpc.get_active_networks_info()
+            active_networks = self._fetch_active_networks()
             LOG.info(_LI('All active networks have been fetched through RPC.'))
             active_network_ids = set(network.id for network in active_networks)
             for deleted_id in known_network_ids - active_network_ids:
@@ -162,11 +200,24 @@ class DhcpAgent(manager.Manager):
                     LOG.exception(_LE('Unable to sync network state on '
                                       'deleted network %s'), deleted_id)
 
+            to_configure = []
             for network in active_networks:
+                if (not only_nets and
+                        not self.conf.resync_unchanged_networks and
+                        self._is_network_configured(network)):
+                    continue
                 if (not only_nets or  # specifically resync all
                         network.id not in known_network_ids or  # missing net
                         network.id in only_nets):  # specific network to sync
-                    pool.spawn(self.safe_configure_dhcp_for_network, network)
+                    to_configure.append(network)
+
+            LOG.info(_LI('%(changed)d of %(total)d active networks need to '
+                         'be configured'),
+                     {'changed': len(to_configure),
+                      'total': len(active_networks)})
+            to_configure.sort(key=self._sync_priority, reverse=True)
+            for network in to_configure:
+                pool.spawn(self.safe_configure_dhcp_for_network, network)
             pool.waitall()
             LOG.info(_LI('Synchronizing state complete'))
 
@@ -178,6 +229,94 @@ class DhcpAgent(manager.Manager):
                 self.schedule_resync(e)
             LOG.exception(_LE('Unable to sync network state.'))
 
+    def _is_network_configured(self, network):
+        """Return whether the DHCP server already serves the network state.
+
+        The DHCP servers found at startup are monitored again, without being
+        restarted, when they were set up with the current network state.
+        """
+        if network.id in self._configured_networks:
+            fingerprint = network_fingerprint(network)
+            if fingerprint != self.cache.get_fingerprint(network.id):
+                return False
+        elif self.cache.get_network_by_id(network.id):
+            fingerprint = network_fingerprint(network)
+            if not self._adopt_network(network, fingerprint):
+                return False
+        else:
+            return False
+        # Only refresh the cached network
+        self.cache.put(network, fingerprint)
+        return True
+
+    def _adopt_network(self, network, fingerprint):
+        """Monitor the DHCP server found running for a network at startup."""
+        if not network.admin_state_up:
+            return False
+        try:
+            if not self._get_driver(network).adopt(fingerprint):
+                return False
+        except Exception:
+            LOG.exception(_LE('Unable to adopt the DHCP server of network '
+                              '%s.'), network.id)
+            return False
+        LOG.debug('Monitoring the DHCP server running for network %s',
+                  network.id)
+        self._configured_networks.add(network.id)
+        self._configure_metadata_proxy(network, True)
+        return True
+
+    def _fetch_active_networks(self):
+        """Fetch the info of the active networks in bounded chunks."""
+        network_ids = list(self.plugin_rpc.get_active_networks())
+        networks = []
+        try:
+            # fetch networks by chunks to reduce the load on server and the
+            # size of each RPC reply
+            for i in range(0, len(network_ids),
+                           self.sync_networks_chunk_size):
+                networks.extend(self.plugin_rpc.get_active_networks_info(
+                    network_ids[i:i + self.sync_networks_chunk_size]))
+        except oslo_messaging.RemoteError as e:
+            if e.exc_type != 'UnsupportedVersion':
+                raise
+            LOG.warning(_LW('Neutron server does not support fetching the '
+                            'info of a subset of the networks, all the '
+                            'networks will be fetched at once. Detail '
+                            'message: %s'), e)
+            return self.plugin_rpc.get_active_networks_info()
+        except oslo_messaging.MessagingTimeout:
+            if self.sync_networks_chunk_size > SYNC_NETWORKS_MIN_CHUNK_SIZE:
+                self.sync_networks_chunk_size = max(
+                    self.sync_networks_chunk_size // 2,
+                    SYNC_NETWORKS_MIN_CHUNK_SIZE)
+                LOG.error(_LE('Server failed to return info for networks in '
+                              'required time, decreasing chunk size to: %s'),
+                          self.sync_networks_chunk_size)
+            else:
+                LOG.error(_LE('Server failed to return info for networks in '
+                              'required time even with min chunk size: %s. '
+                              'It might be under very high load or '
+                              'just inoperable'),
+                          self.sync_networks_chunk_size)
+            raise
+
+        # adjust chunk size after successful sync
+        if self.sync_networks_chunk_size < SYNC_NETWORKS_MAX_CHUNK_SIZE:
+            self.sync_networks_chunk_size = min(
+                self.sync_networks_chunk_size + SYNC_NETWORKS_MIN_CHUNK_SIZE,
+                SYNC_NETWORKS_MAX_CHUNK_SIZE)
+        return networks
+
+    @staticmethod
+    def _sync_priority(network):
+        """Sort key configuring the networks with the most recently updated
+        ports first, and then the networks with the most ports.
+        """
+        last_update = max([port.get('updated_at') or ''
+                           for port in network.ports] or [''])
+        return last_update, len(network.ports)
+
     @utils.exception_logger()
     def _periodic_resync_helper(self):
         """Resync the dhcp state at the configured interval."""
@@ -199,9 +338,22 @@ class DhcpAgent(manager.Manager):
         """Spawn a thread to periodically resync the dhcp state."""
         eventlet.spawn(self._periodic_resync_helper)
 
-    def safe_get_network_info(self, network_id):
+    def safe_get_network_info(self, network_id, cached_network=None):
+        """Fetch the info of a network.
+
+        When the cached copy of the network carries a revision, only the
+        ports changed since that revision are fetched.
+        """
         try:
-            network = self.plugin_rpc.get_network_info(network_id)
+            network = None
+            revision = cached_network and cached_network.get('revision')
+            if revision is not None:
+                network = self._merge_network_changes(
+                    cached_network,
+                    self.plugin_rpc.get_network_info_since(network_id,
+                                                           revision))
+            if network is None:
+                network = self.plugin_rpc.get_network_info(network_id)
             if not network:
                 LOG.debug('Network %s has been deleted.', network_id)
             return network
@@ -209,6 +361,27 @@ class DhcpAgent(manager.Manager):
             self.schedule_resync(e, network_id)
             LOG.exception(_LE('Network %s info call failed.'), network_id)
 
+    @staticmethod
+    def _merge_network_changes(cached_network, network):
+        """Complete the changed ports of a network with the cached ones.
+
+        Returns None when the network has to be fetched as a whole.
+        """
+        if not network or 'port_ids' not in network:
+            return network
+        changed_ports = dict((port.id, port) for port in network.ports)
+        cached_ports = dict((port.id, port) for port in cached_network.ports)
+        ports = []
+        for port_id in network.port_ids:
+            port = changed_ports.get(port_id) or cached_ports.get(port_id)
+            if port is None:
+                # created after the changes were listed
+                return
+            ports.append(port)
+        network.ports = ports
+        del network.port_ids
+        return network
+
     def enable_dhcp_helper(self, network_id):
         """Enable DHCP for a network that meets enabling criteria."""
         network = self.safe_get_network_info(network_id)
@@ -231,8 +404,6 @@ class DhcpAgent(manager.Manager):
         if not network.admin_state_up:
             return
 
-        enable_metadata = self.dhcp_driver_cls.should_enable_metadata(
-                self.conf, network)
         dhcp_network_enabled = False
 
         for subnet in network.subnets:
@@ -240,8 +411,17 @@ class DhcpAgent(manager.Manager):
                 if self.call_driver('enable', network):
                     dhcp_network_enabled = True
                     self.cache.put(network)
+                    self._configured_networks.add(network.id)
+                    self.call_driver(
+                        'save_fingerprint', network,
+                        fingerprint=self.cache.get_fingerprint(network.id))
                 break
 
+        self._configure_metadata_proxy(network, dhcp_network_enabled)
+
+    def _configure_metadata_proxy(self, network, dhcp_network_enabled):
+        enable_metadata = self.dhcp_driver_cls.should_enable_metadata(
+                self.conf, network)
         if enable_metadata and dhcp_network_enabled:
             for subnet in network.subnets:
                 if subnet.ip_version == 4 and subnet.enable_dhcp:
@@ -266,6 +446,7 @@ class DhcpAgent(manager.Manager):
                 self.disable_isolated_metadata_proxy(network)
             if self.call_driver('disable', network):
                 self.cache.remove(network)
+                self._configured_networks.discard(network_id)
 
     def refresh_dhcp_helper(self, network_id):
         """Refresh or disable DHCP for a network depending on the current state
@@ -276,7 +457,7 @@ class DhcpAgent(manager.Manager):
             # DHCP current not running for network.
             return self.enable_dhcp_helper(network_id)
 
-        network = self.safe_get_network_info(network_id)
+        network = self.safe_get_network_info(network_id, old_network)
         if not network:
             return
 
@@ -332,7 +513,7 @@ class DhcpAgent(manager.Manager):
     @utils.synchronized('dhcp-agent')
     def port_update_end(self, context, payload):
         """Handle the port.update.end notification event."""
-        updated_port = dhcp.DictModel(payload['port'])
+        updated_port = dhcp.PortModel(payload['port'])
         network = self.cache.get_network_by_id(updated_port.network_id)
         if network:
             LOG.info(_LI("Trigger reload_allocations for port %s"),
@@ -420,6 +601,8 @@ class DhcpPluginApi(object):
         1.0 - Initial version.
         1.1 - Added get_active_networks_info, create_dhcp_port,
               and update_dhcp_port methods.
+        1.4 - Added network_ids to get_active_networks_info.
+        1.5 - Added get_network_info_since.
 
     """
 
@@ -432,11 +615,25 @@ class DhcpPluginApi(object):
                 version='1.0')
         self.client = n_rpc.get_client(target)
 
-    def get_active_networks_info(self):
-        """Make a remote process call to retrieve all network info."""
-        cctxt = self.client.prepare(version='1.1')
-        networks = cctxt.call(self.context, 'get_active_networks_info',
-                              host=self.host)
+    def get_active_networks(self):
+        """Make a remote process call to retrieve the active network ids."""
+        cctxt = self.client.prepare()
+        return cctxt.call(self.context, 'get_active_networks', host=self.host)
+
+    def get_active_networks_info(self, network_ids=None):
+        """Make a remote process call to retrieve network info.
+
+        All the active networks are returned unless network_ids restricts
+        the reply to a subset of them.
+        """
+        if network_ids is None:
+            cctxt = self.client.prepare(version='1.1')
+            networks = cctxt.call(self.context, 'get_active_networks_info',
+                                  host=self.host)
+        else:
+            cctxt = self.client.prepare(version='1.4')
+            networks = cctxt.call(self.context, 'get_active_networks_info',
+                                  host=self.host, network_ids=network_ids)
         return [dhcp.NetModel(n) for n in networks]
 
     def get_network_info(self, network_id):
@@ -447,6 +644,15 @@ class DhcpPluginApi(object):
         if network:
             return dhcp.NetModel(network)
 
+    def get_network_info_since(self, network_id, revision):
+        """Make a remote process call to retrieve network changes."""
+        cctxt = self.client.prepare(version='1.5')
+        network = cctxt.call(self.context, 'get_network_info_since',
+                             network_id=network_id, revision=revision,
+                             host=self.host)
+        if network:
+            return dhcp.NetModel(network)
+
     def create_dhcp_port(self, port):
         """Make a remote process call to create the dhcp port."""
         cctxt = self.client.prepare(version='1.1')
@@ -477,6 +683,13 @@ class NetworkCache(object):
         self.cache = {}
         self.subnet_lookup = {}
         self.port_lookup = {}
+        self.fingerprints = {}
+        # Indexes of the cached ports, so that lookups don't need to scan
+        # the ports of a network. MAC addresses are only unique within a
+        # network.
+        self.port_index = {}
+        self.mac_lookup = {}
+        self.device_lookup = collections.defaultdict(set)
 
     def get_network_ids(self):
         return self.cache.keys()
@@ -490,26 +703,64 @@ class NetworkCache(object):
     def get_network_by_port_id(self, port_id):
         return self.cache.get(self.port_lookup.get(port_id))
 
-    def put(self, network):
+    def get_fingerprint(self, network_id):
+        """Return the fingerprint of a cached network, or None if unknown."""
+        if network_id not in self.cache:
+            return
+        if network_id not in self.fingerprints:
+            self.fingerprints[network_id] = network_fingerprint(
+                self.cache[network_id])
+        return self.fingerprints[network_id]
+
+    def _index_port(self, network_id, port):
+        self.port_lookup[port.id] = network_id
+        self.port_index[port.id] = port
+        mac_address = port.get('mac_address')
+        if mac_address:
+            self.mac_lookup[(network_id, mac_address.lower())] = port.id
+        device_id = port.get('device_id')
+        if device_id:
+            self.device_lookup[device_id].add(port.id)
+
+    def _unindex_port(self, port_id):
+        network_id = self.port_lookup.pop(port_id, None)
+        port = self.port_index.pop(port_id, None)
+        if port is None:
+            return
+        mac_address = port.get('mac_address')
+        if mac_address:
+            key = (network_id, mac_address.lower())
+            if self.mac_lookup.get(key) == port_id:
+                del self.mac_lookup[key]
+        device_id = port.get('device_id')
+        if device_id in self.device_lookup:
+            self.device_lookup[device_id].discard(port_id)
+            if not self.device_lookup[device_id]:
+                del self.device_lookup[device_id]
+
+    def put(self, network, fingerprint=None):
         if network.id in self.cache:
             self.remove(self.cache[network.id])
 
         self.cache[network.id] = network
+        if fingerprint:
+            self.fingerprints[network.id] = fingerprint
 
         for subnet in network.subnets:
             self.subnet_lookup[subnet.id] = network.id
 
         for port in network.ports:
-            self.port_lookup[port.id] = network.id
+            self._index_port(network.id, port)
 
     def remove(self, network):
         del self.cache[network.id]
+        self.fingerprints.pop(network.id, None)
 
         for subnet in network.subnets:
             del self.subnet_lookup[subnet.id]
 
         for port in network.ports:
-            del self.port_lookup[port.id]
+            self._unindex_port(port.id)
 
     def put_port(self, port):
         network = self.get_network_by_id(port.network_id)
@@ -520,23 +771,30 @@ class NetworkCache(object):
         else:
             network.ports.append(port)
 
-        self.port_lookup[port.id] = network.id
+        self._unindex_port(port.id)
+        self._index_port(network.id, port)
+        self.fingerprints.pop(network.id, None)
 
     def remove_port(self, port):
         network = self.get_network_by_port_id(port.id)
 
         for index in range(len(network.ports)):
-            if network.ports[index] == port:
+            if network.ports[index].id == port.id:
                 del network.ports[index]
-                del self.port_lookup[port.id]
+                self._unindex_port(port.id)
+                self.fingerprints.pop(network.id, None)
                 break
 
     def get_port_by_id(self, port_id):
-        network = self.get_network_by_port_id(port_id)
-        if network:
-            for port in network.ports:
-                if port.id == port_id:
-                    return port
+        return self.port_index.get(port_id)
+
+    def get_port_by_mac(self, network_id, mac_address):
+        return self.port_index.get(
+            self.mac_lookup.get((network_id, mac_address.lower())))
+
+    def get_ports_by_device_id(self, device_id):
+        return [self.port_index[port_id]
+                for port_id in self.device_lookup.get(device_id, ())]
 
     def get_state(self):
         net_ids = self.get_network_ids()
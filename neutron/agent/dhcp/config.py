@@ -56,7 +56,15 @@ DHCP_AGENT_OPTS = [
     cfg.IntOpt('num_sync_threads', default=4,
                help=_('Number of threads to use during sync process. '
                       'Should not exceed connection pool size configured on '
-                      'server.'))
+                      'server.')),
+    cfg.BoolOpt('resync_unchanged_networks', default=False,
+                help=_("Reconfigure every network during a full state "
+                       "synchronization, even when its DHCP related state "
+                       "has not changed since it was last configured. By "
+                       "default only new and changed networks are "
+                       "reconfigured, and the DHCP servers found running "
+                       "at start with an unchanged state are monitored "
+                       "without being restarted.")),
 ]
 
 DHCP_OPTS = [
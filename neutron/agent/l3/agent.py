@@ -68,6 +68,8 @@ EXTERNAL_DEV_PREFIX = namespaces.EXTERNAL_DEV_PREFIX
 # Needed to reduce load on server side and to speed up resync on agent side.
 SYNC_ROUTERS_MAX_CHUNK_SIZE = 256
 SYNC_ROUTERS_MIN_CHUNK_SIZE = 32
+# Number of chunks of routers fetched from server in parallel on resync.
+SYNC_ROUTERS_CONCURRENCY = 4
 
 
 class L3PluginApi(object):
@@ -89,15 +91,35 @@ class L3PluginApi(object):
               - delete_agent_gateway_port
         1.8 - Added address scope information
         1.9 - Added get_router_ids
+        1.10 - Added router_revisions to sync_routers
     """
 
     def __init__(self, topic, host):
         self.host = host
         target = oslo_messaging.Target(topic=topic, version='1.0')
         self.client = n_rpc.get_client(target)
+        self.router_revisions_supported = True
 
-    def get_routers(self, context, router_ids=None):
-        """Make a remote process call to retrieve the sync data for routers."""
+    def get_routers(self, context, router_ids=None, router_revisions=None):
+        """Make a remote process call to retrieve the sync data for routers.
+
+        When router_revisions is given, the routers are returned with their
+        revision, and the routers whose revision is unchanged are returned
+        with their id and revision only.
+        """
+        if router_revisions is not None and self.router_revisions_supported:
+            cctxt = self.client.prepare(version='1.10')
+            try:
+                return cctxt.call(context, 'sync_routers', host=self.host,
+                                  router_ids=router_ids,
+                                  router_revisions=router_revisions)
+            except oslo_messaging.RemoteError as e:
+                if e.exc_type != 'UnsupportedVersion':
+                    raise
+                LOG.warning(_LW('Neutron server does not support router '
+                                'revisions, routers will be fetched '
+                                'without them. Detail message: %s'), e)
+                self.router_revisions_supported = False
         cctxt = self.client.prepare()
         return cctxt.call(context, 'sync_routers', host=self.host,
                           router_ids=router_ids)
@@ -200,6 +222,8 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
         self.plugin_rpc = L3PluginApi(topics.L3PLUGIN, host)
         self.fullsync = True
         self.sync_routers_chunk_size = SYNC_ROUTERS_MAX_CHUNK_SIZE
+        # Revisions of the routers successfully processed by the agent
+        self._router_revisions = {}
 
         # Get the list of service plugins from Neutron Server
         # This is the first place where we contact neutron-server on startup
@@ -372,6 +396,7 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
 
         ri.delete(self)
         del self.router_info[router_id]
+        self._router_revisions.pop(router_id, None)
 
         registry.notify(resources.ROUTER, events.AFTER_DELETE, self, router=ri)
 
@@ -469,8 +494,8 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
             if update.action != queue.DELETE_ROUTER and not router:
                 try:
                     update.timestamp = timeutils.utcnow()
-                    routers = self.plugin_rpc.get_routers(self.context,
-                                                          [update.id])
+                    routers = self.plugin_rpc.get_routers(
+                        self.context, [update.id], router_revisions={})
                 except Exception:
                     msg = _LE("Failed to fetch router information for '%s'")
                     LOG.exception(msg, update.id)
@@ -497,6 +522,7 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
                 self._process_router_if_compatible(router)
             except n_exc.RouterNotCompatibleWithAgent as e:
                 LOG.exception(e.msg)
+                self._router_revisions.pop(update.id, None)
                 # Was the router previously handled by this agent?
                 if router['id'] in self.router_info:
                     LOG.error(_LE("Removing incompatible router '%s'"),
@@ -505,9 +531,15 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
             except Exception:
                 msg = _LE("Failed to process compatible router '%s'")
                 LOG.exception(msg, update.id)
+                self._router_revisions.pop(update.id, None)
                 self._resync_router(update)
                 continue
 
+            revision = router.get(l3_constants.ROUTER_REVISION_KEY)
+            if revision:
+                self._router_revisions[update.id] = revision
+            else:
+                self._router_revisions.pop(update.id, None)
             LOG.debug("Finished a router update for %s", update.id)
             rp.fetched_and_processed(update.timestamp)
 
@@ -542,49 +574,81 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
         except n_exc.AbortSyncRouters:
             self.fullsync = True
 
+    def _fetch_routers(self, context, router_ids, router_revisions):
+        """Fetch routers from server, splitting the chunks timing out."""
+        revisions = dict((router_id, router_revisions[router_id])
+                         for router_id in router_ids
+                         if router_id in router_revisions)
+        try:
+            return self.plugin_rpc.get_routers(
+                context, router_ids, router_revisions=revisions)
+        except oslo_messaging.MessagingTimeout:
+            if len(router_ids) <= SYNC_ROUTERS_MIN_CHUNK_SIZE:
+                LOG.error(_LE('Server failed to return info for routers in '
+                              'required time even with min chunk size: %s. '
+                              'It might be under very high load or '
+                              'just inoperable'),
+                          SYNC_ROUTERS_MIN_CHUNK_SIZE)
+                raise
+            half = len(router_ids) // 2
+            LOG.warning(_LW('Server failed to return info for %(count)s '
+                            'routers in required time, fetching them in '
+                            'chunks of %(size)s'),
+                        {'count': len(router_ids), 'size': half})
+            return (self._fetch_routers(context, router_ids[:half],
+                                        router_revisions) +
+                    self._fetch_routers(context, router_ids[half:],
+                                        router_revisions))
+
     def fetch_and_sync_all_routers(self, context, ns_manager):
         prev_router_ids = set(self.router_info)
         curr_router_ids = set()
         timestamp = timeutils.utcnow()
+        router_revisions = dict(
+            (router_id, revision)
+            for router_id, revision in self._router_revisions.items()
+            if router_id in self.router_info)
 
         try:
             router_ids = ([self.conf.router_id] if self.conf.router_id else
                           self.plugin_rpc.get_router_ids(context))
             # fetch routers by chunks to reduce the load on server and to
-            # start router processing earlier
-            for i in range(0, len(router_ids), self.sync_routers_chunk_size):
-                routers = self.plugin_rpc.get_routers(
-                    context, router_ids[i:i + self.sync_routers_chunk_size])
+            # start router processing earlier, the chunks are fetched in
+            # parallel and each chunk timing out is fetched again in halves
+            size = self.sync_routers_chunk_size
+            pool = eventlet.GreenPool(SYNC_ROUTERS_CONCURRENCY)
+            chunks = [pool.spawn(self._fetch_routers, context,
+                                 router_ids[i:i + size], router_revisions)
+                      for i in range(0, len(router_ids), size)]
+            for chunk in chunks:
+                routers = chunk.wait()
                 LOG.debug('Processing :%r', routers)
                 for r in routers:
                     curr_router_ids.add(r['id'])
                     ns_manager.keep_router(r['id'])
-                    if r.get('distributed'):
+                    router = r
+                    if r.get(l3_constants.ROUTER_UNCHANGED_KEY):
+                        # the agent already processed this revision, unless
+                        # the router was removed in the meantime and has to
+                        # be fetched again
+                        ri = self.router_info.get(r['id'])
+                        router = ri.router if ri else None
+                    if router and router.get('distributed'):
                         # need to keep fip namespaces as well
-                        ext_net_id = (r['external_gateway_info'] or {}).get(
-                            'network_id')
+                        ext_net_id = (router['external_gateway_info'] or
+                                      {}).get('network_id')
                         if ext_net_id:
                             ns_manager.keep_ext_net(ext_net_id)
+                    if router and router is not r:
+                        continue
                     update = queue.RouterUpdate(
                         r['id'],
                         queue.PRIORITY_SYNC_ROUTERS_TASK,
-                        router=r,
+                        router=router,
                         timestamp=timestamp)
                     self._queue.add(update)
         except oslo_messaging.MessagingTimeout:
-            if self.sync_routers_chunk_size > SYNC_ROUTERS_MIN_CHUNK_SIZE:
-                self.sync_routers_chunk_size = max(
-                    self.sync_routers_chunk_size / 2,
-                    SYNC_ROUTERS_MIN_CHUNK_SIZE)
-                LOG.error(_LE('Server failed to return info for routers in '
-                              'required time, decreasing chunk size to: %s'),
-                          self.sync_routers_chunk_size)
-            else:
-                LOG.error(_LE('Server failed to return info for routers in '
-                              'required time even with min chunk size: %s. '
-                              'It might be under very high load or '
-                              'just inoperable'),
-                          self.sync_routers_chunk_size)
+            # the next periodic task retries the full sync
             raise
         except oslo_messaging.MessagingException:
             LOG.exception(_LE("Failed synchronizing routers due to RPC error"))
@@ -592,11 +656,6 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
 
         self.fullsync = False
         LOG.debug("periodic_sync_routers_task successfully completed")
-        # adjust chunk size after successful sync
-        if self.sync_routers_chunk_size < SYNC_ROUTERS_MAX_CHUNK_SIZE:
-            self.sync_routers_chunk_size = min(
-                self.sync_routers_chunk_size + SYNC_ROUTERS_MIN_CHUNK_SIZE,
-                SYNC_ROUTERS_MAX_CHUNK_SIZE)
 
         # Delete routers that have disappeared since the last sync
         for router_id in prev_router_ids - curr_router_ids:
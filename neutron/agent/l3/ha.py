@@ -45,6 +45,11 @@ OPTS = [
     cfg.IntOpt('ha_vrrp_advert_int',
                default=2,
                help=_('The advertisement interval in seconds')),
+    cfg.IntOpt('ha_keepalived_reload_interval',
+               default=2,
+               help=_('Minimum number of seconds between two reloads of the '
+                      'keepalived configuration of a router. The changes '
+                      'made in between are applied by a single reload.')),
 ]
 
 
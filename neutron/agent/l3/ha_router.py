@@ -74,6 +74,12 @@ class HaRouter(router.RouterInfo):
     def ha_namespace(self):
         return self.ns_name
 
+    @property
+    def keepalived_reload_count(self):
+        if self.keepalived_manager:
+            return self.keepalived_manager.reload_count
+        return 0
+
     def initialize(self, process_monitor):
         super(HaRouter, self).initialize(process_monitor)
         ha_port = self.router.get(n_consts.HA_INTERFACE_KEY)
@@ -94,7 +100,8 @@ class HaRouter(router.RouterInfo):
             keepalived.KeepalivedConf(),
             process_monitor,
             conf_path=self.agent_conf.ha_confs_path,
-            namespace=self.ha_namespace)
+            namespace=self.ha_namespace,
+            reload_interval=self.agent_conf.ha_keepalived_reload_interval)
 
         config = self.keepalived_manager.config
 
@@ -57,32 +57,35 @@ NS_PREFIX = 'qdhcp-'
 DNSMASQ_SERVICE_NAME = 'dnsmasq'
 
 
+def _upgrade(item, model=None):
+    """Convert `item` to a model if it is a plain dict."""
+    if isinstance(item, dict) and not isinstance(item, DictModel):
+        return (model or DictModel)(item)
+    return item
+
+
 class DictModel(dict):
     """Convert dict into an object that provides attribute access to values."""
 
+    # All the attributes are stored as dict items, so the instances don't
+    # need a __dict__ of their own.
+    __slots__ = ()
+
+    # Models of the dicts found in the list attributes, DictModel otherwise
+    _item_models = {}
+
     def __init__(self, *args, **kwargs):
         """Convert dict values to DictModel values."""
         super(DictModel, self).__init__(*args, **kwargs)
 
-        def needs_upgrade(item):
-            """Check if `item` is a dict and needs to be changed to DictModel.
-            """
-            return isinstance(item, dict) and not isinstance(item, DictModel)
-
-        def upgrade(item):
-            """Upgrade item if it needs to be upgraded."""
-            if needs_upgrade(item):
-                return DictModel(item)
-            else:
-                return item
-
         for key, value in six.iteritems(self):
             if isinstance(value, (list, tuple)):
-                # Keep the same type but convert dicts to DictModels
-                self[key] = type(value)(
-                    (upgrade(item) for item in value)
-                )
-            elif needs_upgrade(value):
+                if any(isinstance(item, dict) for item in value):
+                    # Keep the same type but convert dicts to models
+                    model = self._item_models.get(key)
+                    self[key] = type(value)(_upgrade(item, model)
+                                            for item in value)
+            elif isinstance(value, dict) and not isinstance(value, DictModel):
                 # Change dict instance values to DictModel instance values
                 self[key] = DictModel(value)
 
@@ -103,8 +106,213 @@ class DictModel(dict):
         return ', '.join(sorted(pairs))
 
 
+class CompactModel(object):
+    """Slotted model providing the interface of a DictModel.
+
+    The keys listed in __slots__ are stored in slots, the other ones in a
+    dict created when needed. An instance takes a fraction of the memory of
+    the equivalent DictModel, which matters for the DHCP agent cache holding
+    a model for every port and subnet it serves.
+    """
+
+    __slots__ = ('_extra',)
+    # Keys stored in slots, and the slot of each key
+    _keys = ()
+    _fields = {}
+    # Models of the dicts found in the list attributes, DictModel otherwise
+    _item_models = {}
+
+    def __init__(self, *args, **kwargs):
+        object.__setattr__(self, '_extra', None)
+        for key, value in six.iteritems(dict(*args, **kwargs)):
+            self[key] = value
+
+    def __getitem__(self, key):
+        slot = self._fields.get(key)
+        if slot:
+            try:
+                return object.__getattribute__(self, slot)
+            except AttributeError:
+                raise KeyError(key)
+        if not self._extra or key not in self._extra:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if isinstance(value, (list, tuple)):
+            if any(isinstance(item, dict) for item in value):
+                model = self._item_models.get(key)
+                value = type(value)(_upgrade(item, model) for item in value)
+        elif isinstance(value, dict) and not isinstance(value, DictModel):
+            value = DictModel(value)
+        slot = self._fields.get(key)
+        if slot:
+            object.__setattr__(self, slot, value)
+        else:
+            if self._extra is None:
+                object.__setattr__(self, '_extra', {})
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        slot = self._fields.get(key)
+        if slot:
+            try:
+                object.__delattr__(self, slot)
+            except AttributeError:
+                raise KeyError(key)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __getattr__(self, name):
+        # Only called for the unset slots and the keys stored in _extra
+        if name != '_extra' and name not in self._fields:
+            extra = self._extra
+            if extra and name in extra:
+                return extra[name]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        try:
+            del self[name]
+        except KeyError as e:
+            raise AttributeError(e)
+
+    def iteritems(self):
+        for key, slot in zip(self._keys, self.__slots__):
+            try:
+                yield key, object.__getattribute__(self, slot)
+            except AttributeError:
+                pass
+        if self._extra:
+            for item in six.iteritems(self._extra):
+                yield item
+
+    def iterkeys(self):
+        return (key for key, value in self.iteritems())
+
+    def itervalues(self):
+        return (value for key, value in self.iteritems())
+
+    def items(self):
+        return list(self.iteritems())
+
+    def keys(self):
+        return list(self.iterkeys())
+
+    def values(self):
+        return list(self.itervalues())
+
+    __iter__ = iterkeys
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, *args, **kwargs):
+        for key, value in six.iteritems(dict(*args, **kwargs)):
+            self[key] = value
+
+    def copy(self):
+        return type(self)(self)
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, CompactModel)):
+            return dict(self.iteritems()) == dict(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return dict(self.iteritems())
+
+    def __setstate__(self, state):
+        object.__setattr__(self, '_extra', None)
+        self.update(state)
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, dict(self.iteritems()))
+
+    def __str__(self):
+        pairs = ['%s=%s' % (k, v) for k, v in self.iteritems()]
+        return ', '.join(sorted(pairs))
+
+
+class FixedIpModel(CompactModel):
+    _keys = ('subnet_id', 'ip_address')
+    __slots__ = _keys
+    _fields = dict(zip(_keys, __slots__))
+
+
+class DhcpOptModel(CompactModel):
+    _keys = ('opt_name', 'opt_value', 'ip_version')
+    __slots__ = _keys
+    _fields = dict(zip(_keys, __slots__))
+
+
+class PortModel(CompactModel):
+    _keys = ('id', 'name', 'network_id', 'tenant_id', 'mac_address',
+             'admin_state_up', 'status', 'device_id', 'device_owner',
+             'fixed_ips', 'extra_dhcp_opts', 'dns_name', 'dns_assignment',
+             'allowed_address_pairs', 'security_groups',
+             'port_security_enabled', 'description', 'created_at',
+             'updated_at', 'revision', 'binding:host_id', 'binding:vif_type',
+             'binding:vif_details', 'binding:vnic_type', 'binding:profile')
+    __slots__ = tuple(key.replace(':', '_') for key in _keys)
+    _fields = dict(zip(_keys, __slots__))
+    _item_models = {'fixed_ips': FixedIpModel,
+                    'extra_dhcp_opts': DhcpOptModel}
+
+
+class HostRouteModel(CompactModel):
+    _keys = ('destination', 'nexthop')
+    __slots__ = _keys
+    _fields = dict(zip(_keys, __slots__))
+
+
+class AllocationPoolModel(CompactModel):
+    _keys = ('start', 'end')
+    __slots__ = _keys
+    _fields = dict(zip(_keys, __slots__))
+
+
+class SubnetModel(CompactModel):
+    _keys = ('id', 'name', 'network_id', 'tenant_id', 'ip_version', 'cidr',
+             'gateway_ip', 'enable_dhcp', 'dns_nameservers', 'host_routes',
+             'allocation_pools', 'ipv6_ra_mode', 'ipv6_address_mode',
+             'subnetpool_id', 'description', 'created_at', 'updated_at',
+             'revision')
+    __slots__ = _keys
+    _fields = dict(zip(_keys, __slots__))
+    _item_models = {'host_routes': HostRouteModel,
+                    'allocation_pools': AllocationPoolModel}
+
+
 class NetModel(DictModel):
 
+    __slots__ = ()
+    _item_models = {'ports': PortModel, 'subnets': SubnetModel}
+
     def __init__(self, d):
         super(NetModel, self).__init__(d)
 
@@ -147,6 +355,18 @@ class DhcpBase(object):
     def reload_allocations(self):
         """Force the DHCP server to reload the assignment database."""
 
+    def save_fingerprint(self, fingerprint):
+        """Record the fingerprint of the network state being served."""
+
+    def adopt(self, fingerprint):
+        """Monitor the running DHCP server if it serves the network state.
+
+        :param fingerprint: fingerprint of the current network state
+        :returns: True if the DHCP server is running and was set up with the
+            network state of the fingerprint, False if it must be enabled
+        """
+        return False
+
     @classmethod
     def existing_dhcp_networks(cls, conf):
         """Return a list of existing networks ids that we have configs for."""
@@ -270,6 +490,16 @@ class DhcpLocalProcess(DhcpBase):
     def active(self):
         return self._get_process_manager().active
 
+    def save_fingerprint(self, fingerprint):
+        common_utils.replace_file(self.get_conf_file_name('fingerprint'),
+                                  fingerprint)
+
+    def _remove_fingerprint(self):
+        try:
+            os.remove(self.get_conf_file_name('fingerprint'))
+        except OSError:
+            pass
+
     @abc.abstractmethod
     def spawn_process(self):
         pass
@@ -454,7 +684,25 @@ class Dnsmasq(DhcpLocalProcess):
         ip_wrapper = ip_lib.IPWrapper(namespace=self.network.namespace)
         ip_wrapper.netns.execute(cmd, run_as_root=True)
 
+    def adopt(self, fingerprint):
+        """Monitor the running dnsmasq if it serves the network state.
+
+        The fingerprint of the network state is saved once dnsmasq is
+        enabled, and removed whenever its config files are written again.
+        """
+        if (self._get_value_from_conf_file('fingerprint') != fingerprint or
+                not self.active):
+            return False
+        self.process_monitor.register(
+            uuid=self.network.id,
+            service_name=DNSMASQ_SERVICE_NAME,
+            monitored_process=self._get_process_manager(
+                cmd_callback=self._build_cmdline_callback))
+        return True
+
     def _output_config_files(self):
+        # The config files may not match the saved fingerprint anymore
+        self._remove_fingerprint()
         self._output_hosts_file()
         self._output_addn_hosts_file()
         self._output_opts_file()
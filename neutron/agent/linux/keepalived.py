@@ -16,11 +16,13 @@ import errno
 import itertools
 import os
 
+import eventlet
 import netaddr
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import timeutils
 
-from neutron._i18n import _
+from neutron._i18n import _, _LE
 from neutron.agent.linux import external_process
 from neutron.common import exceptions
 from neutron.common import utils as common_utils
@@ -339,15 +341,23 @@ class KeepalivedManager(object):
     This wrapper permits to write keepalived config files, to start/restart
     keepalived process.
 
+    The configuration of a running keepalived is only reloaded when it
+    changed, and at most once every reload_interval seconds: the changes
+    made in between are applied together by a single delayed reload.
     """
 
     def __init__(self, resource_id, config, process_monitor, conf_path='/tmp',
-                 namespace=None):
+                 namespace=None, reload_interval=0):
         self.resource_id = resource_id
         self.config = config
         self.namespace = namespace
         self.process_monitor = process_monitor
         self.conf_path = conf_path
+        self.reload_interval = reload_interval
+        self.reload_count = 0
+        # Monotonic stopwatch started at the last reload
+        self._since_reload = None
+        self._pending_reload = None
 
     def get_conf_dir(self):
         confs_dir = os.path.abspath(os.path.normpath(self.conf_path))
@@ -361,11 +371,17 @@ class KeepalivedManager(object):
         return os.path.join(conf_dir, filename)
 
     def _output_config_file(self):
+        """Write the config file if its content changed.
+
+        :return: The path of the config file, and whether it was written.
+        """
         config_str = self.config.get_config_str()
         config_path = self.get_full_config_file_path('keepalived.conf')
+        if config_str == self.get_conf_on_disk():
+            return config_path, False
         common_utils.replace_file(config_path, config_str)
 
-        return config_path
+        return config_path, True
 
     def get_conf_on_disk(self):
         config_path = self.get_full_config_file_path('keepalived.conf')
@@ -377,7 +393,7 @@ class KeepalivedManager(object):
                 raise
 
     def spawn(self):
-        config_path = self._output_config_file()
+        config_path, config_changed = self._output_config_file()
 
         keepalived_pm = self.get_process()
         vrrp_pm = self._get_vrrp_process(
@@ -386,7 +402,13 @@ class KeepalivedManager(object):
         keepalived_pm.default_cmd_callback = (
             self._get_keepalived_process_callback(vrrp_pm, config_path))
 
-        keepalived_pm.enable(reload_cfg=True)
+        if not keepalived_pm.active:
+            keepalived_pm.enable()
+        elif config_changed:
+            self._schedule_reload()
+        else:
+            LOG.debug('Keepalived config %s unchanged, not reloading',
+                      config_path)
 
         self.process_monitor.register(uuid=self.resource_id,
                                       service_name=KEEPALIVED_SERVICE_NAME,
@@ -394,7 +416,44 @@ class KeepalivedManager(object):
 
         LOG.debug('Keepalived spawned with config %s', config_path)
 
+    def _schedule_reload(self):
+        if self._pending_reload:
+            # The pending reload will read the new config
+            return
+        delay = 0
+        if self._since_reload:
+            delay = self.reload_interval - self._since_reload.elapsed()
+        if delay > 0:
+            LOG.debug('Delaying the keepalived reload of %(resource)s by '
+                      '%(delay).1f seconds',
+                      {'resource': self.resource_id, 'delay': delay})
+            self._pending_reload = eventlet.spawn_after(delay,
+                                                        self._delayed_reload)
+        else:
+            self._reload()
+
+    def _delayed_reload(self):
+        # Nothing waits for the greenthread running the delayed reload, a
+        # failure would go unnoticed if it was not logged here.
+        self._pending_reload = None
+        try:
+            self._reload()
+        except Exception:
+            LOG.exception(_LE('Failed to reload keepalived of %s'),
+                          self.resource_id)
+
+    def _reload(self):
+        self._since_reload = timeutils.StopWatch().start()
+        self.reload_count += 1
+        LOG.debug('Reloading keepalived of %(resource)s, %(count)d reloads '
+                  'so far', {'resource': self.resource_id,
+                             'count': self.reload_count})
+        self.get_process().reload_cfg()
+
     def disable(self):
+        if self._pending_reload:
+            self._pending_reload.cancel()
+            self._pending_reload = None
         self.process_monitor.unregister(uuid=self.resource_id,
                                         service_name=KEEPALIVED_SERVICE_NAME)
 
@@ -15,6 +15,8 @@
 import hashlib
 import hmac
 
+from eventlet import event
+from eventlet import pools
 import httplib2
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -81,6 +83,13 @@ class MetadataProxyHandler(object):
 
         self.plugin_rpc = MetadataPluginAPI(topics.PLUGIN)
         self.context = context.get_admin_context_without_session()
+        # The connections are only opened on the first requests, so that
+        # they are not shared by the forked metadata workers.
+        self._http_pool = pools.Pool(
+            max_size=self.conf.nova_metadata_pool_size,
+            create=self._create_http)
+        # instance lookup key -> event sent with the result of the lookup
+        self._lookups = {}
 
     @webob.dec.wsgify(RequestClass=webob.Request)
     def __call__(self, req):
@@ -88,10 +97,17 @@ class MetadataProxyHandler(object):
             LOG.debug("Request: %s", req)
 
             instance_id, tenant_id = self._get_instance_and_tenant_id(req)
-            if instance_id:
-                return self._proxy_request(instance_id, tenant_id, req)
-            else:
+            if not instance_id:
                 return webob.exc.HTTPNotFound()
+            resp = self._proxy_request(instance_id, tenant_id, req)
+            if isinstance(resp, webob.exc.HTTPNotFound):
+                # The address may have moved to another instance since it
+                # was cached.
+                ids = self._check_instance_and_tenant_id(
+                    req, (instance_id, tenant_id))
+                if ids:
+                    resp = self._proxy_request(ids[0], ids[1], req)
+            return resp
 
         except Exception:
             LOG.exception(_LE("Unexpected error."))
@@ -137,7 +153,8 @@ class MetadataProxyHandler(object):
         return self._get_ports_from_server(networks=networks,
                                            ip_address=remote_address)
 
-    def _get_ports(self, remote_address, network_id=None, router_id=None):
+    def _get_ports(self, remote_address, network_id=None, router_id=None,
+                   skip_cache=False):
         """Search for all ports that contain passed ip address and belongs to
         given network.
 
@@ -153,19 +170,97 @@ class MetadataProxyHandler(object):
             raise TypeError(_("Either one of parameter network_id or router_id"
                               " must be passed to _get_ports method."))
 
+        if skip_cache:
+            return self._get_ports_from_server(networks=networks,
+                                               ip_address=remote_address)
         return self._get_ports_for_remote_address(remote_address, networks)
 
+    @staticmethod
+    def _get_instance_key(req):
+        return ('instance_and_tenant_id',
+                req.headers.get('X-Neutron-Network-ID'),
+                req.headers.get('X-Neutron-Router-ID'),
+                req.headers.get('X-Forwarded-For'))
+
     def _get_instance_and_tenant_id(self, req):
+        """Find the instance and tenant ids of the sender of a request.
+
+        The ids found are cached, and the concurrent requests of a same
+        address share a single lookup.
+        """
+        key = self._get_instance_key(req)
+        if self._cache:
+            ids = self._cache.get(key)
+            if ids:
+                return ids
+
+        waiter = self._lookups.get(key)
+        if waiter:
+            return waiter.wait()
+        waiter = self._lookups[key] = event.Event()
+        try:
+            ids = self._lookup_instance_and_tenant_id(req)
+        except Exception as e:
+            del self._lookups[key]
+            waiter.send_exception(e)
+            raise
+        del self._lookups[key]
+        waiter.send(ids)
+        # Only found instances are cached, a port may be about to be created
+        if self._cache and ids[0]:
+            self._cache.set(key, ids, None)
+        return ids
+
+    def _check_instance_and_tenant_id(self, req, ids):
+        """Check the cached ids of the sender of a request against Neutron.
+
+        Nova answers 404 both for unknown instances and for unknown metadata
+        paths, so the cached ids of an address are checked after its first
+        404 only, and then trusted until they expire. Returns the new ids if
+        the address moved to another instance, None otherwise.
+        """
+        if not self._cache:
+            return
+        key = self._get_instance_key(req)
+        checked_key = ('checked',) + key
+        if self._cache.get(key) != ids or self._cache.get(checked_key):
+            return
+        new_ids = self._lookup_instance_and_tenant_id(req, skip_cache=True)
+        if new_ids == ids:
+            self._cache.set(checked_key, True, None)
+            return
+        del self._cache[key]
+        if new_ids[0]:
+            self._cache.set(key, new_ids, None)
+            return new_ids
+
+    def _lookup_instance_and_tenant_id(self, req, skip_cache=False):
         remote_address = req.headers.get('X-Forwarded-For')
         network_id = req.headers.get('X-Neutron-Network-ID')
         router_id = req.headers.get('X-Neutron-Router-ID')
 
-        ports = self._get_ports(remote_address, network_id, router_id)
+        ports = self._get_ports(remote_address, network_id, router_id,
+                                skip_cache)
 
         if len(ports) == 1:
             return ports[0]['device_id'], ports[0]['tenant_id']
         return None, None
 
+    def _get_nova_ip_port(self):
+        return '%s:%s' % (self.conf.nova_metadata_ip,
+                          self.conf.nova_metadata_port)
+
+    def _create_http(self):
+        h = httplib2.Http(
+            ca_certs=self.conf.auth_ca_cert,
+            disable_ssl_certificate_validation=self.conf.nova_metadata_insecure
+        )
+        if self.conf.nova_client_cert and self.conf.nova_client_priv_key:
+            h.add_certificate(self.conf.nova_client_priv_key,
+                              self.conf.nova_client_cert,
+                              self._get_nova_ip_port())
+        return h
+
     def _proxy_request(self, instance_id, tenant_id, req):
         headers = {
             'X-Forwarded-For': req.headers.get('X-Forwarded-For'),
@@ -174,25 +269,17 @@ class MetadataProxyHandler(object):
             'X-Instance-ID-Signature': self._sign_instance_id(instance_id)
         }
 
-        nova_ip_port = '%s:%s' % (self.conf.nova_metadata_ip,
-                                  self.conf.nova_metadata_port)
         url = urlparse.urlunsplit((
             self.conf.nova_metadata_protocol,
-            nova_ip_port,
+            self._get_nova_ip_port(),
             req.path_info,
             req.query_string,
             ''))
 
-        h = httplib2.Http(
-            ca_certs=self.conf.auth_ca_cert,
-            disable_ssl_certificate_validation=self.conf.nova_metadata_insecure
-        )
-        if self.conf.nova_client_cert and self.conf.nova_client_priv_key:
-            h.add_certificate(self.conf.nova_client_priv_key,
-                              self.conf.nova_client_cert,
-                              nova_ip_port)
-        resp, content = h.request(url, method=req.method, headers=headers,
-                                  body=req.body)
+        # httplib2 keeps the connection open, the pooled clients reuse it
+        with self._http_pool.item() as h:
+            resp, content = h.request(url, method=req.method, headers=headers,
+                                      body=req.body)
 
         if resp.status == 200:
             LOG.debug(str(resp))
@@ -79,7 +79,11 @@ METADATA_PROXY_HANDLER_OPTS = [
                 help=_("Client certificate for nova metadata api server.")),
      cfg.StrOpt('nova_client_priv_key',
                 default='',
-                help=_("Private key of client certificate."))
+                help=_("Private key of client certificate.")),
+     cfg.IntOpt('nova_metadata_pool_size',
+                default=16,
+                help=_("Maximum number of persistent connections to the Nova "
+                       "metadata server kept open by each metadata worker.")),
 ]
 
 DEDUCE_MODE = 'deduce'
@@ -0,0 +1,294 @@
+# Copyright (c) 2016 OpenStack Foundation.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Per-phase timings of the API requests.
+
+The phases of a request are the parts of its handling accounted with
+timed() or phase(), each part being accounted to its innermost phase only.
+The time left is accounted as 'other'.
+"""
+
+import collections
+import contextlib
+import cProfile
+import functools
+import pstats
+import random
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+import six
+from sqlalchemy import engine
+from sqlalchemy import event
+
+from neutron._i18n import _, _LW
+
+LOG = logging.getLogger(__name__)
+
+PROFILING_OPTS = [
+    cfg.BoolOpt('api_profiling', default=False,
+                help=_("Record the time each API request spends "
+                       "deserializing its body, enforcing policies, in "
+                       "the plugin, in database queries, building its "
+                       "views and serializing its response, and log the "
+                       "requests slower than api_slow_request_threshold "
+                       "with these timings.")),
+    cfg.FloatOpt('api_slow_request_threshold', default=1.0,
+                 help=_("Number of seconds after which an API request is "
+                        "logged as slow when api_profiling is set.")),
+    cfg.FloatOpt('api_profiler_sample_rate', default=0, min=0, max=1,
+                 help=_("Fraction of the API requests run under the Python "
+                        "profiler when api_profiling is set. The functions "
+                        "taking most of their time are logged with them. "
+                        "A single request is run under the profiler at a "
+                        "time in each process, the requests sampled "
+                        "meanwhile are not profiled. The profile of a "
+                        "request also includes the functions run for the "
+                        "other requests handled meanwhile by the process.")),
+    cfg.ListOpt('api_profiler_paths', default=[],
+                help=_("Path prefixes of the API requests which can be run "
+                       "under the Python profiler, for instance "
+                       "/v2.0/ports. All the requests when empty.")),
+]
+cfg.CONF.register_opts(PROFILING_OPTS)
+
+DESERIALIZE = 'deserialize'
+POLICY = 'policy'
+PLUGIN = 'plugin'
+VIEW = 'view'
+SERIALIZE = 'serialize'
+OTHER = 'other'
+
+# Number of functions logged for a request run under the profiler
+PROFILER_FUNCTIONS = 20
+
+# Attribute of the execution context of a statement holding its start time
+_QUERY_START = '_neutron_query_start'
+
+_LOCAL = threading.local()
+
+# Held while a request runs under the profiler, cProfile hooks the whole
+# thread and the greenthreads of the process share it.
+_PROFILER_LOCK = threading.Lock()
+
+
+class RequestProfile(object):
+    """Timings of the phases of an API request."""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.status = None
+        self.start = time.time()
+        self.phases = collections.defaultdict(float)
+        self.db_queries = 0
+        self.db_time = 0.0
+        # Phases entered and not exited yet, with the time they resumed
+        self._stack = []
+
+    def enter(self, phase):
+        now = time.time()
+        if self._stack:
+            outer = self._stack[-1]
+            self.phases[outer[0]] += now - outer[1]
+        self._stack.append([phase, now])
+
+    def exit(self):
+        now = time.time()
+        phase, resumed = self._stack.pop()
+        self.phases[phase] += now - resumed
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def add_query(self, duration):
+        self.db_queries += 1
+        self.db_time += duration
+
+    def get_timings(self):
+        """Return the total duration and the duration of each phase."""
+        total = time.time() - self.start
+        timings = dict(self.phases)
+        timings[OTHER] = max(total - sum(six.itervalues(self.phases)), 0)
+        return total, timings
+
+
+def get_profile():
+    """Return the profile of the API request handled by the thread."""
+    return getattr(_LOCAL, 'profile', None)
+
+
+@contextlib.contextmanager
+def phase(name):
+    profile = get_profile()
+    if profile is None:
+        yield
+        return
+    profile.enter(name)
+    try:
+        yield
+    finally:
+        profile.exit()
+
+
+def timed(name, func=None):
+    """Account the calls of a function to a phase of the API requests.
+
+    Used as a decorator, or to wrap a function about to be called.
+    """
+    if func is None:
+        return functools.partial(timed, name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = get_profile()
+        if profile is None:
+            return func(*args, **kwargs)
+        profile.enter(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.exit()
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    # The start time is kept on the execution context, which only lives for
+    # the statement, a failed statement leaves nothing on the connection.
+    if context is not None and get_profile() is not None:
+        setattr(context, _QUERY_START, time.time())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    started = getattr(context, _QUERY_START, None)
+    if started is None:
+        return
+    profile = get_profile()
+    if profile is not None:
+        profile.add_query(time.time() - started)
+
+
+def register_db_events():
+    for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute)):
+        if not event.contains(engine.Engine, name, listener):
+            event.listen(engine.Engine, name, listener)
+
+
+class RequestProfiler(object):
+    """WSGI middleware recording the timings of the API requests."""
+
+    def __init__(self, application):
+        self.application = application
+        register_db_events()
+
+    def _get_profiler(self, path):
+        rate = cfg.CONF.api_profiler_sample_rate
+        if not rate or random.random() >= rate:
+            return
+        prefixes = cfg.CONF.api_profiler_paths
+        if prefixes and not any(path.startswith(prefix)
+                                for prefix in prefixes):
+            return
+        if not _PROFILER_LOCK.acquire(False):
+            LOG.debug("Not profiling API request %s, another request is "
+                      "being profiled", path)
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    @staticmethod
+    def _stop_profiler(profiler):
+        try:
+            profiler.disable()
+        finally:
+            _PROFILER_LOCK.release()
+
+    def __call__(self, environ, start_response):
+        profile = RequestProfile(environ.get('REQUEST_METHOD'),
+                                 environ.get('PATH_INFO', ''))
+        profiler = self._get_profiler(profile.path)
+
+        def _start_response(status, headers, exc_info=None):
+            profile.status = status.split(' ', 1)[0]
+            return start_response(status, headers, exc_info)
+
+        _LOCAL.profile = profile
+        try:
+            app_iter = self.application(environ, _start_response)
+        except Exception:
+            self._finish(profile, profiler)
+            raise
+        finally:
+            _LOCAL.profile = None
+        return self._iter_response(app_iter, profile, profiler)
+
+    def _iter_response(self, app_iter, profile, profiler):
+        # The collections are streamed, and serialized while iterated
+        try:
+            iterator = iter(app_iter)
+            while True:
+                _LOCAL.profile = profile
+                profile.enter(SERIALIZE)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    profile.exit()
+                    _LOCAL.profile = None
+                yield chunk
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+            self._finish(profile, profiler)
+
+    def _finish(self, profile, profiler):
+        if profiler:
+            self._stop_profiler(profiler)
+        total, timings = profile.get_timings()
+        slow = total >= cfg.CONF.api_slow_request_threshold
+        if not slow and not LOG.isEnabledFor(logging.DEBUG):
+            return
+        values = {'method': profile.method, 'path': profile.path,
+                  'status': profile.status, 'total': total,
+                  'queries': profile.db_queries, 'db': profile.db_time,
+                  'phases': ', '.join(
+                      '%s %.3fs' % (name, timings[name])
+                      for name in sorted(timings, key=timings.get,
+                                         reverse=True))}
+        if slow:
+            LOG.warning(_LW("Slow API request %(method)s %(path)s "
+                            "%(status)s took %(total).3fs: %(phases)s, "
+                            "%(queries)d database queries in %(db).3fs"),
+                        values)
+        else:
+            LOG.debug("API request %(method)s %(path)s %(status)s took "
+                      "%(total).3fs: %(phases)s, %(queries)d database "
+                      "queries in %(db).3fs", values)
+        if profiler:
+            stream = six.StringIO()
+            stats = pstats.Stats(profiler, stream=stream)
+            stats.sort_stats('cumulative').print_stats(PROFILER_FUNCTIONS)
+            values['stats'] = stream.getvalue()
+            if slow:
+                LOG.warning(_LW("Profile of API request %(method)s "
+                                "%(path)s:\n%(stats)s"), values)
+            else:
+                LOG.debug("Profile of API request %(method)s %(path)s:\n"
+                          "%(stats)s", values)
@@ -13,9 +13,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import copy
 import itertools
 import operator
+import time
 
 from oslo_config import cfg
 from oslo_db import exception as db_exc
@@ -29,6 +31,7 @@ from neutron.common import constants
 from neutron.common import exceptions as n_exc
 from neutron.common import utils
 from neutron.db import api as db_api
+from neutron.db import network_changes_db
 from neutron.extensions import portbindings
 from neutron import manager
 from neutron.plugins.common import utils as p_utils
@@ -37,6 +40,11 @@ from neutron.quota import resource_registry
 
 LOG = logging.getLogger(__name__)
 
+# Number of network info payloads cached by each server process
+NETWORK_INFO_CACHE_SIZE = 256
+# Minimum number of seconds between two purges of the expired network changes
+NETWORK_CHANGES_PURGE_INTERVAL = 300
+
 
 class DhcpRpcCallback(object):
     """DHCP agent RPC callback in plugin implementations.
@@ -60,9 +68,18 @@ class DhcpRpcCallback(object):
     #     1.3 - Removed release_port_fixed_ip. It's not used by reference DHCP
     #           agent since Juno, so similar rationale for not bumping the
     #           major version as above applies here too.
+    #     1.4 - Added network_ids to get_active_networks_info, so that agents
+    #           can fetch the info of their networks in chunks.
+    #     1.5 - Added get_network_info_since, and a revision to the network
+    #           info returned by get_network_info and get_active_networks_info.
     target = oslo_messaging.Target(
         namespace=constants.RPC_NAMESPACE_DHCP_PLUGIN,
-        version='1.3')
+        version='1.5')
+
+    def __init__(self):
+        # network id -> network info, in least recently used order
+        self._network_info_cache = collections.OrderedDict()
+        self._last_changes_purge = 0
 
     def _get_active_networks(self, context, **kwargs):
         """Retrieve and return a list of the active networks."""
@@ -110,9 +127,9 @@ class DhcpRpcCallback(object):
 
     def get_active_networks(self, context, **kwargs):
         """Retrieve and return a list of the active network ids."""
-        # NOTE(arosen): This method is no longer used by the DHCP agent but is
-        # left so that neutron-dhcp-agents will still continue to work if
-        # neutron-server is upgraded and not the agent.
+        # NOTE: The DHCP agent uses this method to learn the ids of its
+        # networks before fetching their info in chunks with
+        # get_active_networks_info.
         host = kwargs.get('host')
         LOG.debug('get_active_networks requested from %s', host)
         nets = self._get_active_networks(context, **kwargs)
@@ -129,9 +146,18 @@ class DhcpRpcCallback(object):
     def get_active_networks_info(self, context, **kwargs):
         """Returns all the networks/subnets/ports in system."""
         host = kwargs.get('host')
+        network_ids = kwargs.get('network_ids')
         LOG.debug('get_active_networks_info from %s', host)
-        networks = self._get_active_networks(context, **kwargs)
+        self._purge_network_changes(context)
+        revision = network_changes_db.get_revision()
         plugin = manager.NeutronManager.get_plugin()
+        if network_ids is None:
+            networks = self._get_active_networks(context, **kwargs)
+        else:
+            # The ids come from get_active_networks, only skip the networks
+            # which have been disabled in the meantime.
+            networks = plugin.get_networks(
+                context, filters={'id': network_ids, 'admin_state_up': [True]})
         filters = {'network_id': [network['id'] for network in networks]}
         ports = plugin.get_ports(context, filters=filters)
         filters['enable_dhcp'] = [True]
@@ -142,9 +168,34 @@ class DhcpRpcCallback(object):
         for network in networks:
             network['subnets'] = grouped_subnets.get(network['id'], [])
             network['ports'] = grouped_ports.get(network['id'], [])
+            if revision is not None:
+                network['revision'] = revision
 
         return networks
 
+    def _purge_network_changes(self, context):
+        now = time.time()
+        if (cfg.CONF.track_network_changes and
+                now - self._last_changes_purge >
+                NETWORK_CHANGES_PURGE_INTERVAL):
+            self._last_changes_purge = now
+            network_changes_db.purge_changes(context)
+
+    def _get_cached_network_info(self, context, network_id):
+        network = self._network_info_cache.pop(network_id, None)
+        if network is None:
+            return
+        if network_changes_db.get_changes_since(
+                context, network_id, network['revision']) == set():
+            self._network_info_cache[network_id] = network
+            return network
+
+    def _cache_network_info(self, network):
+        self._network_info_cache.pop(network['id'], None)
+        self._network_info_cache[network['id']] = network
+        while len(self._network_info_cache) > NETWORK_INFO_CACHE_SIZE:
+            self._network_info_cache.popitem(last=False)
+
     def get_network_info(self, context, **kwargs):
         """Retrieve and return extended information about a network."""
         network_id = kwargs.get('network_id')
@@ -152,6 +203,10 @@ class DhcpRpcCallback(object):
         LOG.debug('Network %(network_id)s requested from '
                   '%(host)s', {'network_id': network_id,
                                'host': host})
+        network = self._get_cached_network_info(context, network_id)
+        if network:
+            return network
+        revision = network_changes_db.get_revision()
         plugin = manager.NeutronManager.get_plugin()
         try:
             network = plugin.get_network(context, network_id)
@@ -162,6 +217,49 @@ class DhcpRpcCallback(object):
         filters = dict(network_id=[network_id])
         network['subnets'] = plugin.get_subnets(context, filters=filters)
         network['ports'] = plugin.get_ports(context, filters=filters)
+        if revision is not None:
+            network['revision'] = revision
+            self._cache_network_info(network)
+        return network
+
+    def get_network_info_since(self, context, **kwargs):
+        """Retrieve the info of a network changed since a revision.
+
+        Only the ports changed since the revision are returned, along with
+        the ids of all the ports of the network in 'port_ids'. The whole
+        network info, without 'port_ids', is returned when the changes since
+        the revision are not known, or when the network, one of its subnets
+        or the IP allocations of its subnets changed as a whole.
+        """
+        network_id = kwargs.get('network_id')
+        revision = kwargs.get('revision')
+        host = kwargs.get('host')
+        LOG.debug('Network %(network_id)s changes since %(revision)s '
+                  'requested from %(host)s', {'network_id': network_id,
+                                              'revision': revision,
+                                              'host': host})
+        self._purge_network_changes(context)
+        new_revision = network_changes_db.get_revision()
+        plugin = manager.NeutronManager.get_plugin()
+        with context.session.begin(subtransactions=True):
+            changes = network_changes_db.get_changes_since(
+                context, network_id, revision)
+            if changes is None or None in changes:
+                return self.get_network_info(context, **kwargs)
+            try:
+                network = plugin.get_network(context, network_id)
+            except n_exc.NetworkNotFound:
+                LOG.debug("Network %s could not be found, it might have "
+                          "been deleted concurrently.", network_id)
+                return
+            filters = dict(network_id=[network_id])
+            network['subnets'] = plugin.get_subnets(context, filters=filters)
+            network['ports'] = (
+                plugin.get_ports(context, filters={'id': list(changes)})
+                if changes else [])
+            network['port_ids'] = network_changes_db.get_port_ids(
+                context, network_id)
+        network['revision'] = new_revision
         return network
 
     @db_api.retry_db_errors
@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
@@ -47,7 +49,8 @@ class L3RpcCallback(object):
     # 1.7 Added method delete_agent_gateway_port for DVR Routers
     # 1.8 Added address scope information
     # 1.9 Added get_router_ids
-    target = oslo_messaging.Target(version='1.9')
+    # 1.10 Added router_revisions to sync_routers
+    target = oslo_messaging.Target(version='1.10')
 
     @property
     def plugin(self):
@@ -80,12 +83,17 @@ class L3RpcCallback(object):
         """Sync routers according to filters to a specific agent.
 
         @param context: contain user information
-        @param kwargs: host, router_ids
+        @param kwargs: host, router_ids, router_revisions
         @return: a list of routers
                  with their interfaces and floating_ips
+
+        When router_revisions is given, every router is returned with its
+        revision, and the routers whose revision is the one known by the
+        agent are returned with their id and revision only.
         """
         router_ids = kwargs.get('router_ids')
         host = kwargs.get('host')
+        router_revisions = kwargs.get('router_revisions')
         context = neutron_context.get_admin_context()
         if utils.is_extension_supported(
             self.l3plugin, constants.L3_AGENT_SCHEDULER_EXT_ALIAS):
@@ -102,11 +110,32 @@ class L3RpcCallback(object):
         if utils.is_extension_supported(
             self.plugin, constants.PORT_BINDING_EXT_ALIAS):
             self._ensure_host_set_on_ports(context, host, routers)
+        if router_revisions is not None:
+            routers = self._strip_unchanged_routers(routers, router_revisions)
         LOG.debug("Routers returned to l3 agent:\n %s",
                   utils.DelayedStringRenderer(jsonutils.dumps,
                                               routers, indent=5))
         return routers
 
+    @staticmethod
+    def _get_router_revision(router):
+        return hashlib.sha1(
+            jsonutils.dumps(router, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+
+    def _strip_unchanged_routers(self, routers, router_revisions):
+        result = []
+        for router in routers:
+            revision = self._get_router_revision(router)
+            if router_revisions.get(router['id']) == revision:
+                result.append({'id': router['id'],
+                               constants.ROUTER_REVISION_KEY: revision,
+                               constants.ROUTER_UNCHANGED_KEY: True})
+            else:
+                router[constants.ROUTER_REVISION_KEY] = revision
+                result.append(router)
+        return result
+
     def _ensure_host_set_on_ports(self, context, host, routers):
         for router in routers:
             LOG.debug("Checking router: %(id)s for host: %(host)s",
@@ -26,6 +26,7 @@ import webob.exc
 
 from neutron._i18n import _, _LE, _LI
 from neutron.api import api_common
+from neutron.api import profiling
 from neutron.api.rpc.agentnotifiers import dhcp_rpc_agent_api
 from neutron.api.v2 import attributes
 from neutron.api.v2 import resource as wsgi_resource
@@ -123,16 +124,26 @@ class Controller(object):
                                  % self._plugin.__class__.__name__)
         return getattr(self._plugin, native_bulk_attr_name, False)
 
+    def _is_supported_for_collection(self, supported):
+        # A plugin can declare its native support for some of its
+        # collections only, with a tuple of their names.
+        if isinstance(supported, tuple):
+            return self._collection in supported
+        return supported
+
     def _is_native_pagination_supported(self):
         native_pagination_attr_name = ("_%s__native_pagination_support"
                                        % self._plugin.__class__.__name__)
-        return getattr(self._plugin, native_pagination_attr_name, False)
+        return self._is_supported_for_collection(
+            getattr(self._plugin, native_pagination_attr_name, False))
 
     def _is_native_sorting_supported(self):
         native_sorting_attr_name = ("_%s__native_sorting_support"
                                     % self._plugin.__class__.__name__)
-        return getattr(self._plugin, native_sorting_attr_name, False)
+        return self._is_supported_for_collection(
+            getattr(self._plugin, native_sorting_attr_name, False))
 
+    @profiling.timed(profiling.POLICY)
     def _exclude_attributes_by_policy(self, context, data):
         """Identifies attributes to exclude according to authZ policies.
 
@@ -157,6 +168,7 @@ class Controller(object):
             attributes_to_exclude.append(attr_name)
         return attributes_to_exclude
 
+    @profiling.timed(profiling.VIEW)
     def _view(self, context, data, fields_to_strip=None):
         """Build a view of an API resource.
 
@@ -214,7 +226,9 @@ class Controller(object):
                                name,
                                resource,
                                pluralized=self._collection)
-                ret_value = getattr(self._plugin, name)(*arg_list, **kwargs)
+                ret_value = profiling.timed(
+                    profiling.PLUGIN, getattr(self._plugin, name))(
+                        *arg_list, **kwargs)
                 # It is simply impossible to predict whether one of this
                 # actions alters resource usage. For instance a tenant port
                 # is created when a router interface is added. Therefore it is
@@ -263,7 +277,9 @@ class Controller(object):
         pagination_helper.update_fields(original_fields, fields_to_add)
         if parent_id:
             kwargs[self._parent_id_name] = parent_id
-        obj_getter = getattr(self._plugin, self._plugin_handlers[self.LIST])
+        obj_getter = profiling.timed(
+            profiling.PLUGIN,
+            getattr(self._plugin, self._plugin_handlers[self.LIST]))
         obj_list = obj_getter(request.context, **kwargs)
         obj_list = sorting_helper.sort(obj_list)
         obj_list = pagination_helper.paginate(obj_list)
@@ -272,12 +288,11 @@ class Controller(object):
             # FIXME(salvatore-orlando): obj_getter might return references to
             # other resources. Must check authZ on them too.
             # Omit items from list that should not be visible
-            obj_list = [obj for obj in obj_list
-                        if policy.check(request.context,
-                                        self._plugin_handlers[self.SHOW],
-                                        obj,
-                                        plugin=self._plugin,
-                                        pluralized=self._collection)]
+            obj_list = policy.filter_authorized(
+                request.context,
+                self._plugin_handlers[self.SHOW],
+                obj_list,
+                pluralized=self._collection)
         # Use the first element in the list for discriminating which attributes
         # should be filtered out because of authZ policies
         # fields_to_add contains a list of attributes added for request policy
@@ -287,11 +302,12 @@ class Controller(object):
         if obj_list:
             fields_to_strip += self._exclude_attributes_by_policy(
                 request.context, obj_list[0])
-        collection = {self._collection:
-                      [self._filter_attributes(
-                          request.context, obj,
-                          fields_to_strip=fields_to_strip)
-                       for obj in obj_list]}
+        with profiling.phase(profiling.VIEW):
+            collection = {self._collection:
+                          [self._filter_attributes(
+                              request.context, obj,
+                              fields_to_strip=fields_to_strip)
+                           for obj in obj_list]}
         pagination_links = pagination_helper.get_links(obj_list)
         if pagination_links:
             collection[self._collection + "_links"] = pagination_links
@@ -307,7 +323,8 @@ class Controller(object):
         action = self._plugin_handlers[self.SHOW]
         if parent_id:
             kwargs[self._parent_id_name] = parent_id
-        obj_getter = getattr(self._plugin, action)
+        obj_getter = profiling.timed(profiling.PLUGIN,
+                                     getattr(self._plugin, action))
         obj = obj_getter(request.context, id, **kwargs)
         # Check authz
         # FIXME(salvatore-orlando): obj_getter might return references to
@@ -482,6 +499,7 @@ class Controller(object):
                 obj_creator = getattr(self._plugin, "%s_bulk" % action)
             else:
                 obj_creator = getattr(self._plugin, action)
+            obj_creator = profiling.timed(profiling.PLUGIN, obj_creator)
             try:
                 if emulated:
                     return self._emulate_bulk_create(obj_creator, request,
@@ -550,7 +568,8 @@ class Controller(object):
             msg = _('The resource could not be found.')
             raise webob.exc.HTTPNotFound(msg)
 
-        obj_deleter = getattr(self._plugin, action)
+        obj_deleter = profiling.timed(profiling.PLUGIN,
+                                      getattr(self._plugin, action))
         obj_deleter(request.context, id, **kwargs)
         # A delete operation usually alters resource usage, so mark affected
         # usage trackers as dirty
@@ -617,7 +636,8 @@ class Controller(object):
             msg = _('The resource could not be found.')
             raise webob.exc.HTTPNotFound(msg)
 
-        obj_updater = getattr(self._plugin, action)
+        obj_updater = profiling.timed(profiling.PLUGIN,
+                                      getattr(self._plugin, action))
         kwargs = {self._resource: body}
         if parent_id:
             kwargs[self._parent_id_name] = parent_id
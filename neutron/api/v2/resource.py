@@ -28,6 +28,7 @@ import webob.dec
 import webob.exc
 
 from neutron._i18n import _, _LE, _LI
+from neutron.api import profiling
 from neutron.common import exceptions
 from neutron import wsgi
 
@@ -77,7 +78,9 @@ def Resource(controller, faults=None, deserializers=None, serializers=None,
 
         try:
             if request.body:
-                args['body'] = deserializer.deserialize(request.body)['body']
+                with profiling.phase(profiling.DESERIALIZE):
+                    args['body'] = deserializer.deserialize(
+                        request.body)['body']
 
             method = getattr(controller, action)
 
@@ -139,7 +142,13 @@ def Resource(controller, faults=None, deserializers=None, serializers=None,
             raise webob.exc.HTTPInternalServerError(**kwargs)
 
         status = action_status.get(action, 200)
-        body = serializer.serialize(result)
+        if action == 'index' and status == 200:
+            # Collections are streamed rather than serialized as a whole
+            return webob.Response(request=request, status=status,
+                                  content_type=content_type,
+                                  app_iter=serializer.serialize_iter(result))
+        with profiling.phase(profiling.SERIALIZE):
+            body = serializer.serialize(result)
         # NOTE(jkoelker) Comply with RFC2616 section 9.7
         if status == 204:
             content_type = ''
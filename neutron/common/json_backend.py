@@ -0,0 +1,113 @@
+# Copyright (c) 2016 OpenStack Foundation.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import functools
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+from oslo_utils import importutils
+import six
+
+from neutron._i18n import _, _LW
+
+LOG = logging.getLogger(__name__)
+
+JSON_BACKEND_OPTS = [
+    cfg.StrOpt('api_json_backend', default='json',
+               choices=['json', 'simplejson', 'ujson'],
+               help=_("Library serializing the JSON bodies of the API "
+                      "responses. simplejson and ujson are faster than the "
+                      "json module of the standard library when installed "
+                      "with their C extension, the json module is used when "
+                      "they are not installed. ujson only serializes the "
+                      "bodies made of strings, 64-bit integers, booleans, "
+                      "nulls, lists and dicts, the json module serializes "
+                      "the other ones.")),
+]
+cfg.CONF.register_opts(JSON_BACKEND_OPTS)
+
+# Types ujson serializes like the json module. Floats are left out, ujson
+# rounds them, and so are the subclasses of these types.
+_UJSON_KEY_TYPES = frozenset([str, six.text_type])
+_UJSON_INT_TYPES = frozenset(six.integer_types)
+_UJSON_LEAF_TYPES = _UJSON_KEY_TYPES.union([bool, type(None)])
+# ujson raises OverflowError for the integers out of the signed and
+# unsigned 64-bit ranges
+_UJSON_INT_MIN = -2 ** 63
+_UJSON_INT_MAX = 2 ** 64 - 1
+
+_DUMPS = {}
+
+
+def _sanitizer(obj):
+    return six.text_type(obj)
+
+
+def _json_dumps(data):
+    return jsonutils.dumps(data, default=_sanitizer)
+
+
+def _is_primitive(data):
+    """Return whether data is only made of the types ujson supports."""
+    values = [data]
+    while values:
+        value = values.pop()
+        value_type = type(value)
+        if value_type is dict:
+            for key in value:
+                if type(key) not in _UJSON_KEY_TYPES:
+                    return False
+            values.extend(six.itervalues(value))
+        elif value_type is list or value_type is tuple:
+            values.extend(value)
+        elif value_type in _UJSON_INT_TYPES:
+            if not _UJSON_INT_MIN <= value <= _UJSON_INT_MAX:
+                return False
+        elif value_type not in _UJSON_LEAF_TYPES:
+            return False
+    return True
+
+
+def _ujson_dumps(ujson, data):
+    if _is_primitive(data):
+        return ujson.dumps(data, escape_forward_slashes=False)
+    return _json_dumps(data)
+
+
+def _load_dumps(backend):
+    if backend != 'json':
+        module = importutils.try_import(backend)
+        if module is None:
+            LOG.warning(_LW("%s is not installed, JSON bodies are "
+                            "serialized with the json module"), backend)
+        elif backend == 'simplejson':
+            return functools.partial(module.dumps, default=_sanitizer,
+                                     namedtuple_as_object=False)
+        else:
+            return functools.partial(_ujson_dumps, module)
+    return _json_dumps
+
+
+def dumps(data):
+    """Serialize data to JSON with the configured backend.
+
+    The objects JSON does not support are serialized as their text.
+    """
+    backend = cfg.CONF.api_json_backend
+    try:
+        func = _DUMPS[backend]
+    except KeyError:
+        func = _DUMPS[backend] = _load_dumps(backend)
+    return func(data)
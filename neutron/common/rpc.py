@@ -22,6 +22,7 @@ from oslo_messaging import serializer as om_serializer
 from oslo_service import service
 
 from neutron.common import exceptions
+from neutron.common import rpc_stats
 from neutron import context
 
 
@@ -55,6 +56,10 @@ TRANSPORT_ALIASES = {
 # will prevent get_connection from creating connections to the AMQP server
 RPC_DISABLED = False
 
+# Topics consumed by the RPC servers of this process, all when None
+CONSUMER_TOPICS = None
+EXCLUDED_CONSUMER_TOPICS = frozenset()
+
 
 def init(conf):
     global TRANSPORT, NOTIFICATION_TRANSPORT, NOTIFIER
@@ -91,18 +96,40 @@ def get_allowed_exmods():
     return ALLOWED_EXMODS + EXTRA_EXMODS
 
 
+def set_consumer_topics(topics=None, excluded_topics=()):
+    """Restrict the topics consumed by the RPC servers of this process.
+
+    Used by the RPC workers dedicated to some topics, and by the other RPC
+    workers which must leave these topics to them.
+    """
+    global CONSUMER_TOPICS, EXCLUDED_CONSUMER_TOPICS
+    CONSUMER_TOPICS = frozenset(topics) if topics is not None else None
+    EXCLUDED_CONSUMER_TOPICS = frozenset(excluded_topics)
+
+
+def is_consumed_topic(topic):
+    if CONSUMER_TOPICS is not None and topic not in CONSUMER_TOPICS:
+        return False
+    return topic not in EXCLUDED_CONSUMER_TOPICS
+
+
 def get_client(target, version_cap=None, serializer=None):
     assert TRANSPORT is not None
     serializer = RequestContextSerializer(serializer)
-    return oslo_messaging.RPCClient(TRANSPORT,
-                                    target,
-                                    version_cap=version_cap,
-                                    serializer=serializer)
+    client_cls = (rpc_stats.InstrumentedRPCClient if rpc_stats.is_enabled()
+                  else oslo_messaging.RPCClient)
+    return client_cls(TRANSPORT,
+                      target,
+                      version_cap=version_cap,
+                      serializer=serializer)
 
 
 def get_server(target, endpoints, serializer=None):
     assert TRANSPORT is not None
     serializer = RequestContextSerializer(serializer)
+    if rpc_stats.is_enabled():
+        endpoints = [rpc_stats.InstrumentedEndpoint(endpoint)
+                     for endpoint in endpoints]
     return oslo_messaging.get_rpc_server(TRANSPORT, target, endpoints,
                                          'eventlet', serializer)
 
@@ -197,6 +224,9 @@ class Connection(object):
         self.servers = []
 
     def create_consumer(self, topic, endpoints, fanout=False):
+        if not is_consumed_topic(topic):
+            LOG.debug("Topic %s is not consumed by this worker", topic)
+            return
         target = oslo_messaging.Target(
             topic=topic, server=cfg.CONF.host, fanout=fanout)
         server = get_server(target, endpoints)
@@ -0,0 +1,247 @@
+# Copyright (c) 2016 OpenStack Foundation.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import bisect
+import collections
+import functools
+import os
+import random
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+import oslo_messaging
+from oslo_serialization import jsonutils
+from oslo_service import loopingcall
+
+from neutron._i18n import _, _LI
+
+LOG = logging.getLogger(__name__)
+
+RPC_STATS_OPTS = [
+    cfg.IntOpt('rpc_stats_interval', default=0,
+               help=_("Seconds between two reports of the RPC statistics of "
+                      "the process in its log: calls, errors, latencies, "
+                      "request and response sizes and concurrent calls of "
+                      "each RPC method it handles or sends. 0 disables the "
+                      "RPC instrumentation.")),
+    cfg.FloatOpt('rpc_stats_sample_rate', default=0.1, min=0, max=1,
+                 help=_("Fraction of the RPC calls whose request and "
+                        "response sizes are measured. Measuring a size "
+                        "serializes the payload once more.")),
+]
+cfg.CONF.register_opts(RPC_STATS_OPTS)
+
+# Upper bounds, in seconds, of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                   30, 60)
+
+# Kinds of measured RPC calls
+DISPATCH = 'dispatch'
+CALL = 'call'
+CAST = 'cast'
+
+
+def is_enabled():
+    return cfg.CONF.rpc_stats_interval > 0
+
+
+def _get_size(value):
+    try:
+        return len(jsonutils.dumps(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class MethodStats(object):
+    """Statistics of the calls of a RPC method since the last report."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.errors = 0
+        self.max_in_flight = self.in_flight
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.requests = 0
+        self.request_bytes = 0
+        self.responses = 0
+        self.response_bytes = 0
+
+    def start_call(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def end_call(self, latency, failed):
+        self.in_flight -= 1
+        self.calls += 1
+        if failed:
+            self.errors += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS,
+                                                latency)] += 1
+
+    def add_request_size(self, size):
+        if size is not None:
+            self.requests += 1
+            self.request_bytes += size
+
+    def add_response_size(self, size):
+        if size is not None:
+            self.responses += 1
+            self.response_bytes += size
+
+    def get_latency_percentile(self, fraction):
+        """Return the upper bound of the bucket of a latency percentile.
+
+        None is returned when the percentile is above the last bucket.
+        """
+        count = 0
+        for i, bucket_count in enumerate(self.latency_buckets):
+            count += bucket_count
+            if count and count >= fraction * self.calls:
+                break
+        if i < len(LATENCY_BUCKETS):
+            return LATENCY_BUCKETS[i]
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'latency_avg': self.latency_sum / self.calls if self.calls else 0,
+            'latency_max': self.latency_max,
+            'latency_p50': self.get_latency_percentile(0.5),
+            'latency_p95': self.get_latency_percentile(0.95),
+            'latency_p99': self.get_latency_percentile(0.99),
+            'latency_buckets': list(self.latency_buckets),
+            'request_bytes_avg': (self.request_bytes // self.requests
+                                  if self.requests else None),
+            'response_bytes_avg': (self.response_bytes // self.responses
+                                   if self.responses else None),
+        }
+
+
+class RpcStats(object):
+    """Statistics of the RPC calls handled and sent by the process.
+
+    The statistics are kept per kind of call and RPC method, and reported in
+    the log every rpc_stats_interval seconds, after which they start over.
+    """
+
+    def __init__(self):
+        self._methods = collections.defaultdict(MethodStats)
+        self._reporter = None
+        self._pid = None
+
+    def _start_reporter(self):
+        # A forked worker does not inherit the green thread of its parent
+        if self._reporter and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        interval = cfg.CONF.rpc_stats_interval
+        self._reporter = loopingcall.FixedIntervalLoopingCall(self.report)
+        self._reporter.start(interval=interval, initial_delay=interval)
+
+    def measure(self, kind, method, func, *args, **kwargs):
+        """Call func, a RPC method taking its arguments as kwargs."""
+        self._start_reporter()
+        stats = self._methods[(kind, method)]
+        sampled = random.random() < cfg.CONF.rpc_stats_sample_rate
+        if sampled:
+            stats.add_request_size(_get_size(kwargs))
+        stats.start_call()
+        start = time.time()
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+        finally:
+            stats.end_call(time.time() - start, failed)
+        if sampled and kind != CAST:
+            stats.add_response_size(_get_size(result))
+        return result
+
+    def get_stats(self):
+        """Return the statistics of each kind of call and RPC method."""
+        return dict(('%s:%s' % key, stats.to_dict())
+                    for key, stats in self._methods.items())
+
+    def report(self):
+        methods = sorted(self._methods.items(),
+                         key=lambda item: item[1].latency_sum, reverse=True)
+        for (kind, method), stats in methods:
+            if not stats.calls and not stats.in_flight:
+                continue
+            values = stats.to_dict()
+            values.update(kind=kind, method=method)
+            LOG.info(_LI("RPC %(kind)s %(method)s: %(calls)d calls, "
+                         "%(errors)d errors, latency avg %(latency_avg).3fs "
+                         "p50 %(latency_p50)ss p95 %(latency_p95)ss p99 "
+                         "%(latency_p99)ss max %(latency_max).3fs, in flight "
+                         "%(in_flight)d max %(max_in_flight)d, request "
+                         "%(request_bytes_avg)s bytes, response "
+                         "%(response_bytes_avg)s bytes"), values)
+            stats.reset()
+
+
+STATS = RpcStats()
+
+
+class InstrumentedEndpoint(object):
+    """Measures the RPC methods dispatched to an endpoint."""
+
+    def __init__(self, endpoint):
+        self._endpoint = endpoint
+
+    def __getattr__(self, name):
+        attr = getattr(self._endpoint, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def dispatch(ctxt, **kwargs):
+            return STATS.measure(DISPATCH, name, attr, ctxt, **kwargs)
+        return dispatch
+
+
+class _InstrumentedCallContext(object):
+
+    def __init__(self, call_context):
+        self._call_context = call_context
+
+    def call(self, ctxt, method, **kwargs):
+        return STATS.measure(CALL, method, self._call_context.call,
+                             ctxt, method, **kwargs)
+
+    def cast(self, ctxt, method, **kwargs):
+        return STATS.measure(CAST, method, self._call_context.cast,
+                             ctxt, method, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._call_context, name)
+
+
+class InstrumentedRPCClient(oslo_messaging.RPCClient):
+    """RPC client measuring the calls and casts it sends."""
+
+    def prepare(self, *args, **kwargs):
+        return _InstrumentedCallContext(
+            super(InstrumentedRPCClient, self).prepare(*args, **kwargs))
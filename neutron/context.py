@@ -55,6 +55,8 @@ class ContextBase(oslo_context.RequestContext):
             timestamp = datetime.datetime.utcnow()
         self.timestamp = timestamp
         self.roles = roles or []
+        # Policy data reused by the policy checks made with this context
+        self.policy_cache = policy.RequestPolicyCache()
         self.is_advsvc = is_advsvc
         if self.is_advsvc is None:
             self.is_advsvc = self.is_admin or policy.check_is_advsvc(self)
@@ -103,6 +105,7 @@ class ContextBase(oslo_context.RequestContext):
         """Return a version of this context with admin flag set."""
         context = copy.copy(self)
         context.is_admin = True
+        context.policy_cache = policy.RequestPolicyCache()
 
         if 'admin' not in [x.lower() for x in context.roles]:
             context.roles = context.roles + ["admin"]
@@ -21,6 +21,7 @@ from neutron.api.v2 import attributes as attr
 from neutron.common import constants
 from neutron.db import db_base_plugin_v2
 from neutron.db import model_base
+from neutron.db import models_v2
 from neutron.extensions import address_scope as ext_address_scope
 
 
@@ -144,4 +145,14 @@ class AddressScopeDbMixin(ext_address_scope.AddressScopePluginBase):
         return network_res
 
     db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_funcs(
-        attr.NETWORKS, ['_extend_network_dict_address_scope'])
+        attr.NETWORKS, ['_extend_network_dict_address_scope'],
+        fields=[ext_address_scope.IPV4_ADDRESS_SCOPE,
+                ext_address_scope.IPV6_ADDRESS_SCOPE])
+
+    db_base_plugin_v2.NeutronDbPluginV2.register_model_query_hook(
+        models_v2.Network,
+        "network_address_scopes",
+        None,
+        None,
+        eager_loads={'subnets': (ext_address_scope.IPV4_ADDRESS_SCOPE,
+                                 ext_address_scope.IPV6_ADDRESS_SCOPE)})
@@ -13,7 +13,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import datetime
+import os
+import time
 
 from eventlet import greenthread
 from oslo_config import cfg
@@ -21,6 +24,7 @@ from oslo_db import exception as db_exc
 from oslo_log import log as logging
 import oslo_messaging
 from oslo_serialization import jsonutils
+from oslo_service import loopingcall
 from oslo_utils import importutils
 from oslo_utils import timeutils
 import six
@@ -67,6 +71,25 @@ AGENT_OPTS = [
                        "enable_new_agents=False. In the case, user's "
                        "resources will not be scheduled automatically to the "
                        "agent until admin changes admin_state_up to True.")),
+    cfg.IntOpt('agent_heartbeat_flush_interval', default=0,
+               help=_("Seconds between the writes of the agent heartbeats "
+                      "kept in memory by a server worker. When set, a "
+                      "heartbeat which does not change the state reported "
+                      "by a known agent is not written to the database "
+                      "right away, and the heartbeats received by a worker "
+                      "are written together at this interval. Other "
+                      "workers only see the written heartbeats, so it must "
+                      "stay well below agent_down_time minus the "
+                      "report_interval of the agents. 0 writes every "
+                      "heartbeat when it is received.")),
+    cfg.IntOpt('agent_registry_ttl', default=0,
+               help=_("Seconds a server process keeps the agents it loaded "
+                      "to bind ports and validate availability zones. The "
+                      "agents changed by the process itself are loaded "
+                      "again right away, the ones changed by other "
+                      "processes after at most this delay. It must stay "
+                      "well below agent_down_time minus the report_interval "
+                      "of the agents. 0 loads the agents on each use.")),
 ]
 cfg.CONF.register_opts(AGENT_OPTS)
 
@@ -75,6 +98,27 @@ cfg.CONF.register_opts(AGENT_OPTS)
 # version_manager callback
 DOWNTIME_VERSIONS_RATIO = 2
 
+AGENT_DICT_CACHE_SIZE = 4096
+# Dictionaries parsed from the JSON columns of the agents, keyed by their
+# serialized form, from the least to the most recently used
+_PARSED_DICTS = collections.OrderedDict()
+
+
+def load_agent_dict(value):
+    """Return the dictionary serialized in a JSON column of an agent.
+
+    The dictionary is shared by all the agents reporting the same value, it
+    must not be modified.
+    """
+    try:
+        parsed = _PARSED_DICTS.pop(value)
+    except KeyError:
+        parsed = jsonutils.loads(value)
+        if len(_PARSED_DICTS) >= AGENT_DICT_CACHE_SIZE:
+            _PARSED_DICTS.popitem(last=False)
+    _PARSED_DICTS[value] = parsed
+    return parsed
+
 
 class Agent(model_base.BASEV2, model_base.HasId):
     """Represents agents running in neutron deployments."""
@@ -114,7 +158,187 @@ class Agent(model_base.BASEV2, model_base.HasId):
 
     @property
     def is_active(self):
-        return not AgentDbMixin.is_agent_down(self.heartbeat_timestamp)
+        return not AgentDbMixin.is_agent_down(
+            get_heartbeat_timestamp(self.id, self.heartbeat_timestamp))
+
+
+class AgentHeartbeatBuffer(object):
+    """Heartbeats of the known agents not written to the database yet.
+
+    Only the heartbeats leaving the rest of the agent state unchanged are
+    buffered, so that they can be written back by a single update of the
+    heartbeat timestamp of all the agents which reported since the previous
+    write.
+    """
+
+    def __init__(self):
+        # (agent_type, host) -> [agent id, state hash, last heartbeat]
+        self._agents = {}
+        # agent id -> last heartbeat not written yet
+        self._pending = {}
+        self._first_pending = None
+        self._flusher = None
+        self._pid = None
+        # Seconds the oldest heartbeat written by the last flush was kept in
+        # memory, and number of agents updated by the last flush.
+        self.flush_lag = 0
+        self.flush_count = 0
+
+    def remember(self, agent_type, host, agent_id, state_hash, heartbeat):
+        """Record the state of an agent just written to the database."""
+        self._agents[(agent_type, host)] = [agent_id, state_hash, heartbeat]
+        self._pending.pop(agent_id, None)
+
+    def forget(self, agent_id):
+        self._pending.pop(agent_id, None)
+        for key, agent in list(self._agents.items()):
+            if agent[0] == agent_id:
+                del self._agents[key]
+
+    def clear(self):
+        self._agents.clear()
+        self._pending.clear()
+        self._first_pending = None
+
+    def buffer(self, agent_type, host, state_hash, heartbeat):
+        """Keep the heartbeat of an agent in memory if possible.
+
+        Returns the previous heartbeat of the agent, or None when the state
+        of the agent changed, when it is not known by this worker or when it
+        would be revived by this heartbeat: the heartbeat must then be
+        written to the database right away.
+        """
+        agent = self._agents.get((agent_type, host))
+        if (not agent or agent[1] != state_hash or
+                AgentDbMixin.is_agent_down(agent[2])):
+            return
+        previous = agent[2]
+        agent[2] = heartbeat
+        self._pending[agent[0]] = heartbeat
+        if self._first_pending is None:
+            self._first_pending = heartbeat
+        self._start_flusher()
+        return previous
+
+    def get_heartbeat(self, agent_id, heartbeat_timestamp):
+        """Return the latest of a stored and of a buffered heartbeat."""
+        heartbeat = self._pending.get(agent_id)
+        if heartbeat and (not heartbeat_timestamp or
+                          heartbeat > heartbeat_timestamp):
+            return heartbeat
+        return heartbeat_timestamp
+
+    def _start_flusher(self):
+        # A forked worker does not inherit the green thread of its parent
+        if self._flusher and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        interval = cfg.CONF.agent_heartbeat_flush_interval
+        self._flusher = loopingcall.FixedIntervalLoopingCall(self.flush)
+        self._flusher.start(interval=interval, initial_delay=interval)
+
+    def flush(self):
+        """Write the buffered heartbeats to the database."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        first_pending, self._first_pending = self._first_pending, None
+        table = Agent.__table__
+        session = context.get_admin_context().session
+        try:
+            with session.begin():
+                result = session.execute(
+                    table.update().where(table.c.id.in_(list(pending))).values(
+                        heartbeat_timestamp=sa.case(pending,
+                                                    value=table.c.id)))
+        except Exception:
+            LOG.exception(_LE("Failed to write the heartbeats of %d agents"),
+                          len(pending))
+            for agent_id, heartbeat in six.iteritems(pending):
+                self._pending.setdefault(agent_id, heartbeat)
+            if first_pending and (not self._first_pending or
+                                  first_pending < self._first_pending):
+                self._first_pending = first_pending
+            return
+        if result.rowcount < len(pending):
+            # Some agents were deleted, their next heartbeat adds them back
+            for agent_id in pending:
+                self.forget(agent_id)
+        self.flush_count = len(pending)
+        self.flush_lag = timeutils.delta_seconds(first_pending,
+                                                 timeutils.utcnow())
+        LOG.debug("Wrote the heartbeats of %(count)d agents, the oldest one "
+                  "was received %(lag).1f seconds ago",
+                  {'count': self.flush_count, 'lag': self.flush_lag})
+
+
+_HEARTBEATS = AgentHeartbeatBuffer()
+
+
+def get_heartbeat_timestamp(agent_id, heartbeat_timestamp):
+    """Return the last heartbeat of an agent known by this worker."""
+    return _HEARTBEATS.get_heartbeat(agent_id, heartbeat_timestamp)
+
+
+class AgentRegistry(object):
+    """Agent dicts cached by a server process.
+
+    The agents are indexed by type and host and by availability zone. They
+    are loaded again when older than agent_registry_ttl seconds or after an
+    agent was changed by the process.
+    """
+
+    def __init__(self):
+        self._by_type_host = {}
+        self._by_az = {}
+        self._expires_at = 0
+        self._generation = 0
+
+    def invalidate(self):
+        self._generation += 1
+        self._expires_at = 0
+
+    def _load(self, plugin, context):
+        generation = self._generation
+        by_type_host = collections.defaultdict(list)
+        by_az = collections.defaultdict(list)
+        for agent_db in context.session.query(Agent):
+            agent = plugin._make_agent_dict(agent_db)
+            by_type_host[(agent['agent_type'], agent['host'])].append(agent)
+            if agent['availability_zone']:
+                by_az[agent['availability_zone']].append(agent)
+        self._by_type_host = dict(by_type_host)
+        self._by_az = dict(by_az)
+        # An agent changed while loading may have been missed
+        if generation == self._generation:
+            self._expires_at = time.time() + cfg.CONF.agent_registry_ttl
+
+    def _ensure_loaded(self, plugin, context):
+        if time.time() >= self._expires_at:
+            self._load(plugin, context)
+
+    @staticmethod
+    def _refresh(agent):
+        agent = dict(agent)
+        agent['heartbeat_timestamp'] = get_heartbeat_timestamp(
+            agent['id'], agent['heartbeat_timestamp'])
+        agent['alive'] = not AgentDbMixin.is_agent_down(
+            agent['heartbeat_timestamp'])
+        return agent
+
+    def get_agents_by_type_and_host(self, plugin, context, agent_type, host):
+        self._ensure_loaded(plugin, context)
+        return [self._refresh(agent) for agent in
+                self._by_type_host.get((agent_type, host), [])]
+
+    def get_availability_zones(self, plugin, context, agent_type):
+        self._ensure_loaded(plugin, context)
+        return set(az for az, agents in six.iteritems(self._by_az)
+                   if any(agent['agent_type'] == agent_type
+                          for agent in agents))
+
+
+_AGENT_REGISTRY = AgentRegistry()
 
 
 class AgentAvailabilityZoneMixin(az_ext.AvailabilityZonePluginBase):
@@ -161,10 +385,16 @@ class AgentAvailabilityZoneMixin(az_ext.AvailabilityZonePluginBase):
             agent_type = constants.AGENT_TYPE_L3
         else:
             return
-        query = context.session.query(Agent.availability_zone).filter_by(
-                    agent_type=agent_type).group_by(Agent.availability_zone)
-        query = query.filter(Agent.availability_zone.in_(availability_zones))
-        azs = [item[0] for item in query]
+        if cfg.CONF.agent_registry_ttl:
+            azs = _AGENT_REGISTRY.get_availability_zones(self, context,
+                                                         agent_type)
+        else:
+            query = context.session.query(Agent.availability_zone).filter_by(
+                        agent_type=agent_type).group_by(
+                            Agent.availability_zone)
+            query = query.filter(
+                Agent.availability_zone.in_(availability_zones))
+            azs = [item[0] for item in query]
         diff = set(availability_zones) - set(azs)
         if diff:
             raise az_ext.AvailabilityZoneNotFound(availability_zone=diff.pop())
@@ -197,7 +427,7 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
             LOG.debug('No enabled %(agent_type)s agent on host '
                       '%(host)s', {'agent_type': agent_type, 'host': host})
             return
-        if self.is_agent_down(agent.heartbeat_timestamp):
+        if not agent.is_active:
             LOG.warning(_LW('%(agent_type)s agent %(agent_id)s is not active'),
                         {'agent_type': agent_type, 'agent_id': agent.id})
         return agent
@@ -218,7 +448,7 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
 
     def _get_dict(self, agent_db, dict_name):
         try:
-            conf = jsonutils.loads(getattr(agent_db, dict_name))
+            conf = load_agent_dict(getattr(agent_db, dict_name))
         except Exception:
             msg = _LW('Dictionary %(dict_name)s for agent %(agent_type)s on '
                       'host %(host)s is invalid.')
@@ -243,6 +473,8 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
             ext_agent.RESOURCE_NAME + 's')
         res = dict((k, agent[k]) for k in attr
                    if k not in ['alive', 'configurations'])
+        res['heartbeat_timestamp'] = get_heartbeat_timestamp(
+            res['id'], res['heartbeat_timestamp'])
         res['alive'] = not self.is_agent_down(res['heartbeat_timestamp'])
         res['configurations'] = self._get_dict(agent, 'configurations')
         res['resource_versions'] = self._get_dict(agent, 'resource_versions')
@@ -253,18 +485,34 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
         with context.session.begin(subtransactions=True):
             agent = self._get_agent(context, id)
             context.session.delete(agent)
+        _HEARTBEATS.forget(id)
+        _AGENT_REGISTRY.invalidate()
 
     def update_agent(self, context, id, agent):
         agent_data = agent['agent']
         with context.session.begin(subtransactions=True):
             agent = self._get_agent(context, id)
             agent.update(agent_data)
+        _AGENT_REGISTRY.invalidate()
         return self._make_agent_dict(agent)
 
     def get_agents_db(self, context, filters=None):
         query = self._get_collection_query(context, Agent, filters=filters)
         return query.all()
 
+    def get_agents_by_type_and_host(self, context, agent_type, host):
+        """Return the dicts of the agents of a type running on a host.
+
+        The agents come from the registry of the process when
+        agent_registry_ttl is set.
+        """
+        if cfg.CONF.agent_registry_ttl:
+            return _AGENT_REGISTRY.get_agents_by_type_and_host(
+                self, context, agent_type, host)
+        return self.get_agents(context,
+                               filters={'agent_type': [agent_type],
+                                        'host': [host]})
+
     def get_agents(self, context, filters=None, fields=None):
         agents = self._get_collection(context, Agent,
                                       self._make_agent_dict,
@@ -313,15 +561,57 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
         return self._make_agent_dict(agent, fields)
 
     def _log_heartbeat(self, state, agent_db, agent_conf):
+        self._log_heartbeat_delta(state, agent_db.agent_type, agent_db.host,
+                                  agent_db.heartbeat_timestamp, agent_conf)
+
+    def _log_heartbeat_delta(self, state, agent_type, host, heartbeat,
+                             agent_conf):
         if agent_conf.get('log_agent_heartbeats'):
-            delta = timeutils.utcnow() - agent_db.heartbeat_timestamp
+            delta = timeutils.utcnow() - heartbeat
             LOG.info(_LI("Heartbeat received from %(type)s agent on "
                          "host %(host)s, uuid %(uuid)s after %(delta)s"),
-                     {'type': agent_db.agent_type,
-                      'host': agent_db.host,
+                     {'type': agent_type,
+                      'host': host,
                       'uuid': state.get('uuid'),
                       'delta': delta})
 
+    def _make_agent_state_res(self, agent_state):
+        res_keys = ['agent_type', 'binary', 'host', 'topic']
+        res = dict((k, agent_state[k]) for k in res_keys)
+        if 'availability_zone' in agent_state:
+            res['availability_zone'] = agent_state['availability_zone']
+        configurations_dict = agent_state.get('configurations', {})
+        res['configurations'] = jsonutils.dumps(configurations_dict)
+        resource_versions_dict = agent_state.get('resource_versions', {})
+        res['resource_versions'] = jsonutils.dumps(resource_versions_dict)
+        res['load'] = self._get_agent_load(agent_state)
+        return res
+
+    @staticmethod
+    def _get_agent_state_hash(res):
+        return hash(tuple(sorted(res.items())))
+
+    def _buffer_heartbeat(self, agent_state):
+        """Keep the heartbeat of an agent in memory when possible.
+
+        Returns the agent status when the heartbeat is buffered, None when it
+        must be written to the database.
+        """
+        if (not cfg.CONF.agent_heartbeat_flush_interval or
+                agent_state.get('start_flag')):
+            return
+        res = self._make_agent_state_res(agent_state)
+        previous = _HEARTBEATS.buffer(agent_state['agent_type'],
+                                      agent_state['host'],
+                                      self._get_agent_state_hash(res),
+                                      timeutils.utcnow())
+        if previous is None:
+            return
+        self._log_heartbeat_delta(agent_state, agent_state['agent_type'],
+                                  agent_state['host'], previous,
+                                  agent_state.get('configurations', {}))
+        return constants.AGENT_ALIVE
+
     def _create_or_update_agent(self, context, agent_state):
         """Registers new agent in the database or updates existing.
 
@@ -330,15 +620,9 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
         """
         status = constants.AGENT_ALIVE
         with context.session.begin(subtransactions=True):
-            res_keys = ['agent_type', 'binary', 'host', 'topic']
-            res = dict((k, agent_state[k]) for k in res_keys)
-            if 'availability_zone' in agent_state:
-                res['availability_zone'] = agent_state['availability_zone']
+            res = self._make_agent_state_res(agent_state)
+            state_hash = self._get_agent_state_hash(res)
             configurations_dict = agent_state.get('configurations', {})
-            res['configurations'] = jsonutils.dumps(configurations_dict)
-            resource_versions_dict = agent_state.get('resource_versions', {})
-            res['resource_versions'] = jsonutils.dumps(resource_versions_dict)
-            res['load'] = self._get_agent_load(agent_state)
             current_time = timeutils.utcnow()
             try:
                 agent_db = self._get_agent_by_type_and_host(
@@ -350,6 +634,9 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
                     res['started_at'] = current_time
                 greenthread.sleep(0)
                 self._log_heartbeat(agent_state, agent_db, configurations_dict)
+                changed = (status != constants.AGENT_ALIVE or
+                           any(agent_db[k] != v for k, v in res.items()
+                               if k != 'heartbeat_timestamp'))
                 agent_db.update(res)
             except ext_agent.AgentNotFoundByTypeHost:
                 greenthread.sleep(0)
@@ -361,12 +648,22 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
                 greenthread.sleep(0)
                 context.session.add(agent_db)
                 self._log_heartbeat(agent_state, agent_db, configurations_dict)
+                changed = True
                 status = constants.AGENT_NEW
             greenthread.sleep(0)
+        if changed:
+            _AGENT_REGISTRY.invalidate()
+        if cfg.CONF.agent_heartbeat_flush_interval and agent_db.id:
+            _HEARTBEATS.remember(agent_state['agent_type'],
+                                 agent_state['host'], agent_db.id,
+                                 state_hash, current_time)
         return status
 
     def create_or_update_agent(self, context, agent):
         """Create or update agent according to report."""
+        status = self._buffer_heartbeat(agent)
+        if status:
+            return status
         try:
             return self._create_or_update_agent(context, agent)
         except db_exc.DBDuplicateEntry:
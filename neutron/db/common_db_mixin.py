@@ -23,6 +23,7 @@ import six
 from sqlalchemy import and_
 from sqlalchemy.ext import associationproxy
 from sqlalchemy import or_
+from sqlalchemy import orm
 from sqlalchemy import sql
 
 from neutron._i18n import _, _LE
@@ -111,9 +112,17 @@ class CommonDbMixin(object):
     # TODO(salvatore-orlando): Avoid using class-level variables
     _dict_extend_functions = {}
 
+    # Attributes set by the dict extend functions registered with the
+    # attributes they provide, keyed by resource and function
+    _dict_extend_fields = {}
+
+    # Attributes of api resources copied unchanged from a column of the
+    # same name of their model, keyed by model
+    _plain_fields = {}
+
     @classmethod
     def register_model_query_hook(cls, model, name, query_hook, filter_hook,
-                                  result_filters=None):
+                                  result_filters=None, eager_loads=None):
         """Register a hook to be invoked when a query is executed.
 
         Add the hooks to the _model_query_hooks dict. Models are the keys
@@ -127,14 +136,39 @@ class CommonDbMixin(object):
 
         Filter hooks take as input the filter expression being built and return
         a transformed filter expression
+
+        Eager loads map names of relationships of the model to the attributes
+        of the API resource built from them. Collection queries eager load a
+        relationship only when one of these attributes is requested, and
+        leave it to be loaded lazily otherwise. Relationships mapped to no
+        attribute are always loaded lazily.
         """
         cls._model_query_hooks.setdefault(model, {})[name] = {
             'query': query_hook, 'filter': filter_hook,
-            'result_filters': result_filters}
+            'result_filters': result_filters,
+            'eager_loads': eager_loads or {}}
 
     @classmethod
-    def register_dict_extend_funcs(cls, resource, funcs):
+    def register_dict_extend_funcs(cls, resource, funcs, fields=None):
+        """Register functions extending the dicts of a resource.
+
+        When fields is given, the functions only set these attributes and
+        are not called when none of them is requested.
+        """
         cls._dict_extend_functions.setdefault(resource, []).extend(funcs)
+        if fields:
+            for func in funcs:
+                cls._dict_extend_fields[(resource, func)] = frozenset(fields)
+
+    @classmethod
+    def register_plain_fields(cls, model, fields):
+        """Register attributes of a resource which are plain columns.
+
+        Collections of the model restricted to these attributes are read
+        as rows of columns, skipping the construction of model instances,
+        the dict functions and the dict extend functions.
+        """
+        cls._plain_fields.setdefault(model, set()).update(fields)
 
     @property
     def safe_reference(self):
@@ -271,10 +305,55 @@ class CommonDbMixin(object):
                     query = result_filter(query, filters)
         return query
 
+    def _apply_eager_loads(self, query, model, fields=None):
+        if self._is_plain_projection(model, fields):
+            # The rows are read as columns, nothing is loaded
+            return query
+        # Several hooks can declare attributes built from one relationship
+        relationships = {}
+        for _name, hooks in six.iteritems(self._model_query_hooks.get(model,
+                                                                      {})):
+            for relationship, attrs in six.iteritems(
+                    hooks.get('eager_loads') or {}):
+                relationships.setdefault(relationship, set()).update(attrs)
+        for relationship, attrs in six.iteritems(relationships):
+            attribute = getattr(model, relationship)
+            if attrs and (not fields or not attrs.isdisjoint(fields)):
+                query = query.options(orm.joinedload(attribute))
+            else:
+                query = query.options(orm.lazyload(attribute))
+        return query
+
+    def _is_plain_projection(self, model, fields):
+        return bool(fields) and set(fields).issubset(
+            self._plain_fields.get(model, ()))
+
+    def _get_plain_collection(self, query, model, fields):
+        # Unlike model instances, the rows are not made unique when the
+        # query joins a collection.
+        columns = ['id'] + [field for field in fields if field != 'id']
+        query = query.with_entities(*[getattr(model, column)
+                                      for column in columns])
+        seen = set()
+        items = []
+        for row in query:
+            if row[0] in seen:
+                continue
+            seen.add(row[0])
+            item = dict(zip(columns, row))
+            items.append(self._fields(item, fields))
+        return items
+
     def _apply_dict_extend_functions(self, resource_type,
-                                     response, db_object):
+                                     response, db_object, fields=None,
+                                     exclude=()):
         for func in self._dict_extend_functions.get(
             resource_type, []):
+            if func in exclude:
+                continue
+            provided = self._dict_extend_fields.get((resource_type, func))
+            if fields and provided and provided.isdisjoint(fields):
+                continue
             args = (response, db_object)
             if isinstance(func, six.string_types):
                 func = getattr(self, func, None)
@@ -286,10 +365,11 @@ class CommonDbMixin(object):
 
     def _get_collection_query(self, context, model, filters=None,
                               sorts=None, limit=None, marker_obj=None,
-                              page_reverse=False):
+                              page_reverse=False, fields=None):
         collection = self._model_query(context, model)
         collection = self._apply_filters_to_query(collection, model, filters,
                                                   context)
+        collection = self._apply_eager_loads(collection, model, fields)
         if limit and page_reverse and sorts:
             sorts = [(s[0], not s[1]) for s in sorts]
         collection = sqlalchemyutils.paginate_query(collection, model, limit,
@@ -304,8 +384,12 @@ class CommonDbMixin(object):
                                            sorts=sorts,
                                            limit=limit,
                                            marker_obj=marker_obj,
-                                           page_reverse=page_reverse)
-        items = [dict_func(c, fields) for c in query]
+                                           page_reverse=page_reverse,
+                                           fields=fields)
+        if self._is_plain_projection(model, fields):
+            items = self._get_plain_collection(query, model, fields)
+        else:
+            items = [dict_func(c, fields) for c in query]
         if limit and page_reverse:
             items.reverse()
         return items
@@ -25,6 +25,7 @@ from neutron.common import exceptions as n_exc
 from neutron.common import utils
 from neutron.db import common_db_mixin
 from neutron.db import models_v2
+from neutron.db import network_changes_db
 
 LOG = logging.getLogger(__name__)
 
@@ -73,6 +74,37 @@ class DbBasePluginCommon(common_db_mixin.CommonDbMixin):
     backends.
     """
 
+    # The attributes below are copied unchanged from the columns by the
+    # _make_*_dict functions, and the relationships are only read to build
+    # the attributes they are registered with.
+    common_db_mixin.CommonDbMixin.register_plain_fields(
+        models_v2.Network,
+        ['id', 'name', 'tenant_id', 'admin_state_up', 'status'])
+    common_db_mixin.CommonDbMixin.register_plain_fields(
+        models_v2.Subnet,
+        ['id', 'name', 'tenant_id', 'network_id', 'ip_version', 'cidr',
+         'subnetpool_id', 'gateway_ip', 'enable_dhcp', 'ipv6_ra_mode',
+         'ipv6_address_mode'])
+    common_db_mixin.CommonDbMixin.register_plain_fields(
+        models_v2.Port,
+        ['id', 'name', 'network_id', 'tenant_id', 'mac_address',
+         'admin_state_up', 'status', 'device_id', 'device_owner'])
+
+    common_db_mixin.CommonDbMixin.register_model_query_hook(
+        models_v2.Network,
+        "network_subnets",
+        None,
+        None,
+        eager_loads={'subnets': ('subnets',)})
+    common_db_mixin.CommonDbMixin.register_model_query_hook(
+        models_v2.Subnet,
+        "subnet_details",
+        None,
+        None,
+        eager_loads={'allocation_pools': ('allocation_pools',),
+                     'dns_nameservers': ('dns_nameservers',),
+                     'routes': ('host_routes',)})
+
     @staticmethod
     def _generate_mac():
         return utils.get_random_mac(cfg.CONF.base_mac.split(':'))
@@ -90,6 +122,8 @@ class DbBasePluginCommon(common_db_mixin.CommonDbMixin):
             network_id=network_id,
             ip_address=ip_address,
             subnet_id=subnet_id).delete()
+        # The bulk delete is not seen by the network changes listener
+        network_changes_db.record_change(context.session, network_id)
 
     @staticmethod
     def _store_ip_allocation(context, ip_address, network_id, subnet_id,
@@ -122,23 +156,29 @@ class DbBasePluginCommon(common_db_mixin.CommonDbMixin):
                'ip_version': subnet['ip_version'],
                'cidr': subnet['cidr'],
                'subnetpool_id': subnet.get('subnetpool_id'),
-               'allocation_pools': [{'start': pool['first_ip'],
-                                     'end': pool['last_ip']}
-                                    for pool in subnet['allocation_pools']],
                'gateway_ip': subnet['gateway_ip'],
                'enable_dhcp': subnet['enable_dhcp'],
                'ipv6_ra_mode': subnet['ipv6_ra_mode'],
                'ipv6_address_mode': subnet['ipv6_address_mode'],
-               'dns_nameservers': [dns['address']
-                                   for dns in subnet['dns_nameservers']],
-               'host_routes': [{'destination': route['destination'],
-                                'nexthop': route['nexthop']}
-                               for route in subnet['routes']],
                }
+        # The relationships are not loaded when their attributes are not
+        # requested
+        if not fields or 'allocation_pools' in fields:
+            res['allocation_pools'] = [{'start': pool['first_ip'],
+                                        'end': pool['last_ip']}
+                                       for pool in subnet['allocation_pools']]
+        if not fields or 'dns_nameservers' in fields:
+            res['dns_nameservers'] = [dns['address']
+                                      for dns in subnet['dns_nameservers']]
+        if not fields or 'host_routes' in fields:
+            res['host_routes'] = [{'destination': route['destination'],
+                                   'nexthop': route['nexthop']}
+                                  for route in subnet['routes']]
         # The shared attribute for a subnet is the same as its parent network
         res['shared'] = self._is_network_shared(context, subnet.networks)
         # Call auxiliary extend functions, if any
-        self._apply_dict_extend_functions(attributes.SUBNETS, res, subnet)
+        self._apply_dict_extend_functions(attributes.SUBNETS, res, subnet,
+                                          fields)
         return self._fields(res, fields)
 
     def _make_subnetpool_dict(self, subnetpool, fields=None):
@@ -186,7 +226,7 @@ class DbBasePluginCommon(common_db_mixin.CommonDbMixin):
         # Call auxiliary extend functions, if any
         if process_extensions:
             self._apply_dict_extend_functions(
-                attributes.PORTS, res, port)
+                attributes.PORTS, res, port, fields)
         return self._fields(res, fields)
 
     def _get_network(self, context, id):
@@ -274,14 +314,15 @@ class DbBasePluginCommon(common_db_mixin.CommonDbMixin):
                'tenant_id': network['tenant_id'],
                'admin_state_up': network['admin_state_up'],
                'mtu': network.get('mtu', constants.DEFAULT_NETWORK_MTU),
-               'status': network['status'],
-               'subnets': [subnet['id']
-                           for subnet in network['subnets']]}
+               'status': network['status']}
+        # The subnets are not loaded when they are not requested
+        if not fields or 'subnets' in fields:
+            res['subnets'] = [subnet['id'] for subnet in network['subnets']]
         res['shared'] = self._is_network_shared(context, network)
         # Call auxiliary extend functions, if any
         if process_extensions:
             self._apply_dict_extend_functions(
-                attributes.NETWORKS, res, network)
+                attributes.NETWORKS, res, network, fields)
         return self._fields(res, fields)
 
     def _is_network_shared(self, context, network):
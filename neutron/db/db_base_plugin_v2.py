@@ -42,10 +42,12 @@ from neutron.db import db_base_plugin_common
 from neutron.db import ipam_non_pluggable_backend
 from neutron.db import ipam_pluggable_backend
 from neutron.db import models_v2
+from neutron.db import network_changes_db
 from neutron.db import rbac_db_mixin as rbac_mixin
 from neutron.db import rbac_db_models as rbac_db
 from neutron.db import sqlalchemyutils
 from neutron.db import standardattrdescription_db as stattr_db
+from neutron.db import subnetpool_index_db
 from neutron.extensions import l3
 from neutron import ipam
 from neutron.ipam import subnet_alloc
@@ -100,6 +102,7 @@ class NeutronDbPluginV2(db_base_plugin_common.DbBasePluginCommon,
 
     def __init__(self):
         self.set_ipam_backend()
+        network_changes_db.register_db_events()
         if cfg.CONF.notify_nova_on_port_status_changes:
             # NOTE(arosen) These event listeners are here to hook into when
             # port status changes and notify nova about their change.
@@ -877,11 +880,20 @@ class NeutronDbPluginV2(db_base_plugin_common.DbBasePluginCommon,
                               'subnet': id})
                     raise n_exc.SubnetInUse(subnet_id=id)
 
+            self._release_subnetpool_prefix(context, subnet)
             context.session.delete(subnet)
             # Delete related ipam subnet manually,
             # since there is no FK relationship
             self.ipam.delete_subnet(context, id)
 
+    def _release_subnetpool_prefix(self, context, subnet):
+        subnetpool_id = subnet['subnetpool_id']
+        if not subnetpool_id or subnetpool_id == constants.IPV6_PD_POOL_ID:
+            return
+        subnetpool = self._get_subnetpool(context, subnetpool_id)
+        allocator = subnet_alloc.SubnetAllocator(subnetpool, context)
+        allocator.remove_subnet(subnet['id'])
+
     def get_subnet(self, context, id, fields=None):
         subnet = self._get_subnet(context, id)
         return self._make_subnet_dict(subnet, fields, context=context)
@@ -1018,6 +1030,8 @@ class NeutronDbPluginV2(db_base_plugin_common.DbBasePluginCommon,
                 model_prefix = models_v2.SubnetPoolPrefix(cidr=prefix,
                                                       subnetpool_id=id)
                 context.session.add(model_prefix)
+            # The free prefixes are built again from the new prefixes
+            subnetpool_index_db.invalidate_index(context, id)
 
     def _updated_subnetpool_dict(self, model, new_pool):
         updated = {}
@@ -1208,7 +1222,7 @@ class NeutronDbPluginV2(db_base_plugin_common.DbBasePluginCommon,
         db_port = self.create_port_db(context, port)
         return self._make_port_dict(db_port, process_extensions=False)
 
-    def create_port_db(self, context, port):
+    def create_port_db(self, context, port, allocated_ips=None):
         p = port['port']
         port_id = p.get('id') or uuidutils.generate_uuid()
         network_id = p['network_id']
@@ -1245,8 +1259,8 @@ class NeutronDbPluginV2(db_base_plugin_common.DbBasePluginCommon,
                 db_port = self._create_port_with_mac(
                     context, network_id, port_data, p['mac_address'])
 
-            ips = self.ipam.allocate_ips_for_port_and_store(context, port,
-                                                            port_id)
+            ips = self.ipam.allocate_ips_for_port_and_store(
+                context, port, port_id, allocated_ips=allocated_ips)
             if ('dns-integration' in self.supported_extension_aliases and
                 'dns_name' in p):
                 dns_assignment = []
@@ -1349,7 +1363,7 @@ class NeutronDbPluginV2(db_base_plugin_common.DbBasePluginCommon,
         return self._make_port_dict(port, fields)
 
     def _get_ports_query(self, context, filters=None, sorts=None, limit=None,
-                         marker_obj=None, page_reverse=False):
+                         marker_obj=None, page_reverse=False, fields=None):
         Port = models_v2.Port
         IPAllocation = models_v2.IPAllocation
 
@@ -1369,6 +1383,7 @@ class NeutronDbPluginV2(db_base_plugin_common.DbBasePluginCommon,
                 query = query.filter(IPAllocation.subnet_id.in_(subnet_ids))
 
         query = self._apply_filters_to_query(query, Port, filters, context)
+        query = self._apply_eager_loads(query, Port, fields)
         if limit and page_reverse and sorts:
             sorts = [(s[0], not s[1]) for s in sorts]
         query = sqlalchemyutils.paginate_query(query, Port, limit,
@@ -1382,14 +1397,18 @@ class NeutronDbPluginV2(db_base_plugin_common.DbBasePluginCommon,
         query = self._get_ports_query(context, filters=filters,
                                       sorts=sorts, limit=limit,
                                       marker_obj=marker_obj,
-                                      page_reverse=page_reverse)
-        items = []
-        for c in query:
-            if (('dns-integration' in self.supported_extension_aliases and
-                 'dns_name' in c)):
-                c['dns_assignment'] = self._get_dns_name_for_port_get(context,
-                                                                      c)
-            items.append(self._make_port_dict(c, fields))
+                                      page_reverse=page_reverse,
+                                      fields=fields)
+        if self._is_plain_projection(models_v2.Port, fields):
+            items = self._get_plain_collection(query, models_v2.Port, fields)
+        else:
+            items = []
+            for c in query:
+                if (('dns-integration' in self.supported_extension_aliases
+                     and 'dns_name' in c)):
+                    c['dns_assignment'] = self._get_dns_name_for_port_get(
+                        context, c)
+                items.append(self._make_port_dict(c, fields))
         if limit and page_reverse:
             items.reverse()
         return items
@@ -150,4 +150,12 @@ class ExtraDhcpOptMixin(object):
         return res
 
     db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_funcs(
-        attributes.PORTS, ['_extend_port_dict_extra_dhcp_opt'])
+        attributes.PORTS, ['_extend_port_dict_extra_dhcp_opt'],
+        fields=[edo_ext.EXTRADHCPOPTS])
+
+    db_base_plugin_v2.NeutronDbPluginV2.register_model_query_hook(
+        models_v2.Port,
+        "extra_dhcp_opts",
+        None,
+        None,
+        eager_loads={'dhcp_opts': (edo_ext.EXTRADHCPOPTS,)})
@@ -20,6 +20,7 @@ import netaddr
 from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_log import log as logging
+import six
 from sqlalchemy.orm import exc as orm_exc
 
 from neutron._i18n import _, _LI
@@ -414,6 +415,70 @@ class IpamBackendMixin(db_base_plugin_common.DbBasePluginCommon):
                             original=prev_ips,
                             remove=remove_ips)
 
+    def _allocate_ips_bulk(self, context, subnet_groups, count):
+        """Allocate an IP address from each group of subnets for many ports.
+
+        Returns up to count lists holding one IP dict per subnet group. The
+        ports left without addresses are allocated the usual way.
+        """
+        return []
+
+    def _deallocate_ips_bulk(self, context, allocations):
+        """Release addresses returned by _allocate_ips_bulk."""
+        pass
+
+    def allocate_ips_for_ports(self, context, ports):
+        """Allocate the IP addresses of several new ports at once.
+
+        Only the networks on which none of the ports specifies fixed_ips and
+        without IPv6 auto-address subnets are handled. Returns a list with
+        an item per port: the allocated IP dicts, or None when the port has
+        to be allocated its addresses by allocate_ips_for_port_and_store.
+        """
+        results = [None] * len(ports)
+        network_ports = collections.defaultdict(list)
+        # The addresses requested explicitly might be the ones which would
+        # be allocated in bulk
+        fixed_networks = set()
+        for index, port in enumerate(ports):
+            p = port['port']
+            if (p.get('fixed_ips', attributes.ATTR_NOT_SPECIFIED) is
+                    attributes.ATTR_NOT_SPECIFIED):
+                network_ports[p['network_id']].append(index)
+            else:
+                fixed_networks.add(p['network_id'])
+
+        for network_id, indexes in six.iteritems(network_ports):
+            if len(indexes) < 2 or network_id in fixed_networks:
+                continue
+            subnets = self._get_subnets(context,
+                                        filters={'network_id': [network_id]})
+            if any(ipv6_utils.is_auto_address_subnet(subnet)
+                   for subnet in subnets):
+                continue
+            subnet_groups = [group for group in (
+                [subnet for subnet in subnets if subnet['ip_version'] == 4],
+                [subnet for subnet in subnets if subnet['ip_version'] == 6])
+                if group]
+            if subnet_groups:
+                allocations = self._allocate_ips_bulk(context, subnet_groups,
+                                                      len(indexes))
+            else:
+                allocations = [[] for index in indexes]
+            LOG.debug("Allocated the IP addresses of %(count)d of "
+                      "%(total)d ports on network %(network_id)s in bulk",
+                      {'count': len(allocations), 'total': len(indexes),
+                       'network_id': network_id})
+            for index, ips in zip(indexes, allocations):
+                results[index] = ips
+        return results
+
+    def deallocate_ips_for_ports(self, context, allocations):
+        """Release the addresses returned by allocate_ips_for_ports."""
+        allocations = [ips for ips in allocations if ips]
+        if allocations:
+            self._deallocate_ips_bulk(context, allocations)
+
     def delete_port(self, context, port_id):
         query = (context.session.query(models_v2.Port).
                  enable_eagerloads(False).filter_by(id=port_id))
@@ -199,9 +199,57 @@ class IpamNonPluggableBackend(ipam_backend_mixin.IpamBackendMixin):
                 last_ip=last_ip)
             context.session.add(ip_range)
 
-    def allocate_ips_for_port_and_store(self, context, port, port_id):
+    @staticmethod
+    def _lock_availability_ranges(context, subnets):
+        range_qry = context.session.query(
+            models_v2.IPAvailabilityRange).join(
+                models_v2.IPAllocationPool).with_lockmode('update')
+        return [(subnet['id'], ip_range) for subnet in subnets
+                for ip_range in range_qry.filter_by(subnet_id=subnet['id'])]
+
+    @staticmethod
+    def _range_size(ip_range):
+        return (int(netaddr.IPAddress(ip_range['last_ip'])) -
+                int(netaddr.IPAddress(ip_range['first_ip'])) + 1)
+
+    def _allocate_ips_bulk(self, context, subnet_groups, count):
+        """Allocate addresses for many ports from the availability ranges.
+
+        The ranges are not rebuilt: the ports which cannot be served from
+        the current ranges are left to the single port allocation.
+        """
+        group_ranges = [self._lock_availability_ranges(context, subnets)
+                        for subnets in subnet_groups]
+        for ranges in group_ranges:
+            count = min(count, sum(self._range_size(ip_range)
+                                   for subnet_id, ip_range in ranges))
+        allocations = [[] for i in range(count)]
+        for ranges in group_ranges:
+            index = 0
+            for subnet_id, ip_range in ranges:
+                if index == count:
+                    break
+                size = self._range_size(ip_range)
+                taken = min(count - index, size)
+                first_ip = netaddr.IPAddress(ip_range['first_ip'])
+                for i in range(taken):
+                    allocations[index + i].append(
+                        {'ip_address': str(first_ip + i),
+                         'subnet_id': subnet_id})
+                index += taken
+                if taken == size:
+                    context.session.delete(ip_range)
+                else:
+                    ip_range['first_ip'] = str(first_ip + taken)
+        return allocations
+
+    def allocate_ips_for_port_and_store(self, context, port, port_id,
+                                        allocated_ips=None):
         network_id = port['port']['network_id']
-        ips = self._allocate_ips_for_port(context, port)
+        if allocated_ips is None:
+            ips = self._allocate_ips_for_port(context, port)
+        else:
+            ips = allocated_ips
         if ips:
             for ip in ips:
                 ip_address = ip['ip_address']
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import itertools
+
 import netaddr
 from oslo_db import exception as db_exc
 from oslo_log import log as logging
@@ -149,7 +151,50 @@ class IpamPluggableBackend(ipam_backend_mixin.IpamBackendMixin):
         ipam_driver = driver.Pool.get_instance(None, context)
         ipam_driver.remove_subnet(subnet_id)
 
-    def allocate_ips_for_port_and_store(self, context, port, port_id):
+    def _allocate_ips_bulk(self, context, subnet_groups, count):
+        """Allocate addresses for many ports with a bulk IPAM request.
+
+        Nothing is allocated when the IPAM driver does not support bulk
+        requests or no subnet of a group has enough free addresses.
+        """
+        ipam_driver = driver.Pool.get_instance(None, context)
+        request = ipam_req.BulkAddressRequest(count)
+        allocated = []
+        try:
+            for subnets in subnet_groups:
+                for subnet in subnets:
+                    ipam_subnet = ipam_driver.get_subnet(subnet['id'])
+                    try:
+                        ip_addresses = ipam_subnet.bulk_allocate(request)
+                    except ipam_exc.IpAddressGenerationFailure:
+                        continue
+                    allocated.append([{'ip_address': ip_address,
+                                       'subnet_id': subnet['id']}
+                                      for ip_address in ip_addresses])
+                    break
+                else:
+                    raise ipam_exc.IpAddressGenerationFailure(
+                        subnet_id=subnets[0]['id'])
+        except (NotImplementedError, ipam_exc.IpAddressGenerationFailure):
+            LOG.debug("Bulk IP allocation not possible, the addresses are "
+                      "allocated port by port")
+            if allocated:
+                self._ipam_deallocate_ips(
+                    context, ipam_driver, None,
+                    list(itertools.chain.from_iterable(allocated)),
+                    revert_on_fail=False)
+            return []
+        return [list(ips) for ips in zip(*allocated)]
+
+    def _deallocate_ips_bulk(self, context, allocations):
+        ipam_driver = driver.Pool.get_instance(None, context)
+        self._ipam_deallocate_ips(
+            context, ipam_driver, None,
+            list(itertools.chain.from_iterable(allocations)),
+            revert_on_fail=False)
+
+    def allocate_ips_for_port_and_store(self, context, port, port_id,
+                                        allocated_ips=None):
         # Make a copy of port dict to prevent changing
         # incoming dict by adding 'id' to it.
         # Deepcopy doesn't work correctly in this case, because copy of
@@ -160,7 +205,11 @@ class IpamPluggableBackend(ipam_backend_mixin.IpamBackendMixin):
         network_id = port_copy['port']['network_id']
         ips = []
         try:
-            ips = self._allocate_ips_for_port(context, port_copy)
+            if allocated_ips is None:
+                ips = self._allocate_ips_for_port(context, port_copy)
+            else:
+                # Released by the caller of allocate_ips_for_ports on error
+                ips = allocated_ips
             for ip in ips:
                 ip_address = ip['ip_address']
                 subnet_id = ip['subnet_id']
@@ -170,7 +219,7 @@ class IpamPluggableBackend(ipam_backend_mixin.IpamBackendMixin):
             return ips
         except Exception:
             with excutils.save_and_reraise_exception():
-                if ips:
+                if ips and allocated_ips is None:
                     LOG.debug("An exception occurred during port creation. "
                               "Reverting IP allocation")
                     ipam_driver = driver.Pool.get_instance(None, context)
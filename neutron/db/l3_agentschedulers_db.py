@@ -513,8 +513,42 @@ class L3AgentSchedulerDbMixin(l3agentscheduler.L3AgentSchedulerPluginBase,
 
     def schedule_routers(self, context, routers):
         """Schedule the routers to l3 agents."""
-        for router in routers:
-            self.schedule_router(context, router, candidates=None)
+        if self.router_scheduler:
+            self.router_scheduler.schedule_routers(self, context, routers)
+
+    def rebalance_routers(self, context, dry_run=False):
+        """Move routers between l3 agents to even out their router counts.
+
+        Returns the planned moves, which are only applied when dry_run is
+        False.
+        """
+        if not self.router_scheduler:
+            return []
+        plan = self.router_scheduler.plan_rebalance(self, context)
+        moves = []
+        for router_id, old_agent, new_agent in plan:
+            if not dry_run:
+                try:
+                    self._move_router(context, router_id, old_agent,
+                                      new_agent)
+                except (l3agentscheduler.RouterReschedulingFailed,
+                        oslo_messaging.RemoteError):
+                    LOG.exception(_LE("Failed to move router %(router)s to "
+                                      "agent %(agent)s"),
+                                  {'router': router_id,
+                                   'agent': new_agent.id})
+                    continue
+            moves.append({'router_id': router_id,
+                          'from_agent_id': old_agent.id,
+                          'to_agent_id': new_agent.id})
+        return moves
+
+    def _move_router(self, context, router_id, old_agent, new_agent):
+        with context.session.begin(subtransactions=True):
+            self._unbind_router(context, router_id, old_agent.id)
+            self.router_scheduler.bind_router(context, router_id, new_agent)
+        self._notify_agents_router_rescheduled(context, router_id,
+                                               [old_agent], [new_agent])
 
     def get_l3_agent_with_min_routers(self, context, agent_ids):
         """Return l3 agent with the least number of routers."""
@@ -13,7 +13,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 from oslo_log import log as logging
+import six
 from sqlalchemy import or_
 
 from neutron.callbacks import events
@@ -162,19 +165,20 @@ class L3_DVRsch_db_mixin(l3agent_sch_db.L3AgentSchedulerDbMixin):
             return []
         agent = self._get_agent_by_type_and_host(
             context, n_const.AGENT_TYPE_L3, port_host)
+        # not removing from the agent hosting SNAT for the router
+        query = context.session.query(
+            l3agent_sch_db.RouterL3AgentBinding.router_id).filter(
+                l3agent_sch_db.RouterL3AgentBinding.router_id.in_(router_ids),
+                l3agent_sch_db.RouterL3AgentBinding.l3_agent_id == agent.id)
+        router_ids = set(router_ids) - set(item[0] for item in query)
+        router_subnet_ids = self._get_router_subnet_ids(admin_context,
+                                                        router_ids)
+        host_subnet_ids = self._get_dvr_serviceable_subnet_ids_on_host(
+            admin_context, port_host,
+            set().union(*router_subnet_ids.values()))
         removed_router_info = []
         for router_id in router_ids:
-            snat_binding = context.session.query(
-                l3agent_sch_db.RouterL3AgentBinding).filter_by(
-                    router_id=router_id).filter_by(
-                        l3_agent_id=agent.id).first()
-            if snat_binding:
-                # not removing from the agent hosting SNAT for the router
-                continue
-            subnet_ids = self.get_subnet_ids_on_router(admin_context,
-                                                       router_id)
-            if self._check_dvr_serviceable_ports_on_host(
-                    admin_context, port_host, subnet_ids):
+            if router_subnet_ids[router_id] & host_subnet_ids:
                 continue
             filter_rtr = {'device_id': [router_id],
                           'device_owner':
@@ -229,23 +233,77 @@ class L3_DVRsch_db_mixin(l3agent_sch_db.L3AgentSchedulerDbMixin):
         get a set of hosts where all dvr serviceable ports on those subnets
         are bound
         """
-        subnet_ids = self.get_subnet_ids_on_router(context, router_id)
+        hosts = list(self._get_dvr_hosts_for_routers(
+            context, [router_id])[router_id])
+        LOG.debug('Hosts for router %s: %s', router_id, hosts)
+        return hosts
+
+    def _get_dvr_hosts_for_routers(self, context, router_ids):
+        """Map each DVR router to the hosts where it should be hosted.
+
+        The subnets of all the routers and the hosts of the dvr serviceable
+        ports on these subnets are each fetched with a single query.
+        """
+        router_subnet_ids = self._get_router_subnet_ids(context, router_ids)
+        subnet_ids = set().union(*router_subnet_ids.values())
+        subnet_hosts = collections.defaultdict(set)
+        if subnet_ids:
+            Binding = ml2_models.PortBinding
+            IPAllocation = models_v2.IPAllocation
+
+            query = context.session.query(
+                IPAllocation.subnet_id, Binding.host).distinct()
+            query = query.select_from(Binding).join(Binding.port)
+            query = query.join(models_v2.Port.fixed_ips)
+            query = query.filter(IPAllocation.subnet_id.in_(subnet_ids))
+            query = query.filter(self._get_dvr_serviceable_owner_filter())
+            for subnet_id, host in query:
+                subnet_hosts[subnet_id].add(host)
+        router_hosts = collections.defaultdict(set)
+        for router_id in router_ids:
+            for subnet_id in router_subnet_ids[router_id]:
+                router_hosts[router_id] |= subnet_hosts[subnet_id]
+        return router_hosts
+
+    def _get_router_subnet_ids(self, context, router_ids):
+        """Map each router to the IDs of the subnets it is connected to."""
+        router_subnet_ids = collections.defaultdict(set)
+        if not router_ids:
+            return router_subnet_ids
+        query = context.session.query(
+            models_v2.Port.device_id, models_v2.IPAllocation.subnet_id)
+        query = query.join(models_v2.Port.fixed_ips)
+        query = query.filter(models_v2.Port.device_id.in_(router_ids))
+        for router_id, subnet_id in query:
+            router_subnet_ids[router_id].add(subnet_id)
+        return router_subnet_ids
+
+    @staticmethod
+    def _get_dvr_serviceable_owner_filter():
+        return or_(
+            models_v2.Port.device_owner.startswith(
+                n_const.DEVICE_OWNER_COMPUTE_PREFIX),
+            models_v2.Port.device_owner.in_(
+                n_utils.get_other_dvr_serviced_device_owners()))
+
+    def _get_dvr_serviceable_subnet_ids_on_host(self, context, host,
+                                                subnet_ids):
+        """Return the subnets among subnet_ids with dvr serviceable ports
+        on the host, or migrating to it.
+        """
+        if not subnet_ids:
+            return set()
         Binding = ml2_models.PortBinding
-        Port = models_v2.Port
         IPAllocation = models_v2.IPAllocation
 
-        query = context.session.query(Binding.host).distinct()
-        query = query.join(Binding.port)
-        query = query.join(Port.fixed_ips)
+        query = context.session.query(IPAllocation.subnet_id).distinct()
+        query = query.select_from(Binding).join(Binding.port)
+        query = query.join(models_v2.Port.fixed_ips)
         query = query.filter(IPAllocation.subnet_id.in_(subnet_ids))
-        owner_filter = or_(
-            Port.device_owner.startswith(n_const.DEVICE_OWNER_COMPUTE_PREFIX),
-            Port.device_owner.in_(
-                n_utils.get_other_dvr_serviced_device_owners()))
-        query = query.filter(owner_filter)
-        hosts = [item[0] for item in query]
-        LOG.debug('Hosts for router %s: %s', router_id, hosts)
-        return hosts
+        query = query.filter(self._get_dvr_serviceable_owner_filter())
+        query = query.filter(or_(Binding.host == host,
+                                 Binding.profile.contains(host)))
+        return set(item[0] for item in query)
 
     def _get_dvr_subnet_ids_on_host_query(self, context, host):
         query = context.session.query(
@@ -292,14 +350,15 @@ class L3_DVRsch_db_mixin(l3agent_sch_db.L3AgentSchedulerDbMixin):
                 result_set |= set(self._get_dvr_router_ids_for_host(
                     context, agent_db['host']))
             else:
-                for router_id in (router_ids - result_set):
-                    subnet_ids = self.get_subnet_ids_on_router(
-                        context, router_id)
-                    if (subnet_ids and
-                            self._check_dvr_serviceable_ports_on_host(
-                                    context, agent_db['host'],
-                                    list(subnet_ids))):
-                        result_set.add(router_id)
+                router_subnet_ids = self._get_router_subnet_ids(
+                    context, router_ids - result_set)
+                host_subnet_ids = self._get_dvr_serviceable_subnet_ids_on_host(
+                    context, agent_db['host'],
+                    set().union(*router_subnet_ids.values()))
+                result_set |= set(
+                    router_id for router_id, subnet_ids in
+                    six.iteritems(router_subnet_ids)
+                    if subnet_ids & host_subnet_ids)
 
         return list(result_set)
 
@@ -13,6 +13,7 @@
 # under the License.
 #
 
+import collections
 import functools
 
 import netaddr
@@ -693,13 +694,27 @@ class L3_HA_NAT_db_mixin(l3_dvr_db.L3_NAT_with_dvr_db_mixin,
 
     @classmethod
     def _set_router_states(cls, context, bindings, states):
+        """Set the state of the bindings, with one update per state."""
+        port_ids = collections.defaultdict(list)
+        updated = []
         for binding in bindings:
             try:
-                with context.session.begin(subtransactions=True):
-                    binding.state = states[binding.router_id]
+                state = states[binding.router_id]
+                port_ids[state].append(binding.port_id)
             except (orm.exc.StaleDataError, orm.exc.ObjectDeletedError):
                 # Take concurrently deleted routers in to account
-                pass
+                continue
+            updated.append((binding, state))
+        if not updated:
+            return
+        with context.session.begin(subtransactions=True):
+            for state, state_port_ids in port_ids.items():
+                context.session.query(L3HARouterAgentPortBinding).filter(
+                    L3HARouterAgentPortBinding.port_id.in_(
+                        state_port_ids)).update(
+                            {'state': state}, synchronize_session=False)
+        for binding, state in updated:
+            orm.attributes.set_committed_value(binding, 'state', state)
 
     def update_routers_states(self, context, states, host):
         """Receive dict of router ID to state and update them all."""
@@ -710,14 +725,20 @@ class L3_HA_NAT_db_mixin(l3_dvr_db.L3_NAT_with_dvr_db_mixin,
         self._update_router_port_bindings(context, states, host)
 
     def _update_router_port_bindings(self, context, states, host):
+        active_router_ids = [
+            router_id for router_id, state in states.items()
+            if state == constants.HA_ROUTER_STATE_ACTIVE]
+        if not active_router_ids:
+            return
         admin_ctx = context.elevated()
-        device_filter = {'device_id': states.keys(),
+        device_filter = {'device_id': active_router_ids,
                          'device_owner':
                          [constants.DEVICE_OWNER_ROUTER_INTF,
                           constants.DEVICE_OWNER_ROUTER_SNAT]}
         ports = self._core_plugin.get_ports(admin_ctx, filters=device_filter)
+        # Only the ports bound to another host need to be updated
         active_ports = (port for port in ports
-            if states[port['device_id']] == constants.HA_ROUTER_STATE_ACTIVE)
+                        if port.get(portbindings.HOST_ID) != host)
 
         for port in active_ports:
             port[portbindings.HOST_ID] = host
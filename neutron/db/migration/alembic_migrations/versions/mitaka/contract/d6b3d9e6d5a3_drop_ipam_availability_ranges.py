@@ -0,0 +1,32 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Drop IPAM availability ranges
+
+Revision ID: d6b3d9e6d5a3
+Revises: 4ffceebfcdc
+Create Date: 2016-03-10 14:21:37.486112
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'd6b3d9e6d5a3'
+down_revision = '4ffceebfcdc'
+
+from alembic import op
+
+
+def upgrade():
+    op.drop_table('ipamavailabilityranges')
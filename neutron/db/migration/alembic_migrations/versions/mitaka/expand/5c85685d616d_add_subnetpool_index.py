@@ -0,0 +1,57 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add subnet pool free prefixes and tenant usages
+
+Revision ID: 5c85685d616d
+Revises: a0033bf3dcd5
+Create Date: 2016-03-18 10:41:27.503190
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c85685d616d'
+down_revision = 'a0033bf3dcd5'
+
+
+def upgrade():
+    op.create_table(
+        'subnetpoolindexes',
+        sa.Column('subnetpool_id', sa.String(length=36), nullable=False),
+        sa.ForeignKeyConstraint(['subnetpool_id'], ['subnetpools.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('subnetpool_id'))
+    op.create_table(
+        'subnetpoolfreeprefixes',
+        sa.Column('subnetpool_id', sa.String(length=36), nullable=False),
+        sa.Column('cidr', sa.String(length=64), nullable=False),
+        sa.Column('prefixlen', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['subnetpool_id'], ['subnetpools.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('subnetpool_id', 'cidr'),
+        sa.Index('ix_subnetpoolfreeprefixes_subnetpool_id_prefixlen',
+                 'subnetpool_id', 'prefixlen'))
+    op.create_table(
+        'subnetpooltenantusages',
+        sa.Column('subnetpool_id', sa.String(length=36), nullable=False),
+        sa.Column('tenant_id', sa.String(length=255), nullable=False),
+        sa.Column('used', sa.Float(precision=53), nullable=False),
+        sa.ForeignKeyConstraint(['subnetpool_id'], ['subnetpools.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('subnetpool_id', 'tenant_id'))
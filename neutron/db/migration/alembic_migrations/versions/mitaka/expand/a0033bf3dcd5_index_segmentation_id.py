@@ -0,0 +1,35 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Index the segmentation id of network segments
+
+Revision ID: a0033bf3dcd5
+Revises: a8b517cff8ab
+Create Date: 2016-03-16 15:27:05.718344
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0033bf3dcd5'
+down_revision = 'a8b517cff8ab'
+
+
+def upgrade():
+    op.create_index(op.f('ix_ml2_network_segments_segmentation_id'),
+                    'ml2_network_segments', ['segmentation_id'],
+                    unique=False)
@@ -0,0 +1,42 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add networkchanges table
+
+Revision ID: a8b517cff8ab
+Revises: 0e66c5227a8a
+Create Date: 2016-03-14 09:12:41.392214
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8b517cff8ab'
+down_revision = '0e66c5227a8a'
+
+
+def upgrade():
+    op.create_table(
+        'networkchanges',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+                  primary_key=True, autoincrement=True),
+        sa.Column('network_id', sa.String(length=36), nullable=False),
+        sa.Column('port_id', sa.String(length=36), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, index=True),
+        sa.Index('ix_networkchanges_network_id_created_at',
+                 'network_id', 'created_at'))
@@ -0,0 +1,222 @@
+# Copyright (c) 2016 OpenStack Foundation.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_utils import timeutils
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm import session as se
+
+from neutron._i18n import _
+from neutron.db import model_base
+from neutron.db import models_v2
+
+LOG = logging.getLogger(__name__)
+
+# Changes recorded up to this many seconds before a revision are returned
+# again. This covers the transactions which were still in flight when the
+# revision was handed out, and the clock skew between the servers.
+CHANGES_OVERLAP = 60
+
+NETWORK_CHANGES_OPTS = [
+    cfg.BoolOpt('track_network_changes', default=False,
+                help=_("Record which ports and subnets of a network change, "
+                       "so that DHCP agents can refresh a network by "
+                       "fetching only the ports which changed since their "
+                       "last refresh. Each change adds a row to the database "
+                       "in the transaction making it. The changes are dated "
+                       "with the clock of the server recording them, so the "
+                       "clocks of the Neutron servers must be synchronized "
+                       "within %d seconds. This option must have the same "
+                       "value on all the Neutron servers.") % CHANGES_OVERLAP),
+    cfg.IntOpt('network_changes_retention', default=3600,
+               help=_("Number of seconds the recorded network changes are "
+                      "kept. A DHCP agent whose copy of a network is older "
+                      "than this fetches the whole network info.")),
+]
+cfg.CONF.register_opts(NETWORK_CHANGES_OPTS)
+
+# Tables holding the DHCP related state of a port or of a subnet.
+PORT_RESOURCE_TABLES = frozenset(['ports', 'ipallocations', 'extradhcpopts',
+                                  'portdnses'])
+SUBNET_RESOURCE_TABLES = frozenset(['subnets', 'ipallocationpools',
+                                    'dnsnameservers', 'subnetroutes'])
+# Columns of networks and ports whose updates don't affect the DHCP servers
+IGNORED_COLUMNS = frozenset(['status'])
+
+
+class NetworkChange(model_base.BASEV2):
+    """Represents a change of a port, or of a network and its subnets."""
+
+    __tablename__ = 'networkchanges'
+
+    id = sa.Column(sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+                   primary_key=True, autoincrement=True)
+    # No foreign key, the changes of a deleted network are purged with the
+    # other expired changes.
+    network_id = sa.Column(sa.String(36), nullable=False)
+    # NULL when the network itself or one of its subnets changed
+    port_id = sa.Column(sa.String(36), nullable=True)
+    created_at = sa.Column(sa.DateTime, nullable=False, index=True)
+    __table_args__ = (
+        sa.Index('ix_networkchanges_network_id_created_at',
+                 network_id, created_at),
+        model_base.BASEV2.__table_args__
+    )
+
+
+def _lookup_network_ids(session, model, ids):
+    if not ids:
+        return {}
+    with session.no_autoflush:
+        query = session.query(model.id, model.network_id).filter(
+            model.id.in_(ids))
+        return dict((row.id, row.network_id) for row in query)
+
+
+def _is_ignored_update(session, obj):
+    """Return whether obj is updated and only in ignored columns."""
+    if obj in session.new or obj in session.deleted:
+        return False
+    state = sa.inspect(obj)
+    for attr in state.mapper.column_attrs:
+        if (attr.key not in IGNORED_COLUMNS and
+                state.attrs[attr.key].history.has_changes()):
+            return False
+    return True
+
+
+def _collect_changes(session):
+    changes = set()
+    ports = {}
+    subnets = {}
+    orphans = []
+    objs = session.new.union(session.dirty).union(session.deleted)
+    for obj in objs:
+        table = getattr(obj, '__tablename__', None)
+        if table == 'networks':
+            if (obj not in session.deleted and
+                    not _is_ignored_update(session, obj)):
+                changes.add((obj.id, None))
+        elif table == 'networkdnsdomains':
+            changes.add((obj.network_id, None))
+        elif table == 'ports':
+            ports[obj.id] = obj.network_id
+            if not _is_ignored_update(session, obj):
+                changes.add((obj.network_id, obj.id))
+        elif table == 'ipallocations':
+            changes.add((obj.network_id, obj.port_id))
+        elif table == 'subnets':
+            subnets[obj.id] = obj.network_id
+            changes.add((obj.network_id, None))
+        elif table in PORT_RESOURCE_TABLES or table in SUBNET_RESOURCE_TABLES:
+            orphans.append(obj)
+
+    # The children of a port or subnet do not know their network
+    port_ids = set(obj.port_id for obj in orphans
+                   if obj.__tablename__ in PORT_RESOURCE_TABLES)
+    subnet_ids = set(obj.subnet_id for obj in orphans
+                     if obj.__tablename__ in SUBNET_RESOURCE_TABLES)
+    ports.update(_lookup_network_ids(session, models_v2.Port,
+                                     port_ids - set(ports)))
+    subnets.update(_lookup_network_ids(session, models_v2.Subnet,
+                                       subnet_ids - set(subnets)))
+    for obj in orphans:
+        if obj.__tablename__ in PORT_RESOURCE_TABLES:
+            if obj.port_id in ports:
+                changes.add((ports[obj.port_id], obj.port_id))
+        elif obj.subnet_id in subnets:
+            changes.add((subnets[obj.subnet_id], None))
+    return changes
+
+
+def record_changes(session, flush_context, instances):
+    """Record the network changes about to be flushed by a session."""
+    changes = _collect_changes(session)
+    if not changes:
+        return
+    now = timeutils.utcnow()
+    for network_id, port_id in changes:
+        if network_id:
+            session.add(NetworkChange(network_id=network_id, port_id=port_id,
+                                      created_at=now))
+
+
+def record_change(session, network_id, port_id=None):
+    """Record a network change the flush listener does not see.
+
+    A port_id of None records a change of the network or of its subnets.
+    """
+    if cfg.CONF.track_network_changes:
+        session.add(NetworkChange(network_id=network_id, port_id=port_id,
+                                  created_at=timeutils.utcnow()))
+
+
+def register_db_events():
+    if (cfg.CONF.track_network_changes and
+            not event.contains(se.Session, 'before_flush', record_changes)):
+        event.listen(se.Session, 'before_flush', record_changes)
+
+
+def get_revision():
+    """Return the revision to hand out with a freshly loaded network."""
+    if cfg.CONF.track_network_changes:
+        return time.time()
+
+
+def _revision_to_datetime(revision):
+    return datetime.datetime.utcfromtimestamp(revision)
+
+
+def get_changes_since(context, network_id, revision):
+    """Return the ids of the ports of a network changed since a revision.
+
+    The returned set contains None if the network or one of its subnets
+    changed as well. None is returned instead of a set when the changes
+    since the revision are not known anymore.
+    """
+    if not cfg.CONF.track_network_changes or revision is None:
+        return
+    since = (_revision_to_datetime(revision) -
+             datetime.timedelta(seconds=CHANGES_OVERLAP))
+    oldest = timeutils.utcnow() - datetime.timedelta(
+        seconds=cfg.CONF.network_changes_retention)
+    if since < oldest:
+        return
+    query = context.session.query(NetworkChange.port_id).filter(
+        NetworkChange.network_id == network_id,
+        NetworkChange.created_at >= since).distinct()
+    return set(row.port_id for row in query)
+
+
+def get_port_ids(context, network_id):
+    """Return the ids of all the ports of a network."""
+    query = context.session.query(models_v2.Port.id).filter_by(
+        network_id=network_id)
+    return [row.id for row in query]
+
+
+def purge_changes(context):
+    """Delete the changes older than the retention period."""
+    oldest = timeutils.utcnow() - datetime.timedelta(
+        seconds=cfg.CONF.network_changes_retention)
+    with context.session.begin(subtransactions=True):
+        count = context.session.query(NetworkChange).filter(
+            NetworkChange.created_at < oldest).delete(
+                synchronize_session=False)
+    LOG.debug("Purged %d expired network changes", count)
@@ -30,7 +30,8 @@ def utcnow():
 
 
 class QuotaUsageInfo(collections.namedtuple(
-    'QuotaUsageInfo', ['resource', 'tenant_id', 'used', 'dirty'])):
+    'QuotaUsageInfo', ['resource', 'tenant_id', 'used', 'dirty',
+                       'reserved'])):
     """Information about resource quota usage."""
 
 
@@ -63,7 +64,8 @@ def get_quota_usage_by_resource_and_tenant(context, resource, tenant_id,
     return QuotaUsageInfo(result.resource,
                           result.tenant_id,
                           result.in_use,
-                          result.dirty)
+                          result.dirty,
+                          result.reserved)
 
 
 def get_quota_usage_by_resource(context, resource):
@@ -72,7 +74,8 @@ def get_quota_usage_by_resource(context, resource):
     return [QuotaUsageInfo(item.resource,
                            item.tenant_id,
                            item.in_use,
-                           item.dirty) for item in query]
+                           item.dirty,
+                           item.reserved) for item in query]
 
 
 def get_quota_usage_by_tenant_id(context, tenant_id):
@@ -81,7 +84,8 @@ def get_quota_usage_by_tenant_id(context, tenant_id):
     return [QuotaUsageInfo(item.resource,
                            item.tenant_id,
                            item.in_use,
-                           item.dirty) for item in query]
+                           item.dirty,
+                           item.reserved) for item in query]
 
 
 def set_quota_usage(context, resource, tenant_id,
@@ -103,10 +107,12 @@ def set_quota_usage(context, resource, tenant_id,
             tenant_id=tenant_id)
         usage_data = query.first()
         if not usage_data:
-            # Must create entry
+            # Must create entry, the amount reserved so far is counted once
+            # and maintained by the reservation routines afterwards
             usage_data = quota_models.QuotaUsage(
                 resource=resource,
-                tenant_id=tenant_id)
+                tenant_id=tenant_id,
+                reserved=get_reserved_amount(context, resource, tenant_id))
             context.session.add(usage_data)
         # Perform explicit comparison with None as 0 is a valid value
         if in_use is not None:
@@ -118,7 +124,29 @@ def set_quota_usage(context, resource, tenant_id,
     return QuotaUsageInfo(usage_data.resource,
                           usage_data.tenant_id,
                           usage_data.in_use,
-                          usage_data.dirty)
+                          usage_data.dirty,
+                          usage_data.reserved)
+
+
+def update_quota_usage_in_flush(connection, resource, tenant_id, delta):
+    """Apply a delta to the resource usage from within a flush.
+
+    The usage is updated with the connection flushing the resources, and
+    therefore in the same transaction.
+
+    :param connection: the connection passed to mapper flush events
+    :param resource: name of the resource for which usage is being updated
+    :param tenant_id: identifier of the tenant for which usage is updated
+    :param delta: the number of resources created, or deleted if negative
+    :returns: 1 if the quota usage data were updated, 0 if the tenant has no
+              usage data yet.
+    """
+    usages = quota_models.QuotaUsage.__table__
+    result = connection.execute(usages.update().where(sa.and_(
+        usages.c.resource == resource,
+        usages.c.tenant_id == tenant_id)).values(
+            in_use=usages.c.in_use + delta))
+    return result.rowcount
 
 
 def set_quota_usage_dirty(context, resource, tenant_id, dirty=True):
@@ -163,6 +191,39 @@ def set_all_quota_usage_dirty(context, resource, dirty=True):
     return query.update({'dirty': dirty})
 
 
+def _update_reserved(context, tenant_id, deltas):
+    """Apply reservation deltas to the amounts reserved in quota usages.
+
+    Resources without usage data are skipped, their reserved amount is
+    counted when usage data are created.
+    """
+    if not deltas:
+        return
+    query = common_db_api.model_query(context, quota_models.QuotaUsage)
+    query = query.filter(
+        quota_models.QuotaUsage.tenant_id == tenant_id,
+        quota_models.QuotaUsage.resource.in_(list(deltas)))
+    for usage_data in query:
+        # Reservations made before the usage data were created are not
+        # accounted in them
+        usage_data.reserved = max(
+            usage_data.reserved + deltas[usage_data.resource], 0)
+
+
+def get_reserved_amount(context, resource, tenant_id):
+    """Return the total amount reserved for a resource by a tenant.
+
+    Unlike the reserved amount kept with quota usages this is counted from
+    the reservations, whether they are expired or not.
+    """
+    query = context.session.query(
+        sql.func.sum(quota_models.ResourceDelta.amount)).join(
+        quota_models.Reservation).filter(
+        quota_models.Reservation.tenant_id == tenant_id,
+        quota_models.ResourceDelta.resource == resource)
+    return query.scalar() or 0
+
+
 def create_reservation(context, tenant_id, deltas, expiration=None):
     # This method is usually called from within another transaction.
     # Consider using begin_nested
@@ -176,6 +237,7 @@ def create_reservation(context, tenant_id, deltas, expiration=None):
                 quota_models.ResourceDelta(resource=resource,
                                            amount=delta,
                                            reservation=resv))
+        _update_reserved(context, tenant_id, deltas)
     return ReservationInfo(resv['id'],
                            resv['tenant_id'],
                            resv['expiration'],
@@ -207,12 +269,15 @@ def remove_reservation(context, reservation_id, set_dirty=False):
         # TODO(salv-orlando): Raise here and then handle the exception?
         return
     tenant_id = reservation.tenant_id
-    resources = [delta.resource for delta in reservation.resource_deltas]
-    num_deleted = delete_query.delete()
-    if set_dirty:
-        # quota_usage for all resource involved in this reservation must
-        # be marked as dirty
-        set_resources_quota_usage_dirty(context, resources, tenant_id)
+    deltas = dict((delta.resource, -delta.amount)
+                  for delta in reservation.resource_deltas)
+    with context.session.begin(subtransactions=True):
+        _update_reserved(context, tenant_id, deltas)
+        num_deleted = delete_query.delete()
+        if set_dirty:
+            # quota_usage for all resource involved in this reservation must
+            # be marked as dirty
+            set_resources_quota_usage_dirty(context, list(deltas), tenant_id)
     return num_deleted
 
 
@@ -259,4 +324,13 @@ def remove_expired_reservations(context, tenant_id=None):
         tenant_expr = sql.true()
     resv_query = resv_query.filter(sa.and_(
         tenant_expr, quota_models.Reservation.expiration < now))
-    return resv_query.delete()
+    with context.session.begin(subtransactions=True):
+        tenant_deltas = collections.defaultdict(
+            lambda: collections.defaultdict(int))
+        for reservation in resv_query:
+            for delta in reservation.resource_deltas:
+                tenant_deltas[reservation.tenant_id][delta.resource] -= (
+                    delta.amount)
+        for resv_tenant_id, deltas in tenant_deltas.items():
+            _update_reserved(context, resv_tenant_id, deltas)
+        return resv_query.delete()
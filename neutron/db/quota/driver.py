@@ -215,15 +215,15 @@ class DbQuotaDriver(object):
     def commit_reservation(self, context, reservation_id):
         # Do not mark resource usage as dirty. If a reservation is committed,
         # then the relevant resources have been created. Usage data for these
-        # resources has therefore already been marked dirty.
+        # resources has therefore already been updated.
         quota_api.remove_reservation(context, reservation_id,
                                      set_dirty=False)
 
     def cancel_reservation(self, context, reservation_id):
-        # Mark resource usage as dirty so the next time both actual resources
-        # used and reserved will be recalculated
+        # Do not mark resource usage as dirty either. The resources were not
+        # created, and removing the reservation releases the reserved amount.
         quota_api.remove_reservation(context, reservation_id,
-                                     set_dirty=True)
+                                     set_dirty=False)
 
     def limit_check(self, context, tenant_id, resources, values):
         """Check simple quota limits.
@@ -0,0 +1,82 @@
+# Copyright (c) 2016 OpenStack Foundation.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sqlalchemy as sa
+
+from neutron.db import model_base
+
+
+class SubnetPoolIndex(model_base.BASEV2):
+    """Marks the free prefixes and usages of a subnet pool as up to date.
+
+    The free prefixes and the usages of a subnet pool are built from its
+    prefixes and subnets the first time a subnet is allocated from it, and
+    maintained incrementally afterwards.
+    """
+
+    __tablename__ = 'subnetpoolindexes'
+
+    subnetpool_id = sa.Column(sa.String(36),
+                              sa.ForeignKey('subnetpools.id',
+                                            ondelete='CASCADE'),
+                              primary_key=True)
+
+
+class SubnetPoolFreePrefix(model_base.BASEV2):
+    """Represents a free block of a subnet pool.
+
+    Free blocks are aligned on their prefix length, and two free buddies are
+    always merged into their supernet.
+    """
+
+    __tablename__ = 'subnetpoolfreeprefixes'
+
+    subnetpool_id = sa.Column(sa.String(36),
+                              sa.ForeignKey('subnetpools.id',
+                                            ondelete='CASCADE'),
+                              primary_key=True)
+    cidr = sa.Column(sa.String(64), primary_key=True)
+    prefixlen = sa.Column(sa.Integer, nullable=False)
+    __table_args__ = (
+        sa.Index('ix_subnetpoolfreeprefixes_subnetpool_id_prefixlen',
+                 subnetpool_id, prefixlen),
+        model_base.BASEV2.__table_args__
+    )
+
+
+class SubnetPoolTenantUsage(model_base.BASEV2):
+    """Represents the quota units of a subnet pool used by a tenant."""
+
+    __tablename__ = 'subnetpooltenantusages'
+
+    subnetpool_id = sa.Column(sa.String(36),
+                              sa.ForeignKey('subnetpools.id',
+                                            ondelete='CASCADE'),
+                              primary_key=True)
+    tenant_id = sa.Column(sa.String(255), primary_key=True)
+    # IPv6 subnets smaller than a quota unit use a fraction of it
+    used = sa.Column(sa.Float(precision=53), nullable=False)
+
+
+def invalidate_index(context, subnetpool_id):
+    """Drop the free prefixes and usages of a subnet pool.
+
+    They are built again on the next allocation from the subnet pool.
+    """
+    with context.session.begin(subtransactions=True):
+        for model in (SubnetPoolIndex, SubnetPoolFreePrefix,
+                      SubnetPoolTenantUsage):
+            context.session.query(model).filter_by(
+                subnetpool_id=subnetpool_id).delete(
+                    synchronize_session=False)
@@ -132,6 +132,19 @@ class Subnet(object):
             AddressOutsideSubnet
         """
 
+    def bulk_allocate(self, address_request):
+        """Allocates several IP addresses at once
+
+        Support for this operation in a driver is optional, callers fall
+        back to allocating the addresses one at a time.
+
+        :param address_request: Specifies how many addresses to allocate.
+        :type address_request: An instance of BulkAddressRequest
+        :returns: A list of exactly num_addresses IP addresses
+        :raises: IpAddressGenerationFailure, NotImplementedError
+        """
+        raise NotImplementedError()
+
     @abc.abstractmethod
     def deallocate(self, address):
         """Returns a previously allocated address to the pool
@@ -13,14 +13,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import random
+
 import netaddr
+from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_log import log
 from oslo_utils import uuidutils
 
 from neutron._i18n import _, _LE
 from neutron.common import exceptions as n_exc
-from neutron.common import ipv6_utils
 from neutron.db import api as db_api
 from neutron.ipam import driver as ipam_base
 from neutron.ipam.drivers.neutrondb_ipam import db_api as ipam_db_api
@@ -33,15 +35,34 @@ from neutron import manager
 
 LOG = log.getLogger(__name__)
 
+NEUTRONDB_IPAM_OPTS = [
+    cfg.IntOpt('ipam_allocation_window', default=16,
+               help=_("Number of random addresses of the allocation pools "
+                      "of a subnet which the reference IPAM driver looks up "
+                      "to pick the addresses to allocate among the free "
+                      "ones. Only the allocations of these addresses are "
+                      "read, and a larger window makes concurrent "
+                      "allocations on a subnet less likely to pick the same "
+                      "address. When too few of them are free, the "
+                      "addresses are picked among the first "
+                      "ipam_allocation_window free addresses of the pools, "
+                      "which reads all the allocations of the subnet. 1 "
+                      "allocates the addresses in order.")),
+]
+cfg.CONF.register_opts(NEUTRONDB_IPAM_OPTS)
+
+# Number of candidate addresses tried before the request is retried
+MAX_ALLOCATION_ATTEMPTS = 3
+
 
 class NeutronDbSubnet(ipam_base.Subnet):
     """Manage IP addresses for Neutron DB IPAM driver.
 
     This class implements the strategy for IP address allocation and
     deallocation for the Neutron DB IPAM driver.
-    Allocation for IP addresses is based on the concept of availability
-    ranges, which were already used in Neutron's DB base class for handling
-    IPAM operations.
+    IP addresses are picked among the free addresses of the allocation pools
+    and claimed by inserting their allocation, which fails for an address
+    allocated concurrently.
     """
 
     @classmethod
@@ -154,176 +175,117 @@ class NeutronDbSubnet(ipam_base.Subnet):
                 subnet_id=self.subnet_manager.neutron_id,
                 ip=ip_address)
 
-    def _allocate_specific_ip(self, session, ip_address,
-                              allocation_pool_id=None,
-                              auto_generated=False):
-        """Remove an IP address from subnet's availability ranges.
+    def _list_pools(self, session):
+        return [netaddr.IPRange(pool['first_ip'], pool['last_ip'])
+                for pool in self.subnet_manager.list_pools(session)]
 
-        This method is supposed to be called from within a database
-        transaction, otherwise atomicity and integrity might not be
-        enforced and the operation might result in incosistent availability
-        ranges for the subnet.
+    def _get_free_ips(self, session, excluded_ips=(), pools=None):
+        """Return the free addresses of the subnet's allocation pools.
 
         :param session: database session
-        :param ip_address: ip address to mark as allocated
-        :param allocation_pool_id: identifier of the allocation pool from
-             which the ip address has been extracted. If not specified this
-             routine will scan all allocation pools.
-        :param auto_generated: indicates whether ip was auto generated
-        :returns: list of IP ranges as instances of IPAvailabilityRange
+        :param excluded_ips: addresses to consider allocated as well
+        :param pools: the allocation pools, read from the database when None
+        :returns: a FreeIPIntervals instance
         """
-        # Return immediately for EUI-64 addresses. For this
-        # class of subnets availability ranges do not apply
-        if ipv6_utils.is_eui64_address(ip_address):
-            return
+        if pools is None:
+            pools = self._list_pools(session)
+        allocated_ips = [allocation['ip_address'] for allocation in
+                         self.subnet_manager.list_allocations(session)]
+        allocated_ips.extend(excluded_ips)
+        return ipam_utils.FreeIPIntervals(
+            pools, allocated_ips, netaddr.IPNetwork(self._cidr).version)
 
-        LOG.debug("Removing %(ip_address)s from availability ranges for "
-                  "subnet id:%(subnet_id)s",
-                  {'ip_address': ip_address,
-                   'subnet_id': self.subnet_manager.neutron_id})
-        # Netaddr's IPRange and IPSet objects work very well even with very
-        # large subnets, including IPv6 ones.
-        final_ranges = []
-        ip_in_pools = False
-        if allocation_pool_id:
-            av_ranges = self.subnet_manager.list_ranges_by_allocation_pool(
-                session, allocation_pool_id)
-        else:
-            av_ranges = self.subnet_manager.list_ranges_by_subnet_id(session)
-        for db_range in av_ranges:
-            initial_ip_set = netaddr.IPSet(netaddr.IPRange(
-                db_range['first_ip'], db_range['last_ip']))
-            final_ip_set = initial_ip_set - netaddr.IPSet([ip_address])
-            if not final_ip_set:
-                ip_in_pools = True
-                # Range exhausted - bye bye
-                if not self.subnet_manager.delete_range(session, db_range):
-                    raise db_exc.RetryRequest(ipam_exc.IPAllocationFailed())
-                continue
-            if initial_ip_set == final_ip_set:
-                # IP address does not fall within the current range, move
-                # to the next one
-                final_ranges.append(db_range)
-                continue
-            ip_in_pools = True
-            for new_range in final_ip_set.iter_ipranges():
-                # store new range in database
-                # use netaddr.IPAddress format() method which is equivalent
-                # to str(...) but also enables us to use different
-                # representation formats (if needed) for IPv6.
-                first_ip = netaddr.IPAddress(new_range.first)
-                last_ip = netaddr.IPAddress(new_range.last)
-                if (db_range['first_ip'] == first_ip.format() or
-                        db_range['last_ip'] == last_ip.format()):
-                    rows = self.subnet_manager.update_range(
-                        session, db_range, first_ip=first_ip, last_ip=last_ip)
-                    if not rows:
-                        raise db_exc.RetryRequest(
-                            ipam_exc.IPAllocationFailed())
-                    LOG.debug("Adjusted availability range for pool %s",
-                              db_range['allocation_pool_id'])
-                    final_ranges.append(db_range)
-                else:
-                    new_ip_range = self.subnet_manager.create_range(
-                        session,
-                        db_range['allocation_pool_id'],
-                        first_ip.format(),
-                        last_ip.format())
-                    LOG.debug("Created availability range for pool %s",
-                              new_ip_range['allocation_pool_id'])
-                    final_ranges.append(new_ip_range)
-
-        # If ip is autogenerated it should be present in allocation pools,
-        # so retry if it is not there
-        if auto_generated and not ip_in_pools:
-            raise db_exc.RetryRequest(ipam_exc.IPAllocationFailed())
-        # Most callers might ignore this return value, which is however
-        # useful for testing purposes
-        LOG.debug("Availability ranges for subnet id %(subnet_id)s "
-                  "modified: %(new_ranges)s",
-                  {'subnet_id': self.subnet_manager.neutron_id,
-                   'new_ranges': ", ".join(["[%s; %s]" %
-                                            (r['first_ip'], r['last_ip']) for
-                                            r in final_ranges])})
-        return final_ranges
-
-    def _rebuild_availability_ranges(self, session):
-        """Rebuild availability ranges.
-
-        This method should be called only when the availability ranges are
-        exhausted or when the subnet's allocation pools are updated,
-        which may trigger a deletion of the availability ranges.
-
-        For this operation to complete successfully, this method uses a
-        locking query to ensure that no IP is allocated while the regeneration
-        of availability ranges is in progress.
+    def _probe_free_ips(self, session, pools, num_addresses, excluded_ips):
+        """Pick free addresses among random addresses of the pools.
 
-        :param session: database session
+        Only the allocations of the random addresses are read.
+
+        :returns: num_addresses free addresses, or None when too few of the
+            random addresses are free
         """
-        # List all currently allocated addresses, and prevent further
-        # allocations with a write-intent lock.
-        # NOTE: because of this driver's logic the write intent lock is
-        # probably unnecessary as this routine is called when the availability
-        # ranges for a subnet are exhausted and no further address can be
-        # allocated.
-        # TODO(salv-orlando): devise, if possible, a more efficient solution
-        # for building the IPSet to ensure decent performances even with very
-        # large subnets.
-        allocations = netaddr.IPSet(
-            [netaddr.IPAddress(allocation['ip_address']) for
-             allocation in self.subnet_manager.list_allocations(
-                 session)])
-
-        # MEH MEH
-        # There should be no need to set a write intent lock on the allocation
-        # pool table. Indeed it is not important for the correctness of this
-        # operation if the allocation pools are updated by another operation,
-        # which will result in the generation of new availability ranges.
-        # NOTE: it might be argued that an allocation pool update should in
-        # theory preempt rebuilding the availability range. This is an option
-        # to consider for future developments.
-        LOG.debug("Rebuilding availability ranges for subnet %s",
-                  self.subnet_manager.neutron_id)
-
-        for pool in self.subnet_manager.list_pools(session):
-            # Create a set of all addresses in the pool
-            poolset = netaddr.IPSet(netaddr.IPRange(pool['first_ip'],
-                                                    pool['last_ip']))
-            # Use set difference to find free addresses in the pool
-            available = poolset - allocations
-            # Write the ranges to the db
-            for ip_range in available.iter_ipranges():
-                av_range = self.subnet_manager.create_range(
-                    session,
-                    pool['id'],
-                    netaddr.IPAddress(ip_range.first).format(),
-                    netaddr.IPAddress(ip_range.last).format())
-                session.add(av_range)
-
-    def _generate_ip(self, session):
-        try:
-            return self._try_generate_ip(session)
-        except ipam_exc.IpAddressGenerationFailure:
-            self._rebuild_availability_ranges(session)
-
-        return self._try_generate_ip(session)
-
-    def _try_generate_ip(self, session):
-        """Generate an IP address from availability ranges."""
-        ip_range = self.subnet_manager.get_first_range(session)
-        if not ip_range:
-            LOG.debug("All IPs from subnet %(subnet_id)s allocated",
-                      {'subnet_id': self.subnet_manager.neutron_id})
+        sizes = [pool.size for pool in pools]
+        total = sum(sizes)
+        if total < num_addresses:
+            return
+        version = netaddr.IPNetwork(self._cidr).version
+        candidates = set()
+        for i in range(cfg.CONF.ipam_allocation_window + num_addresses - 1):
+            index = random.randrange(total)
+            for pool, size in zip(pools, sizes):
+                if index < size:
+                    break
+                index -= size
+            candidates.add(
+                netaddr.IPAddress(pool.first + index, version).format())
+        candidates.difference_update(excluded_ips)
+        candidates.difference_update(
+            self.subnet_manager.list_allocated_ips(session, list(candidates)))
+        if len(candidates) >= num_addresses:
+            return random.sample(sorted(candidates), num_addresses)
+
+    def _generate_ips(self, session, num_addresses, excluded_ips=()):
+        """Pick free addresses at random.
+
+        The addresses are picked among ipam_allocation_window random
+        addresses of the pools, so that concurrent allocations on a subnet
+        are unlikely to pick the same ones. When too few of them are free,
+        consecutive addresses are picked among the first
+        ipam_allocation_window free addresses of the pools instead.
+        """
+        pools = self._list_pools(session)
+        if cfg.CONF.ipam_allocation_window > 1:
+            ip_addresses = self._probe_free_ips(session, pools, num_addresses,
+                                                excluded_ips)
+            if ip_addresses:
+                return ip_addresses
+        free_ips = self._get_free_ips(session, excluded_ips, pools)
+        if free_ips.size < num_addresses:
+            LOG.debug("Less than %(count)d IPs available in subnet "
+                      "%(subnet_id)s",
+                      {'count': num_addresses,
+                       'subnet_id': self.subnet_manager.neutron_id})
             raise ipam_exc.IpAddressGenerationFailure(
                 subnet_id=self.subnet_manager.neutron_id)
-        # A suitable range was found. Return IP address.
-        ip_address = ip_range['first_ip']
-        LOG.debug("Allocated IP - %(ip_address)s from range "
-                  "[%(first_ip)s; %(last_ip)s]",
-                  {'ip_address': ip_address,
-                   'first_ip': ip_address,
-                   'last_ip': ip_range['last_ip']})
-        return ip_address, ip_range['allocation_pool_id']
+        window = min(cfg.CONF.ipam_allocation_window,
+                     free_ips.size - num_addresses + 1)
+        start = random.randrange(window)
+        return [free_ips[index].format()
+                for index in range(start, start + num_addresses)]
+
+    def _claim_ips(self, session, ip_addresses):
+        """Insert the allocations of the addresses, in a savepoint.
+
+        The primary key of the allocations guarantees that an address is
+        claimed by a single request, no lock is taken on the pools.
+
+        :returns: True if the addresses were claimed, False if one of them
+            was allocated concurrently
+        """
+        try:
+            with session.begin_nested():
+                self.subnet_manager.create_allocations(session,
+                                                       ip_addresses)
+        except db_exc.DBDuplicateEntry:
+            LOG.debug("IP addresses %(ip_addresses)s of subnet "
+                      "%(subnet_id)s allocated concurrently",
+                      {'ip_addresses': ip_addresses,
+                       'subnet_id': self.subnet_manager.neutron_id})
+            return False
+        return True
+
+    def _allocate_ips(self, session, num_addresses):
+        excluded_ips = []
+        for attempt in range(MAX_ALLOCATION_ATTEMPTS):
+            ip_addresses = self._generate_ips(session, num_addresses,
+                                              excluded_ips)
+            if self._claim_ips(session, ip_addresses):
+                LOG.debug("Allocated IPs %(ip_addresses)s in subnet "
+                          "%(subnet_id)s",
+                          {'ip_addresses': ip_addresses,
+                           'subnet_id': self.subnet_manager.neutron_id})
+                return ip_addresses
+            excluded_ips.extend(ip_addresses)
+        raise db_exc.RetryRequest(ipam_exc.IPAllocationFailed())
 
     def allocate(self, address_request):
         # NOTE(salv-orlando): Creating a new db session might be a rather
@@ -333,8 +295,6 @@ class NeutronDbSubnet(ipam_base.Subnet):
         # practice since in the general case these drivers may interact
         # with remote backends
         session = self._context.session
-        all_pool_id = None
-        auto_generated = False
         with db_api.autonested_transaction(session):
             # NOTE(salv-orlando): It would probably better to have a simpler
             # model for address requests and just check whether there is a
@@ -344,22 +304,29 @@ class NeutronDbSubnet(ipam_base.Subnet):
                 # Check availability of requested IP
                 ip_address = str(address_request.address)
                 self._verify_ip(session, ip_address)
-            else:
-                ip_address, all_pool_id = self._generate_ip(session)
-                auto_generated = True
-            self._allocate_specific_ip(session, ip_address, all_pool_id,
-                                       auto_generated)
-            # Create IP allocation request object
-            # The only defined status at this stage is 'ALLOCATED'.
-            # More states will be available in the future - e.g.: RECYCLABLE
-            self.subnet_manager.create_allocation(session, ip_address)
-            return ip_address
+                # Create IP allocation request object
+                # The only defined status at this stage is 'ALLOCATED'.
+                # More states will be available in the future - e.g.:
+                # RECYCLABLE
+                if not self._claim_ips(session, [ip_address]):
+                    raise ipam_exc.IpAddressAlreadyAllocated(
+                        subnet_id=self.subnet_manager.neutron_id,
+                        ip=ip_address)
+                return ip_address
+            return self._allocate_ips(session, 1)[0]
+
+    def bulk_allocate(self, address_request):
+        if not isinstance(address_request, ipam_req.BulkAddressRequest):
+            raise ipam_exc.InvalidAddressRequest(
+                reason=_("Only bulk address requests are supported"))
+        session = self._context.session
+        with db_api.autonested_transaction(session):
+            return self._allocate_ips(session, address_request.num_addresses)
 
     def deallocate(self, address):
         # This is almost a no-op because the Neutron DB IPAM driver does not
-        # delete IPAllocation objects, neither rebuilds availability ranges
-        # at every deallocation. The only operation it performs is to delete
-        # an IPRequest entry.
+        # delete IPAllocation objects. The only operation it performs is to
+        # delete an IPRequest entry, which makes the address free again.
         session = self._context.session
 
         count = self.subnet_manager.delete_allocation(
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import math
 import operator
 
@@ -25,6 +26,7 @@ from neutron.api.v2 import attributes
 from neutron.common import constants
 from neutron.common import exceptions as n_exc
 from neutron.db import models_v2
+from neutron.db import subnetpool_index_db
 from neutron.ipam import driver
 from neutron.ipam import requests as ipam_req
 from neutron.ipam import utils as ipam_utils
@@ -83,30 +85,119 @@ class SubnetAllocator(driver.Pool):
                       key=operator.attrgetter('prefixlen'),
                       reverse=True)
 
+    def _quota_unit(self):
+        return self._sp_helper.ip_version_subnetpool_quota_unit(
+            self._subnetpool['ip_version'])
+
     def _num_quota_units_in_prefixlen(self, prefixlen, quota_unit):
         return math.pow(2, quota_unit - prefixlen)
 
-    def _allocations_used_by_tenant(self, quota_unit):
+    def _build_index(self):
+        """Build the free prefixes and the usages of the subnetpool.
+
+        The available prefixes of the subnetpool are the largest aligned
+        blocks not overlapping any of its subnets, which is the buddy
+        decomposition the index maintains afterwards.
+        """
+        session = self._context.session
         subnetpool_id = self._subnetpool['id']
-        tenant_id = self._subnetpool['tenant_id']
-        with self._context.session.begin(subtransactions=True):
-            qry = self._context.session.query(models_v2.Subnet)
-            allocations = qry.filter_by(subnetpool_id=subnetpool_id,
-                                        tenant_id=tenant_id)
-            value = 0
-            for allocation in allocations:
-                prefixlen = netaddr.IPNetwork(allocation.cidr).prefixlen
-                value += self._num_quota_units_in_prefixlen(prefixlen,
-                                                            quota_unit)
-            return value
+        subnetpool_index_db.invalidate_index(self._context, subnetpool_id)
+        for prefix in self._get_available_prefix_list():
+            session.add(subnetpool_index_db.SubnetPoolFreePrefix(
+                subnetpool_id=subnetpool_id, cidr=str(prefix),
+                prefixlen=prefix.prefixlen))
+        quota_unit = self._quota_unit()
+        usages = collections.defaultdict(float)
+        query = session.query(models_v2.Subnet.tenant_id,
+                              models_v2.Subnet.cidr)
+        for tenant_id, cidr in query.filter_by(subnetpool_id=subnetpool_id):
+            prefixlen = netaddr.IPNetwork(cidr).prefixlen
+            usages[tenant_id] += self._num_quota_units_in_prefixlen(
+                prefixlen, quota_unit)
+        for tenant_id, used in usages.items():
+            session.add(subnetpool_index_db.SubnetPoolTenantUsage(
+                subnetpool_id=subnetpool_id, tenant_id=tenant_id, used=used))
+        session.add(subnetpool_index_db.SubnetPoolIndex(
+            subnetpool_id=subnetpool_id))
+
+    def _has_index(self):
+        query = self._context.session.query(
+            subnetpool_index_db.SubnetPoolIndex)
+        return bool(query.filter_by(
+            subnetpool_id=self._subnetpool['id']).first())
+
+    def _ensure_index(self):
+        if not self._has_index():
+            self._build_index()
+
+    def _add_free_prefix(self, prefix):
+        self._context.session.add(subnetpool_index_db.SubnetPoolFreePrefix(
+            subnetpool_id=self._subnetpool['id'], cidr=str(prefix),
+            prefixlen=prefix.prefixlen))
+
+    def _take_prefix(self, free_prefix, cidr):
+        """Take cidr out of a free prefix containing it.
+
+        The free prefix is split in halves down to cidr, the halves not
+        containing cidr are kept free.
+        """
+        self._context.session.delete(free_prefix)
+        block = netaddr.IPNetwork(free_prefix.cidr)
+        while block.prefixlen < cidr.prefixlen:
+            lower, upper = block.subnet(block.prefixlen + 1)
+            if cidr in lower:
+                self._add_free_prefix(upper)
+                block = lower
+            else:
+                self._add_free_prefix(lower)
+                block = upper
+
+    def _release_prefix(self, cidr):
+        """Give cidr back to the free prefixes, merging it with its buddies.
+        """
+        session = self._context.session
+        query = session.query(subnetpool_index_db.SubnetPoolFreePrefix)
+        block = cidr
+        while block.prefixlen > 0:
+            supernet = netaddr.IPNetwork(
+                '%s/%d' % (block.network, block.prefixlen - 1)).cidr
+            lower, upper = supernet.subnet(block.prefixlen)
+            buddy = upper if block == lower else lower
+            free_buddy = query.filter_by(subnetpool_id=self._subnetpool['id'],
+                                         cidr=str(buddy)).first()
+            if not free_buddy:
+                break
+            session.delete(free_buddy)
+            block = supernet
+        self._add_free_prefix(block)
+
+    def _update_tenant_usage(self, tenant_id, prefixlen, sign=1):
+        session = self._context.session
+        units = sign * self._num_quota_units_in_prefixlen(prefixlen,
+                                                          self._quota_unit())
+        usage = session.query(subnetpool_index_db.SubnetPoolTenantUsage).\
+            filter_by(subnetpool_id=self._subnetpool['id'],
+                      tenant_id=tenant_id).first()
+        if usage:
+            usage.used = max(usage.used + units, 0)
+        elif units > 0:
+            session.add(subnetpool_index_db.SubnetPoolTenantUsage(
+                subnetpool_id=self._subnetpool['id'], tenant_id=tenant_id,
+                used=units))
+
+    def _allocations_used_by_tenant(self, tenant_id):
+        query = self._context.session.query(
+            subnetpool_index_db.SubnetPoolTenantUsage.used)
+        used = query.filter_by(subnetpool_id=self._subnetpool['id'],
+                               tenant_id=tenant_id).scalar()
+        return used or 0
 
     def _check_subnetpool_tenant_quota(self, tenant_id, prefixlen):
-        quota_unit = self._sp_helper.ip_version_subnetpool_quota_unit(
-                                               self._subnetpool['ip_version'])
+        quota_unit = self._quota_unit()
         quota = self._subnetpool.get('default_quota')
 
         if quota:
-            used = self._allocations_used_by_tenant(quota_unit)
+            used = self._allocations_used_by_tenant(tenant_id)
             requested_units = self._num_quota_units_in_prefixlen(prefixlen,
                                                                  quota_unit)
 
@@ -116,23 +207,34 @@ class SubnetAllocator(driver.Pool):
     def _allocate_any_subnet(self, request):
         with self._context.session.begin(subtransactions=True):
             self._lock_subnetpool()
+            self._ensure_index()
             self._check_subnetpool_tenant_quota(request.tenant_id,
                                                 request.prefixlen)
-            prefix_pool = self._get_available_prefix_list()
-            for prefix in prefix_pool:
-                if request.prefixlen >= prefix.prefixlen:
-                    subnet = next(prefix.subnet(request.prefixlen))
-                    gateway_ip = request.gateway_ip
-                    if not gateway_ip:
-                        gateway_ip = subnet.network + 1
-                    pools = ipam_utils.generate_pools(subnet.cidr,
-                                                      gateway_ip)
-
-                    return IpamSubnet(request.tenant_id,
-                                      request.subnet_id,
-                                      subnet.cidr,
-                                      gateway_ip=gateway_ip,
-                                      allocation_pools=pools)
+            # The smallest free prefix large enough is split, which keeps
+            # the larger free prefixes for larger requests
+            FreePrefix = subnetpool_index_db.SubnetPoolFreePrefix
+            query = self._context.session.query(FreePrefix).filter(
+                FreePrefix.subnetpool_id == self._subnetpool['id'],
+                FreePrefix.prefixlen <= request.prefixlen)
+            free_prefix = query.order_by(FreePrefix.prefixlen.desc(),
+                                         FreePrefix.cidr).first()
+            if free_prefix:
+                prefix = netaddr.IPNetwork(free_prefix.cidr)
+                subnet = next(prefix.subnet(request.prefixlen))
+                self._take_prefix(free_prefix, subnet)
+                self._update_tenant_usage(request.tenant_id,
+                                          request.prefixlen)
+                gateway_ip = request.gateway_ip
+                if not gateway_ip:
+                    gateway_ip = subnet.network + 1
+                pools = ipam_utils.generate_pools(subnet.cidr,
+                                                  gateway_ip)
+
+                return IpamSubnet(request.tenant_id,
+                                  request.subnet_id,
+                                  subnet.cidr,
+                                  gateway_ip=gateway_ip,
+                                  allocation_pools=pools)
             msg = _("Insufficient prefix space to allocate subnet size /%s")
             raise n_exc.SubnetAllocationError(reason=msg %
                                               str(request.prefixlen))
@@ -140,12 +242,23 @@ class SubnetAllocator(driver.Pool):
     def _allocate_specific_subnet(self, request):
         with self._context.session.begin(subtransactions=True):
             self._lock_subnetpool()
+            self._ensure_index()
             self._check_subnetpool_tenant_quota(request.tenant_id,
                                                 request.prefixlen)
             cidr = request.subnet_cidr
-            available = self._get_available_prefix_list()
-            matched = netaddr.all_matching_cidrs(cidr, available)
-            if len(matched) is 1 and matched[0].prefixlen <= cidr.prefixlen:
+            # Only one of the supernets of cidr can be a free prefix
+            supernets = [str(netaddr.IPNetwork(
+                '%s/%d' % (cidr.network, prefixlen)).cidr)
+                for prefixlen in range(cidr.prefixlen + 1)]
+            FreePrefix = subnetpool_index_db.SubnetPoolFreePrefix
+            query = self._context.session.query(FreePrefix).filter(
+                FreePrefix.subnetpool_id == self._subnetpool['id'],
+                FreePrefix.cidr.in_(supernets))
+            free_prefix = query.first()
+            if free_prefix:
+                self._take_prefix(free_prefix, cidr.cidr)
+                self._update_tenant_usage(request.tenant_id,
+                                          request.prefixlen)
                 return IpamSubnet(request.tenant_id,
                                   request.subnet_id,
                                   cidr,
@@ -182,7 +295,24 @@ class SubnetAllocator(driver.Pool):
         raise NotImplementedError()
 
     def remove_subnet(self, subnet_id):
-        raise NotImplementedError()
+        """Give the prefix of a subnet being deleted back to the subnetpool.
+
+        Must be called in the transaction deleting the subnet.
+        """
+        with self._context.session.begin(subtransactions=True):
+            self._lock_subnetpool()
+            if not self._has_index():
+                # NOTE: the index is built from the remaining subnets on the
+                # next allocation
+                return
+            subnet = self._context.session.query(models_v2.Subnet).filter_by(
+                id=subnet_id).first()
+            if not subnet:
+                return
+            cidr = netaddr.IPNetwork(subnet.cidr)
+            self._release_prefix(cidr)
+            self._update_tenant_usage(subnet.tenant_id, cidr.prefixlen,
+                                      sign=-1)
 
 
 class IpamSubnet(driver.Subnet):
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
+
 import netaddr
 from neutron.common import constants
 
@@ -74,3 +76,56 @@ def generate_pools(cidr, gateway_ip):
     if gateway_ip:
         ipset.remove(netaddr.IPAddress(gateway_ip, ip_version))
     return list(ipset.iter_ipranges())
+
+
+class FreeIPIntervals(object):
+    """The addresses of allocation pools which are not allocated yet.
+
+    The free addresses are kept as sorted, disjoint intervals, so building
+    them only costs a sort of the allocated addresses whatever the size of
+    the pools, and the n-th free address is found with a binary search.
+    """
+
+    def __init__(self, pools, allocated_ips, ip_version):
+        """
+        :param pools: allocation pools, as netaddr.IPRange instances
+        :param allocated_ips: addresses allocated in or out of the pools
+        :param ip_version: IP version of the pools
+        """
+        self._ip_version = ip_version
+        # First address and size of each interval, and number of free
+        # addresses in the intervals before it
+        self._firsts = []
+        self._sizes = []
+        self._offsets = []
+        self.size = 0
+        allocated = sorted(set(int(netaddr.IPAddress(ip))
+                               for ip in allocated_ips))
+        for pool in sorted(pools, key=lambda pool: pool.first):
+            first = pool.first
+            index = bisect.bisect_left(allocated, first)
+            while index < len(allocated) and allocated[index] <= pool.last:
+                self._add(first, allocated[index] - 1)
+                first = allocated[index] + 1
+                index += 1
+            self._add(first, pool.last)
+
+    def _add(self, first, last):
+        if first > last:
+            return
+        self._firsts.append(first)
+        self._sizes.append(last - first + 1)
+        self._offsets.append(self.size)
+        self.size += last - first + 1
+
+    def __getitem__(self, index):
+        """Return the free address with the given index, in ascending order.
+
+        :raises: IndexError when there are not that many free addresses
+        """
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        interval = bisect.bisect_right(self._offsets, index) - 1
+        return netaddr.IPAddress(
+            self._firsts[interval] + index - self._offsets[interval],
+            self._ip_version)
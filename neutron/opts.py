@@ -29,6 +29,9 @@ import neutron.agent.linux.ra
 import neutron.agent.metadata.config
 import neutron.agent.ovsdb.api
 import neutron.agent.securitygroups_rpc
+import neutron.api.profiling
+import neutron.common.json_backend
+import neutron.common.rpc_stats
 import neutron.db.agents_db
 import neutron.db.agentschedulers_db
 import neutron.db.dvr_mac_db
@@ -38,9 +41,11 @@ import neutron.db.l3_dvr_db
 import neutron.db.l3_gwmode_db
 import neutron.db.l3_hamode_db
 import neutron.db.migration.cli
+import neutron.db.network_changes_db
 import neutron.extensions.allowedaddresspairs
 import neutron.extensions.l3
 import neutron.extensions.securitygroup
+import neutron.ipam.drivers.neutrondb_ipam.driver
 import neutron.openstack.common.cache.cache
 import neutron.plugins.ml2.config
 import neutron.plugins.ml2.drivers.agent.config
@@ -118,7 +123,8 @@ def list_db_opts():
              neutron.db.dvr_mac_db.dvr_mac_address_opts,
              neutron.db.l3_dvr_db.router_distributed_opts,
              neutron.db.l3_agentschedulers_db.L3_AGENTS_SCHEDULER_OPTS,
-             neutron.db.l3_hamode_db.L3_HA_OPTS)
+             neutron.db.l3_hamode_db.L3_HA_OPTS,
+             neutron.db.network_changes_db.NETWORK_CHANGES_OPTS)
          ),
         ('database',
          neutron.db.migration.cli.get_engine_config())
@@ -131,6 +137,10 @@ def list_opts():
          itertools.chain(
              neutron.common.config.core_cli_opts,
              neutron.common.config.core_opts,
+             neutron.ipam.drivers.neutrondb_ipam.driver.NEUTRONDB_IPAM_OPTS,
+             neutron.common.rpc_stats.RPC_STATS_OPTS,
+             neutron.api.profiling.PROFILING_OPTS,
+             neutron.common.json_backend.JSON_BACKEND_OPTS,
              neutron.wsgi.socket_opts,
              neutron.service.service_opts)
          ),
@@ -155,7 +165,8 @@ def list_base_agent_opts():
          itertools.chain(
              neutron.agent.linux.interface.OPTS,
              neutron.agent.common.config.INTERFACE_DRIVER_OPTS,
-             neutron.agent.common.ovs_lib.OPTS)
+             neutron.agent.common.ovs_lib.OPTS,
+             neutron.common.rpc_stats.RPC_STATS_OPTS)
          ),
         ('AGENT', neutron.agent.common.config.AGENT_STATE_OPTS)
     ]
@@ -17,6 +17,7 @@ import pecan
 from pecan import request
 
 from neutron.api import api_common
+from neutron.api import profiling
 from neutron.i18n import _LW
 from neutron import manager
 from neutron.pecan_wsgi.controllers import utils
@@ -36,7 +37,8 @@ class ItemController(utils.NeutronPecanController):
         return self.get()
 
     def get(self, *args, **kwargs):
-        getter = getattr(self.plugin, 'get_%s' % self.resource)
+        getter = profiling.timed(
+            profiling.PLUGIN, getattr(self.plugin, 'get_%s' % self.resource))
         neutron_context = request.context['neutron_context']
         return {self.resource: getter(neutron_context, self.item)}
 
@@ -51,7 +53,9 @@ class ItemController(utils.NeutronPecanController):
         neutron_context = request.context['neutron_context']
         resources = request.context['resources']
         # TODO(kevinbenton): bulk?
-        updater = getattr(self.plugin, 'update_%s' % self.resource)
+        updater = profiling.timed(
+            profiling.PLUGIN,
+            getattr(self.plugin, 'update_%s' % self.resource))
         # Bulk update is not supported, 'resources' always contains a single
         # elemenet
         data = {self.resource: resources[0]}
@@ -62,7 +66,9 @@ class ItemController(utils.NeutronPecanController):
         # TODO(kevinbenton): setting code could be in a decorator
         pecan.response.status = 204
         neutron_context = request.context['neutron_context']
-        deleter = getattr(self.plugin, 'delete_%s' % self.resource)
+        deleter = profiling.timed(
+            profiling.PLUGIN,
+            getattr(self.plugin, 'delete_%s' % self.resource))
         return deleter(neutron_context, self.item)
 
     @utils.expose()
@@ -104,7 +110,8 @@ class CollectionsController(utils.NeutronPecanController):
             self._resource_info,
             skips=['fields', 'sort_key', 'sort_dir',
                    'limit', 'marker', 'page_reverse'])
-        lister = getattr(self.plugin, 'get_%s' % self.collection)
+        lister = profiling.timed(
+            profiling.PLUGIN, getattr(self.plugin, 'get_%s' % self.collection))
         neutron_context = request.context['neutron_context']
         return {self.collection: lister(neutron_context, filters=filters)}
 
@@ -132,6 +139,7 @@ class CollectionsController(utils.NeutronPecanController):
             method = 'create_%s' % self.resource
             key = self.resource
             data = {key: resources[0]}
-        creator = getattr(self.plugin, method)
+        creator = profiling.timed(profiling.PLUGIN,
+                                  getattr(self.plugin, method))
         neutron_context = request.context['neutron_context']
         return {key: creator(neutron_context, data)}
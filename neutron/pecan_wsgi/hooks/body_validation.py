@@ -17,6 +17,7 @@ from oslo_log import log
 from oslo_serialization import jsonutils
 from pecan import hooks
 
+from neutron.api import profiling
 from neutron.api.v2 import attributes as v2_attributes
 from neutron.api.v2 import base as v2_base
 
@@ -38,7 +39,8 @@ class BodyValidationHook(hooks.PecanHook):
             return
 
         try:
-            json_data = jsonutils.loads(state.request.body)
+            with profiling.phase(profiling.DESERIALIZE):
+                json_data = jsonutils.loads(state.request.body)
         except ValueError:
             LOG.debug("No JSON Data in %(method)s request for %(collection)s",
                       {'method': state.request.method,
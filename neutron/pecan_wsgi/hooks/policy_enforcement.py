@@ -21,6 +21,7 @@ from pecan import hooks
 import webob
 
 from neutron._i18n import _
+from neutron.api import profiling
 from neutron.api.v2 import attributes as v2_attributes
 from neutron.common import constants as const
 from neutron.extensions import quotasv2
@@ -49,7 +50,8 @@ def fetch_resource(neutron_context, resource, resource_id):
                       value.get('primary_key') or 'default' not in value)]
     plugin = manager.NeutronManager.get_plugin_for_resource(resource)
     if plugin:
-        getter = getattr(plugin, 'get_%s' % resource)
+        getter = profiling.timed(profiling.PLUGIN,
+                                 getattr(plugin, 'get_%s' % resource))
         # TODO(kevinbenton): the parent_id logic currently in base.py
         return getter(neutron_context, resource_id, fields=field_list)
     else:
@@ -137,7 +139,8 @@ class PolicyHook(hooks.PecanHook):
         if resource == 'extension':
             return
         try:
-            data = state.response.json
+            with profiling.phase(profiling.SERIALIZE):
+                data = state.response.json
         except ValueError:
             return
         action = '%s_%s' % (pecan_constants.ACTION_MAP[state.request.method],
@@ -167,8 +170,10 @@ class PolicyHook(hooks.PecanHook):
 
         if is_single:
             resp = resp[0]
-        state.response.json = {key: resp}
+        with profiling.phase(profiling.SERIALIZE):
+            state.response.json = {key: resp}
 
+    @profiling.timed(profiling.VIEW)
     def _get_filtered_item(self, request, resource, collection, data):
         neutron_context = request.context.get('neutron_context')
         to_exclude = self._exclude_attributes_by_policy(
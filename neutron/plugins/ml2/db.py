@@ -17,6 +17,7 @@ from oslo_db import exception as db_exc
 from oslo_log import log
 from oslo_utils import uuidutils
 import six
+import sqlalchemy as sa
 from sqlalchemy import or_
 from sqlalchemy.orm import exc
 
@@ -83,6 +84,22 @@ def get_networks_segments(session, network_ids, filter_dynamic=False):
         return result
 
 
+def filter_networks_by_segments(query, segment_filters):
+    """Restrict a query of networks to the ones with matching segments.
+
+    segment_filters maps segment attributes to lists of accepted values.
+    A network matches when one of its static segments matches all the
+    filters, or when it has no static segment.
+    """
+    segment = models.NetworkSegment
+    static = sa.and_(segment.network_id == models_v2.Network.id,
+                     segment.is_dynamic == sa.false())
+    conditions = [getattr(segment, key).in_(values)
+                  for key, values in six.iteritems(segment_filters)]
+    return query.filter(or_(sa.exists().where(sa.and_(static, *conditions)),
+                            ~sa.exists().where(static)))
+
+
 def get_segment_by_id(session, segment_id):
     with session.begin(subtransactions=True):
         try:
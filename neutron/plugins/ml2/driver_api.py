@@ -1038,6 +1038,22 @@ class ExtensionDriver(object):
         """
         pass
 
+    def extend_network_dicts(self, session, base_models, results):
+        """Add extended attributes to a list of network dictionaries.
+
+        :param session: database session
+        :param base_models: list of network model data
+        :param results: list of network dictionaries to extend, in the
+            order of base_models
+
+        Called inside transaction context on session when networks are
+        listed. The default implementation calls extend_network_dict
+        for each network; drivers can override it to look up the
+        attributes of all the networks at once.
+        """
+        for base_model, result in zip(base_models, results):
+            self.extend_network_dict(session, base_model, result)
+
     def extend_subnet_dict(self, session, base_model, result):
         """Add extended attributes to subnet dictionary.
 
@@ -238,9 +238,8 @@ class PortContext(MechanismDriverContext, api.PortContext):
         return self._segments_to_bind
 
     def host_agents(self, agent_type):
-        return self._plugin.get_agents(self._plugin_context,
-                                       filters={'agent_type': [agent_type],
-                                                'host': [self._binding.host]})
+        return self._plugin.get_agents_by_type_and_host(
+            self._plugin_context, agent_type, self._binding.host)
 
     def set_binding(self, segment_id, vif_type, vif_details,
                     status=None):
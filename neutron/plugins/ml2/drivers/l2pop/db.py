@@ -13,7 +13,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 
 from neutron.common import constants as const
@@ -29,7 +28,7 @@ def get_agent_ip_by_host(session, agent_host):
 
 
 def get_agent_ip(agent):
-    configuration = jsonutils.loads(agent.configurations)
+    configuration = agents_db.load_agent_dict(agent.configurations)
     return configuration.get('tunneling_ip')
 
 
@@ -39,12 +38,12 @@ def get_agent_uptime(agent):
 
 
 def get_agent_tunnel_types(agent):
-    configuration = jsonutils.loads(agent.configurations)
+    configuration = agents_db.load_agent_dict(agent.configurations)
     return configuration.get('tunnel_types')
 
 
 def get_agent_l2pop_network_types(agent):
-    configuration = jsonutils.loads(agent.configurations)
+    configuration = agents_db.load_agent_dict(agent.configurations)
     return configuration.get('l2pop_network_types')
 
 
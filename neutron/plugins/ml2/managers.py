@@ -116,10 +116,6 @@ class TypeManager(stevedore.named.NamedExtensionManager):
             mpnet.check_duplicate_segments(segments, self.is_partial_segment)
             return segments
 
-    def _match_segment(self, segment, filters):
-        return all(not filters.get(attr) or segment.get(attr) in filters[attr]
-                   for attr in provider.ATTRIBUTES)
-
     def _get_provider_segment(self, network):
         # TODO(manishg): Placeholder method
         # Code intended for operating on a provider segment should use
@@ -129,18 +125,6 @@ class TypeManager(stevedore.named.NamedExtensionManager):
         # here we will do the job of extracting the segment information.
         return network
 
-    def network_matches_filters(self, network, filters):
-        if not filters:
-            return True
-        if any(attributes.is_attr_set(network.get(attr))
-               for attr in provider.ATTRIBUTES):
-            segments = [self._get_provider_segment(network)]
-        elif attributes.is_attr_set(network.get(mpnet.SEGMENTS)):
-            segments = self._get_attribute(network, mpnet.SEGMENTS)
-        else:
-            return True
-        return any(self._match_segment(s, filters) for s in segments)
-
     def _get_attribute(self, attrs, key):
         value = attrs.get(key)
         if value is attributes.ATTR_NOT_SPECIFIED:
@@ -877,6 +861,11 @@ class ExtensionManager(stevedore.named.NamedExtensionManager):
         self._call_on_dict_driver("extend_network_dict", session, base_model,
                                   result)
 
+    def extend_network_dicts(self, session, base_models, results):
+        """Notify all extension drivers to extend network dictionaries."""
+        self._call_on_dict_driver("extend_network_dicts", session,
+                                  base_models, results)
+
     def extend_subnet_dict(self, session, base_model, result):
         """Notify all extension drivers to extend subnet dictionary."""
         self._call_on_dict_driver("extend_subnet_dict", session, base_model,
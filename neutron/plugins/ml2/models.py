@@ -38,7 +38,7 @@ class NetworkSegment(model_base.BASEV2, model_base.HasId):
                            nullable=False)
     network_type = sa.Column(sa.String(32), nullable=False)
     physical_network = sa.Column(sa.String(64))
-    segmentation_id = sa.Column(sa.Integer)
+    segmentation_id = sa.Column(sa.Integer, index=True)
     is_dynamic = sa.Column(sa.Boolean, default=False, nullable=False,
                            server_default=sa.sql.false())
     segment_index = sa.Column(sa.Integer, nullable=False, server_default='0')
@@ -228,12 +228,6 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                                           fanout=False)
         return self.conn_reports.consume_in_threads()
 
-    def _filter_nets_provider(self, context, networks, filters):
-        return [network
-                for network in networks
-                if self.type_manager.network_matches_filters(network, filters)
-                ]
-
     def _check_mac_update_allowed(self, orig_port, port, binding):
         unplugged_types = (portbindings.VIF_TYPE_BINDING_FAILED,
                            portbindings.VIF_TYPE_UNBOUND)
@@ -549,6 +543,12 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         with session.begin(subtransactions=True):
             self.extension_manager.extend_network_dict(session, netdb, result)
 
+    def _ml2_md_extend_network_dicts(self, results, netdbs):
+        session = db_api.get_session()
+        with session.begin(subtransactions=True):
+            self.extension_manager.extend_network_dicts(session, netdbs,
+                                                        results)
+
     def _ml2_md_extend_port_dict(self, result, portdb):
         session = db_api.get_session()
         with session.begin(subtransactions=True):
@@ -584,6 +584,33 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         None,
         '_ml2_port_result_filter_hook')
 
+    def _ml2_network_result_filter_hook(self, query, filters):
+        segment_filters = {}
+        for attr, key in ((provider.NETWORK_TYPE, api.NETWORK_TYPE),
+                          (provider.PHYSICAL_NETWORK, api.PHYSICAL_NETWORK),
+                          (provider.SEGMENTATION_ID, api.SEGMENTATION_ID)):
+            if filters.get(attr):
+                segment_filters[key] = filters[attr]
+        if not segment_filters:
+            return query
+        return db.filter_networks_by_segments(query, segment_filters)
+
+    db_base_plugin_v2.NeutronDbPluginV2.register_model_query_hook(
+        models_v2.Network,
+        "ml2_network_segments",
+        None,
+        None,
+        '_ml2_network_result_filter_hook')
+
+    # The distributed bindings are not part of the port dict, they are
+    # looked up by host when needed.
+    db_base_plugin_v2.NeutronDbPluginV2.register_model_query_hook(
+        models_v2.Port,
+        "ml2_dvr_port_bindings",
+        None,
+        None,
+        eager_loads={'dvr_port_binding': ()})
+
     def _notify_port_updated(self, mech_context):
         port = mech_context.current
         segment = mech_context.bottom_bound_segment
@@ -616,15 +643,26 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         objects = []
         collection = "%ss" % resource
         items = request_items[collection]
+        item = None
         try:
             with context.session.begin(subtransactions=True):
                 obj_creator = getattr(self, '_create_%s_db' % resource)
-                for item in items:
-                    attrs = item[resource]
-                    result, mech_context = obj_creator(context, item)
-                    objects.append({'mech_context': mech_context,
-                                    'result': result,
-                                    'attributes': attrs})
+                creator_kwargs = self._get_bulk_creator_kwargs(
+                    resource, context, items)
+                try:
+                    for item, kwargs in zip(items, creator_kwargs):
+                        attrs = item[resource]
+                        result, mech_context = obj_creator(context, item,
+                                                           **kwargs)
+                        objects.append({'mech_context': mech_context,
+                                        'result': result,
+                                        'attributes': attrs})
+                except Exception:
+                    with excutils.save_and_reraise_exception():
+                        if resource == attributes.PORT:
+                            self.ipam.deallocate_ips_for_ports(
+                                context, [kw['allocated_ips']
+                                          for kw in creator_kwargs])
 
         except Exception:
             with excutils.save_and_reraise_exception():
@@ -650,6 +688,25 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                                'resource_ids': ', '.join(resource_ids)})
                 self._delete_objects(context, resource, objects)
 
+    def _get_bulk_creator_kwargs(self, resource, context, items):
+        """Return the extra arguments of _create_<resource>_db per item.
+
+        The IP addresses of new ports are allocated in bulk where possible,
+        and the network of the ports is only fetched once.
+        """
+        if resource != attributes.PORT:
+            return [{} for item in items]
+        allocations = self.ipam.allocate_ips_for_ports(context, items)
+        networks = {}
+        creator_kwargs = []
+        for item, allocated_ips in zip(items, allocations):
+            network_id = item[resource]['network_id']
+            if network_id not in networks:
+                networks[network_id] = self.get_network(context, network_id)
+            creator_kwargs.append({'network': networks[network_id],
+                                   'allocated_ips': allocated_ips})
+        return creator_kwargs
+
     def _create_network_db(self, context, network):
         net_data = network[attributes.NETWORK]
         tenant_id = net_data['tenant_id']
@@ -755,13 +812,33 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                      sorts=None, limit=None, marker=None, page_reverse=False):
         session = context.session
         with session.begin(subtransactions=True):
-            nets = super(Ml2Plugin,
-                         self).get_networks(context, filters, None, sorts,
-                                            limit, marker, page_reverse)
+            # The provider attribute filters are applied by the query, see
+            # _ml2_network_result_filter_hook
+            marker_obj = self._get_marker_obj(context, 'network', limit,
+                                              marker)
+            query = self._get_collection_query(context, models_v2.Network,
+                                               filters=filters, sorts=sorts,
+                                               limit=limit,
+                                               marker_obj=marker_obj,
+                                               page_reverse=page_reverse,
+                                               fields=fields)
+            net_dbs = query.all()
+            if limit and page_reverse:
+                net_dbs.reverse()
+            # The ids are needed to extend the dicts
+            dict_fields = fields and list(set(fields) | set(['id']))
+            nets = []
+            for net_db in net_dbs:
+                net = self._make_network_dict(net_db, dict_fields,
+                                              process_extensions=False,
+                                              context=context)
+                self._apply_dict_extend_functions(
+                    attributes.NETWORKS, net, net_db, fields,
+                    exclude=('_ml2_md_extend_network_dict',))
+                nets.append(net)
+            self._ml2_md_extend_network_dicts(nets, net_dbs)
             self.type_manager.extend_networks_dict_provider(context, nets)
 
-            nets = self._filter_nets_provider(context, nets, filters)
-
         return [self._fields(net, fields) for net in nets]
 
     def _delete_ports(self, context, port_ids):
@@ -998,6 +1075,7 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                         mech_context)
 
                     LOG.debug("Deleting subnet record")
+                    self._release_subnetpool_prefix(context, record)
                     session.delete(record)
 
                     # The super(Ml2Plugin, self).delete_subnet() is not called,
@@ -1053,7 +1131,8 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         elif self._check_update_has_security_groups(port):
             raise psec.PortSecurityAndIPRequiredForSecurityGroups()
 
-    def _create_port_db(self, context, port):
+    def _create_port_db(self, context, port, network=None,
+                        allocated_ips=None):
         attrs = port[attributes.PORT]
         if not attrs.get('status'):
             attrs['status'] = const.PORT_STATUS_DOWN
@@ -1062,7 +1141,8 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         with db_api.exc_to_retry(os_db_exception.DBDuplicateEntry),\
                 session.begin(subtransactions=True):
             dhcp_opts = attrs.get(edo_ext.EXTRADHCPOPTS, [])
-            port_db = self.create_port_db(context, port)
+            port_db = self.create_port_db(context, port,
+                                          allocated_ips=allocated_ips)
             result = self._make_port_dict(port_db, process_extensions=False)
             self.extension_manager.process_create_port(context, attrs, result)
             self._portsec_ext_port_create_processing(context, result, port)
@@ -1070,7 +1150,8 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
             # sgids must be got after portsec checked with security group
             sgids = self._get_security_groups_on_port(context, port)
             self._process_port_create_security_group(context, result, sgids)
-            network = self.get_network(context, result['network_id'])
+            if network is None:
+                network = self.get_network(context, result['network_id'])
             binding = db.add_port_binding(session, result['id'])
             mech_context = driver_context.PortContext(self, context, result,
                                                       network, binding, None)
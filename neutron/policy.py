@@ -25,6 +25,7 @@ from oslo_utils import importutils
 import six
 
 from neutron._i18n import _, _LE, _LW
+from neutron.api import profiling
 from neutron.api.v2 import attributes
 from neutron.common import constants as const
 from neutron.common import exceptions
@@ -35,10 +36,31 @@ LOG = logging.getLogger(__name__)
 _ENFORCER = None
 ADMIN_CTX_POLICY = 'context_is_admin'
 ADVSVC_CTX_POLICY = 'context_is_advsvc'
+# Matches the target fields substituted in the match of a check
+TARGET_FIELD_RE = re.compile(r'%\(([^)]+)\)s')
+# Number of match rules kept by the process wide match rule cache
+MATCH_RULE_CACHE_SIZE = 1024
+# Match rules built for an action and the attributes set in the target,
+# from the least to the most recently used
+_MATCH_RULES = collections.OrderedDict()
+
+
+class RequestPolicyCache(object):
+    """Policy data computed once for all the checks of a request context.
+
+    The credentials are built again whenever the user, tenant, roles or
+    admin flag of the context change.
+    """
+
+    def __init__(self):
+        self.credentials_key = None
+        self.credentials = None
+        self.match_rules = {}
 
 
 def reset():
     global _ENFORCER
+    _MATCH_RULES.clear()
     if _ENFORCER:
         _ENFORCER.clear()
         _ENFORCER = None
@@ -104,8 +126,8 @@ def _should_validate_sub_attributes(attribute, sub_attr):
                  v for (k, v) in six.iteritems(validate)]))
 
 
-def _build_subattr_match_rule(attr_name, attr, action, target):
-    """Create the rule to match for sub-attribute policy checks."""
+def _get_subattr_names(attr_name, attr, target):
+    """Return the sub-attributes set in the target to match rules for."""
     # TODO(salv-orlando): Instead of relying on validator info, introduce
     # typing for API attributes
     # Expect a dict as type descriptor
@@ -122,14 +144,26 @@ def _build_subattr_match_rule(attr_name, attr, action, target):
                   "generate any sub-attr policy rule for %s.",
                   attr_name)
         return
+    return tuple(sub_attr_name for sub_attr_name in data
+                 if sub_attr_name in target[attr_name])
+
+
+def _compile_subattr_match_rule(attr_name, action, sub_attr_names):
     sub_attr_rules = [policy.RuleCheck('rule', '%s:%s:%s' %
                                        (action, attr_name,
                                         sub_attr_name)) for
-                      sub_attr_name in data if sub_attr_name in
-                      target[attr_name]]
+                      sub_attr_name in sub_attr_names]
     return policy.AndCheck(sub_attr_rules)
 
 
+def _build_subattr_match_rule(attr_name, attr, action, target):
+    """Create the rule to match for sub-attribute policy checks."""
+    sub_attr_names = _get_subattr_names(attr_name, attr, target)
+    if sub_attr_names is None:
+        return
+    return _compile_subattr_match_rule(attr_name, action, sub_attr_names)
+
+
 def _process_rules_list(rules, match_rule):
     """Recursively walk a policy rule to extract a list of match entries."""
     if isinstance(match_rule, policy.RuleCheck):
@@ -140,6 +174,65 @@ def _process_rules_list(rules, match_rule):
     return rules
 
 
+def _get_match_rule_key(action, target, pluralized):
+    """Return what the rule to match for an action depends on.
+
+    This is the action, and the attributes and sub-attributes set in the
+    target for which a policy is enforced.
+    """
+    resource, enforce_attr_based_check = get_resource_and_action(
+        action, pluralized)
+    entries = []
+    if enforce_attr_based_check:
+        # assigning to variable with short name for improving readability
+        res_map = attributes.RESOURCE_ATTRIBUTE_MAP
+        if resource in res_map:
+            for attribute_name in res_map[resource]:
+                attribute = res_map[resource][attribute_name]
+                if ('enforce_policy' in attribute and
+                        _is_attribute_explicitly_set(attribute_name,
+                                                     res_map[resource],
+                                                     target, action)):
+                    sub_attr_names = None
+                    # Match entries for sub-attributes
+                    if _should_validate_sub_attributes(
+                            attribute, target[attribute_name]):
+                        sub_attr_names = _get_subattr_names(
+                            attribute_name, attribute, target)
+                        if sub_attr_names is None:
+                            # the sub-attributes cannot be found
+                            sub_attr_names = False
+                    entries.append((attribute_name, sub_attr_names))
+    return action, tuple(entries)
+
+
+def _compile_match_rule(action, entries):
+    match_rule = policy.RuleCheck('rule', action)
+    for attribute_name, sub_attr_names in entries:
+        attr_rule = policy.RuleCheck('rule', '%s:%s' %
+                                     (action, attribute_name))
+        if sub_attr_names is not None:
+            sub_attr_rule = None
+            if sub_attr_names is not False:
+                sub_attr_rule = _compile_subattr_match_rule(
+                    attribute_name, action, sub_attr_names)
+            attr_rule = policy.AndCheck([attr_rule, sub_attr_rule])
+        match_rule = policy.AndCheck([match_rule, attr_rule])
+    return match_rule
+
+
+def _get_match_rule(key):
+    """Return the match rule for a key from the match rule cache."""
+    try:
+        match_rule = _MATCH_RULES.pop(key)
+    except KeyError:
+        match_rule = _compile_match_rule(*key)
+        if len(_MATCH_RULES) >= MATCH_RULE_CACHE_SIZE:
+            _MATCH_RULES.popitem(last=False)
+    _MATCH_RULES[key] = match_rule
+    return match_rule
+
+
 def _build_match_rule(action, target, pluralized):
     """Create the rule to match for a given action.
 
@@ -151,31 +244,11 @@ def _build_match_rule(action, target, pluralized):
     4) add an entry for sub-attributes of a resource for which the
        action is being executed
        (e.g.: create_router:external_gateway_info:network_id)
+
+    The rules built are cached, as they only depend on the action and on
+    which attributes are set in the target.
     """
-    match_rule = policy.RuleCheck('rule', action)
-    resource, enforce_attr_based_check = get_resource_and_action(
-        action, pluralized)
-    if enforce_attr_based_check:
-        # assigning to variable with short name for improving readability
-        res_map = attributes.RESOURCE_ATTRIBUTE_MAP
-        if resource in res_map:
-            for attribute_name in res_map[resource]:
-                if _is_attribute_explicitly_set(attribute_name,
-                                                res_map[resource],
-                                                target, action):
-                    attribute = res_map[resource][attribute_name]
-                    if 'enforce_policy' in attribute:
-                        attr_rule = policy.RuleCheck('rule', '%s:%s' %
-                                                     (action, attribute_name))
-                        # Build match entries for sub-attributes
-                        if _should_validate_sub_attributes(
-                                attribute, target[attribute_name]):
-                            attr_rule = policy.AndCheck(
-                                [attr_rule, _build_subattr_match_rule(
-                                    attribute_name, attribute,
-                                    action, target)])
-                        match_rule = policy.AndCheck([match_rule, attr_rule])
-    return match_rule
+    return _get_match_rule(_get_match_rule_key(action, target, pluralized))
 
 
 # This check is registered as 'tenant_id' so that it can override
@@ -208,6 +281,17 @@ class OwnerCheck(policy.Check):
                 reason=err_reason)
         super(OwnerCheck, self).__init__(kind, match)
 
+    def get_parent_foreign_key(self):
+        """Return the target field referencing the parent resource.
+
+        None is returned when the parent resource cannot be identified.
+        """
+        for separator in (':', '_'):
+            if separator in self.target_field:
+                parent_res = self.target_field.split(separator, 1)[0]
+                return attributes.RESOURCE_FOREIGN_KEYS.get(
+                    "%ss" % parent_res)
+
     def __call__(self, target, creds, enforcer):
         if self.target_field not in target:
             # policy needs a plugin check
@@ -313,13 +397,33 @@ class FieldCheck(policy.Check):
         return target_value == self.value
 
 
+def _get_credentials(context):
+    """Return the credentials of a context for the policy engine."""
+    cache = getattr(context, 'policy_cache', None)
+    if cache is None:
+        return context.to_dict()
+    key = (context.user_id, context.tenant_id, context.is_admin,
+           tuple(context.roles))
+    if cache.credentials is None or cache.credentials_key != key:
+        cache.credentials = context.to_dict()
+        cache.credentials_key = key
+    return cache.credentials
+
+
 def _prepare_check(context, action, target, pluralized):
     """Prepare rule, target, and credentials for the policy engine."""
     # Compare with None to distinguish case in which target is {}
     if target is None:
         target = {}
-    match_rule = _build_match_rule(action, target, pluralized)
-    credentials = context.to_dict()
+    key = _get_match_rule_key(action, target, pluralized)
+    cache = getattr(context, 'policy_cache', None)
+    if cache is None:
+        match_rule = _get_match_rule(key)
+    else:
+        match_rule = cache.match_rules.get(key)
+        if match_rule is None:
+            match_rule = cache.match_rules[key] = _get_match_rule(key)
+    credentials = _get_credentials(context)
     return match_rule, target, credentials
 
 
@@ -329,6 +433,7 @@ def log_rule_list(match_rule):
         LOG.debug("Enforcing rules: %s", rules)
 
 
+@profiling.timed(profiling.POLICY)
 def check(context, action, target, plugin=None, might_not_exist=False,
           pluralized=None):
     """Verifies that the action is valid on the target in this context.
@@ -369,6 +474,106 @@ def check(context, action, target, plugin=None, might_not_exist=False,
     return result
 
 
+def _get_target_fields(rule, fields, rule_names):
+    """Add to fields the target fields read by a policy rule.
+
+    :param rule_names: names of the rules already walked through
+    :returns: False if the fields read by the rule cannot be determined.
+    """
+    if isinstance(rule, policy.RuleCheck):
+        if rule.match in rule_names:
+            return True
+        rule_names.add(rule.match)
+        try:
+            sub_rule = _ENFORCER.rules[rule.match]
+        except KeyError:
+            # the check fails whatever the target
+            return True
+        return _get_target_fields(sub_rule, fields, rule_names)
+    if isinstance(rule, (policy.AndCheck, policy.OrCheck)):
+        return all(_get_target_fields(sub_rule, fields, rule_names)
+                   for sub_rule in rule.rules)
+    if isinstance(rule, policy.NotCheck):
+        return _get_target_fields(rule.rule, fields, rule_names)
+    if isinstance(rule, OwnerCheck):
+        fields.add(rule.target_field)
+        foreign_key = rule.get_parent_foreign_key()
+        if foreign_key:
+            fields.add(foreign_key)
+        return True
+    if isinstance(rule, FieldCheck):
+        fields.add(rule.field)
+        return True
+    if isinstance(rule, policy.Check):
+        # NOTE: the other checks read the target through their match only,
+        # except the http check which sends the whole target.
+        if rule.kind == 'http':
+            return False
+        fields.update(TARGET_FIELD_RE.findall(rule.match))
+    # true and false checks do not read the target
+    return True
+
+
+@profiling.timed(profiling.POLICY)
+def filter_authorized(context, action, targets, pluralized=None):
+    """Return the targets on which an action is allowed in a context.
+
+    This is equivalent to calling check() for every target, but when the
+    rule of the action does not depend on the attributes set in the
+    targets it is evaluated once for each distinct combination of the
+    target fields it reads. With the default policies this means once per
+    owner of the targets, and per parent resource for the ownership checks
+    of a parent, instead of once per target.
+
+    :param context: neutron context
+    :param action: string representing the action to be checked
+    :param targets: list of dictionaries representing the objects
+    :param pluralized: pluralized case of resource
+    """
+    if context.is_admin:
+        return list(targets)
+    init()
+    # enforce() would only reload a modified policy file after the fields
+    # read by its rules are collected
+    _ENFORCER.load_rules()
+    enforce_attr_based_check = get_resource_and_action(action,
+                                                       pluralized)[1]
+    match_rule = policy.RuleCheck('rule', action)
+    fields = set()
+    if (enforce_attr_based_check or
+            not _get_target_fields(match_rule, fields, set())):
+        return [target for target in targets
+                if check(context, action, target, pluralized=pluralized)]
+
+    fields = sorted(fields)
+    credentials = _get_credentials(context)
+    results = {}
+    authorized = []
+    for target in targets:
+        # the rule only sees the fields it reads, so that the checks of a
+        # parent do not store the parent fields in the target
+        view = dict((field, target[field]) for field in fields
+                    if field in target)
+        key = tuple((field in view, view.get(field)) for field in fields)
+        try:
+            result = results.get(key)
+        except TypeError:
+            # unhashable field value, evaluate the rule for this target
+            key = None
+            result = None
+        if result is None:
+            result = _ENFORCER.enforce(match_rule, view, credentials,
+                                       pluralized=pluralized)
+            if not result:
+                log_rule_list(match_rule)
+            if key is not None:
+                results[key] = result
+        if result:
+            authorized.append(target)
+    return authorized
+
+
+@profiling.timed(profiling.POLICY)
 def enforce(context, action, target, plugin=None, pluralized=None):
     """Verifies that the action is valid on the target in this context.
 
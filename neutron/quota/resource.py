@@ -185,9 +185,10 @@ class TrackedResource(BaseResource):
             # Indeed when this method is called the request has been processed
             # and therefore all resources created or deleted.
             # dirty_tenants will contain all the tenants for which the
-            # resource count is changed. The list might contain also tenants
-            # for which resource count was altered in other requests, but this
-            # won't be harmful.
+            # resource count is changed but which had no usage data to
+            # update. The list might contain also tenants for which resource
+            # count was altered in other requests, but this won't be
+            # harmful.
             dirty_tenants_snap = self._dirty_tenants.copy()
             for tenant_id in dirty_tenants_snap:
                 quota_api.set_quota_usage_dirty(context, self.name, tenant_id)
@@ -197,14 +198,25 @@ class TrackedResource(BaseResource):
         self._out_of_sync_tenants |= dirty_tenants_snap
         self._dirty_tenants -= dirty_tenants_snap
 
-    def _db_event_handler(self, mapper, _conn, target):
+    def _db_event_handler(self, mapper, connection, target, delta=1):
         try:
             tenant_id = target['tenant_id']
         except AttributeError:
             with excutils.save_and_reraise_exception():
                 LOG.error(_LE("Model class %s does not have a tenant_id "
                               "attribute"), target)
-        self._dirty_tenants.add(tenant_id)
+        # Keep the usage counter exact by updating it in the transaction
+        # creating or deleting the resource. Only when the tenant has no
+        # usage data yet its resources are counted again.
+        if not quota_api.update_quota_usage_in_flush(
+                connection, self.name, tenant_id, delta):
+            self._dirty_tenants.add(tenant_id)
+
+    def _db_insert_handler(self, mapper, connection, target):
+        self._db_event_handler(mapper, connection, target, delta=1)
+
+    def _db_delete_handler(self, mapper, connection, target):
+        self._db_event_handler(mapper, connection, target, delta=-1)
 
     # Retry the operation if a duplicate entry exception is raised. This
     # can happen is two or more workers are trying to create a resource of a
@@ -248,8 +260,11 @@ class TrackedResource(BaseResource):
         data, unless usage data are marked as "dirty".
         In the latter case resource usage will be calculated counting
         rows for tenant_id in the resource's database model.
-        Active reserved amount are instead always calculated by summing
-        amounts for matching records in the 'reservations' database model.
+        The reserved amount is kept with usage data as well, it is only
+        calculated by summing amounts for matching records in the
+        'reservations' database model when usage data are missing. Unlike
+        usage data it includes reservations which expired but were not
+        removed yet.
 
         The _plugin and _resource parameters are unused but kept for
         compatibility with the signature of the count method for
@@ -258,10 +273,6 @@ class TrackedResource(BaseResource):
         # Load current usage data, setting a row-level lock on the DB
         usage_info = quota_api.get_quota_usage_by_resource_and_tenant(
             context, self.name, tenant_id, lock_for_update=True)
-        # Always fetch reservations, as they are not tracked by usage counters
-        reservations = quota_api.get_reservations_for_resources(
-            context, tenant_id, [self.name])
-        reserved = reservations.get(self.name, 0)
 
         # If dirty or missing, calculate actual resource usage querying
         # the database and set/create usage info data
@@ -287,25 +298,30 @@ class TrackedResource(BaseResource):
                 resource = usage_info.resource if usage_info else self.name
                 tenant_id = usage_info.tenant_id if usage_info else tenant_id
                 dirty = usage_info.dirty if usage_info else True
+                reserved = (usage_info.reserved if usage_info else
+                            quota_api.get_reserved_amount(
+                                context, self.name, tenant_id))
                 usage_info = quota_api.QuotaUsageInfo(
-                    resource, tenant_id, in_use, dirty)
+                    resource, tenant_id, in_use, dirty, reserved)
 
             LOG.debug(("Quota usage for %(resource)s was recalculated. "
                        "Used quota:%(used)d."),
                       {'resource': self.name,
                        'used': usage_info.used})
-        return usage_info.used + reserved
+        return usage_info.used + usage_info.reserved
 
     def register_events(self):
-        event.listen(self._model_class, 'after_insert', self._db_event_handler)
-        event.listen(self._model_class, 'after_delete', self._db_event_handler)
+        event.listen(self._model_class, 'after_insert',
+                     self._db_insert_handler)
+        event.listen(self._model_class, 'after_delete',
+                     self._db_delete_handler)
 
     def unregister_events(self):
         try:
             event.remove(self._model_class, 'after_insert',
-                         self._db_event_handler)
+                         self._db_insert_handler)
             event.remove(self._model_class, 'after_delete',
-                         self._db_event_handler)
+                         self._db_delete_handler)
         except sql_exc.InvalidRequestError:
             LOG.warning(_LW("No sqlalchemy event for resource %s found"),
                         self.name)
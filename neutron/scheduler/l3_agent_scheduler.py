@@ -16,6 +16,7 @@
 import abc
 import collections
 import functools
+import heapq
 import itertools
 import random
 
@@ -23,13 +24,17 @@ from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_log import log as logging
 import six
+import sqlalchemy as sa
+from sqlalchemy import func
 from sqlalchemy import sql
 
 from neutron._i18n import _LE, _LW
 from neutron.common import constants
 from neutron.common import utils
+from neutron.db import agents_db
 from neutron.db import api as db_api
 from neutron.db import l3_agentschedulers_db
+from neutron.db import l3_attrs_db
 from neutron.db import l3_db
 from neutron.db import l3_hamode_db
 from neutron.extensions import availability_zone as az_ext
@@ -182,6 +187,193 @@ class L3Scheduler(object):
 
             return candidates
 
+    def _get_router_candidates(self, plugin, context, sync_router,
+                               l3_agents):
+        """Return the L3 agents among l3_agents which can host a router."""
+        return plugin.get_l3_agent_candidates(context, sync_router, l3_agents)
+
+    @staticmethod
+    def _get_agent_loads(context, agent_ids):
+        """Return the number of routers bound to each agent."""
+        binding_model = l3_agentschedulers_db.RouterL3AgentBinding
+        loads = dict.fromkeys(agent_ids, 0)
+        if agent_ids:
+            query = context.session.query(
+                binding_model.l3_agent_id,
+                func.count(binding_model.router_id)).filter(
+                    binding_model.l3_agent_id.in_(agent_ids)).group_by(
+                        binding_model.l3_agent_id)
+            loads.update(query)
+        return loads
+
+    @staticmethod
+    def _get_hosted_router_ids(context, router_ids):
+        """Return the ids of the routers bound to an enabled agent."""
+        binding_model = l3_agentschedulers_db.RouterL3AgentBinding
+        query = context.session.query(binding_model.router_id).join(
+            binding_model.l3_agent).filter(
+                binding_model.router_id.in_(router_ids),
+                agents_db.Agent.admin_state_up == sql.true())
+        return set(row.router_id for row in query)
+
+    def _pick_planned_agent(self, heap, loads):
+        """Return the least loaded agent of a heap of (load, agent id).
+
+        The heap entries of the agents chosen from another heap are out of
+        date, they are refreshed when they reach the top.
+        """
+        while True:
+            load, agent_id = heap[0]
+            if load == loads[agent_id]:
+                heapq.heapreplace(heap, (load + 1, agent_id))
+                return agent_id
+            heapq.heapreplace(heap, (loads[agent_id], agent_id))
+
+    def _plan_routers(self, plugin, context, sync_routers):
+        """Choose an agent for each router, loading the agents only once.
+
+        The routers which can be hosted by the same agents share a heap of
+        these agents ordered by their number of routers.
+        """
+        l3_agents = plugin.get_l3_agents(context, active=True)
+        if not l3_agents:
+            LOG.warning(_LW('No active L3 agents'))
+            return []
+        agents = dict((agent.id, agent) for agent in l3_agents)
+        loads = self._get_agent_loads(context, list(agents))
+        heaps = {}
+        plan = []
+        for sync_router in sync_routers:
+            candidate_ids = tuple(sorted(
+                agent.id for agent in self._get_router_candidates(
+                    plugin, context, sync_router, l3_agents)))
+            if not candidate_ids:
+                LOG.warning(_LW('No L3 agents can host the router %s'),
+                            sync_router['id'])
+                continue
+            heap = heaps.get(candidate_ids)
+            if heap is None:
+                heap = [(loads[agent_id], agent_id)
+                        for agent_id in candidate_ids]
+                heapq.heapify(heap)
+                heaps[candidate_ids] = heap
+            agent_id = self._pick_planned_agent(heap, loads)
+            loads[agent_id] += 1
+            plan.append((sync_router['id'], agents[agent_id]))
+        return plan
+
+    def _bind_planned_routers(self, context, plan):
+        try:
+            with context.session.begin(subtransactions=True):
+                for router_id, agent in plan:
+                    context.session.add(
+                        l3_agentschedulers_db.RouterL3AgentBinding(
+                            router_id=router_id, l3_agent_id=agent.id))
+        except (db_exc.DBDuplicateEntry, db_exc.DBReferenceError):
+            # Some routers were scheduled or removed concurrently
+            for router_id, agent in plan:
+                self.bind_router(context, router_id, agent)
+            return
+        LOG.debug('Scheduled %d routers to L3 agents', len(plan))
+
+    def schedule_routers(self, plugin, context, router_ids):
+        """Schedule the routers not hosted by an enabled agent yet.
+
+        The routers are placed together on the agents with the least
+        routers, and their bindings are written in one transaction. HA
+        routers need a port on each of their agents and are scheduled one
+        at a time.
+        """
+        if not router_ids:
+            return
+        hosted_ids = self._get_hosted_router_ids(context, router_ids)
+        router_ids = [router_id for router_id in router_ids
+                      if router_id not in hosted_ids]
+        if not router_ids:
+            return
+        sync_routers = []
+        for sync_router in plugin.get_routers(context,
+                                              filters={'id': router_ids}):
+            if sync_router.get('ha', False):
+                self.schedule(plugin, context, sync_router['id'])
+            else:
+                sync_routers.append(sync_router)
+        if sync_routers:
+            self._bind_planned_routers(
+                context, self._plan_routers(plugin, context, sync_routers))
+
+    def _get_movable_routers(self, plugin, context, agent_ids):
+        """Return the routers bound to each agent which can be moved.
+
+        HA routers have a port on each of their agents, and the SNAT part
+        of distributed routers has its own scheduling, they are left alone.
+        """
+        binding_model = l3_agentschedulers_db.RouterL3AgentBinding
+        attrs_model = l3_attrs_db.RouterExtraAttributes
+        query = context.session.query(
+            binding_model.router_id, binding_model.l3_agent_id).outerjoin(
+                attrs_model,
+                attrs_model.router_id == binding_model.router_id).filter(
+                    binding_model.l3_agent_id.in_(agent_ids),
+                    sa.or_(attrs_model.ha == sql.false(),
+                           attrs_model.ha == sql.null()),
+                    sa.or_(attrs_model.distributed == sql.false(),
+                           attrs_model.distributed == sql.null()))
+        router_agents = dict(query)
+        routers = collections.defaultdict(list)
+        if router_agents:
+            for sync_router in plugin.get_routers(
+                    context, filters={'id': list(router_agents)}):
+                routers[router_agents[sync_router['id']]].append(sync_router)
+        return routers
+
+    def plan_rebalance(self, plugin, context):
+        """Plan the router moves evening out the routers of the agents.
+
+        Routers are moved from the agent with the most routers to the
+        candidate agent with the least routers, as long as it has at least
+        two routers less. Returns a list of (router id, current agent, new
+        agent) tuples.
+        """
+        l3_agents = plugin.get_l3_agents(context, active=True)
+        agents = dict((agent.id, agent) for agent in l3_agents)
+        loads = self._get_agent_loads(context, list(agents))
+        routers = self._get_movable_routers(plugin, context, list(agents))
+        candidates = {}
+        heap = [(-load, agent_id) for agent_id, load in loads.items()]
+        heapq.heapify(heap)
+        plan = []
+        while heap:
+            load, agent_id = heapq.heappop(heap)
+            if -load != loads[agent_id]:
+                heapq.heappush(heap, (-loads[agent_id], agent_id))
+                continue
+            for sync_router in routers[agent_id]:
+                if sync_router['id'] not in candidates:
+                    candidates[sync_router['id']] = [
+                        agent.id for agent in self._get_router_candidates(
+                            plugin, context, sync_router, l3_agents)]
+                target_ids = [target_id for target_id in
+                              candidates[sync_router['id']]
+                              if target_id != agent_id]
+                if not target_ids:
+                    continue
+                target_id = min(target_ids, key=loads.get)
+                if loads[agent_id] - loads[target_id] > 1:
+                    break
+            else:
+                # None of the routers of the agent can be moved anymore
+                continue
+            routers[agent_id].remove(sync_router)
+            routers[target_id].append(sync_router)
+            loads[agent_id] -= 1
+            loads[target_id] += 1
+            heapq.heappush(heap, (-loads[agent_id], agent_id))
+            heapq.heappush(heap, (-loads[target_id], target_id))
+            plan.append((sync_router['id'], agents[agent_id],
+                         agents[target_id]))
+        return plan
+
     def _bind_routers(self, context, plugin, routers, l3_agent):
         for router in routers:
             if router.get('ha'):
@@ -360,6 +552,9 @@ class ChanceScheduler(L3Scheduler):
     def _choose_router_agent(self, plugin, context, candidates):
         return random.choice(candidates)
 
+    def _pick_planned_agent(self, heap, loads):
+        return random.choice(heap)[1]
+
     def _choose_router_agents_for_ha(self, plugin, context, candidates):
         num_agents = self._get_num_of_agents_for_ha(len(candidates))
         return random.sample(candidates, num_agents)
@@ -410,12 +605,7 @@ class AZLeastRoutersScheduler(LeastRoutersScheduler):
         return super(AZLeastRoutersScheduler, self)._get_routers_can_schedule(
             context, plugin, target_routers, l3_agent)
 
-    def _get_candidates(self, plugin, context, sync_router):
-        """Overwrite L3Scheduler's method to filter by availability zone."""
-        all_candidates = (
-            super(AZLeastRoutersScheduler, self)._get_candidates(
-                plugin, context, sync_router))
-
+    def _filter_candidates_by_az(self, sync_router, all_candidates):
         candidates = []
         az_hints = self._get_az_hints(sync_router)
         for agent in all_candidates:
@@ -424,6 +614,21 @@ class AZLeastRoutersScheduler(LeastRoutersScheduler):
 
         return candidates
 
+    def _get_candidates(self, plugin, context, sync_router):
+        """Overwrite L3Scheduler's method to filter by availability zone."""
+        all_candidates = (
+            super(AZLeastRoutersScheduler, self)._get_candidates(
+                plugin, context, sync_router))
+        return self._filter_candidates_by_az(sync_router, all_candidates)
+
+    def _get_router_candidates(self, plugin, context, sync_router,
+                               l3_agents):
+        """Overwrite L3Scheduler's method to filter by availability zone."""
+        all_candidates = (
+            super(AZLeastRoutersScheduler, self)._get_router_candidates(
+                plugin, context, sync_router, l3_agents))
+        return self._filter_candidates_by_az(sync_router, all_candidates)
+
     def get_ha_routers_l3_agents_counts(self, context, plugin, filters=None):
         """Overwrite L3Scheduler's method to filter by availability zone."""
         all_routers_agents = (
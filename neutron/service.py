@@ -26,9 +26,11 @@ from oslo_service import service as common_service
 from oslo_utils import excutils
 from oslo_utils import importutils
 
-from neutron._i18n import _, _LE, _LI
+from neutron._i18n import _, _LE, _LI, _LW
+from neutron.api import profiling
 from neutron.common import config
 from neutron.common import rpc as n_rpc
+from neutron.common import topics
 from neutron import context
 from neutron.db import api as session
 from neutron import manager
@@ -51,6 +53,16 @@ service_opts = [
                default=1,
                help=_('Number of RPC worker processes dedicated to state '
                       'reports queue')),
+    cfg.ListOpt('rpc_worker_pools',
+                default=[],
+                help=_('Pools of RPC worker processes dedicated to the '
+                       'queues of a topic, as <topic>:<workers>[:<threads>], '
+                       'for instance q-l3-plugin:2:32 so that the slow '
+                       'router syncs do not delay the other RPC requests. '
+                       'The topic of a pool is only consumed by its '
+                       '<workers> processes, which handle up to <threads> '
+                       'requests at a time each instead of '
+                       'executor_thread_pool_size.')),
     cfg.IntOpt('periodic_fuzzy_delay',
                default=5,
                help=_('Range of seconds to randomly delay when starting the '
@@ -127,16 +139,62 @@ def start_plugin_workers():
     return launchers
 
 
+def _get_rpc_worker_pools():
+    """Return the topic, workers and threads of the RPC worker pools."""
+    pools = []
+    for entry in cfg.CONF.rpc_worker_pools:
+        fields = entry.strip().split(':')
+        try:
+            if len(fields) not in (2, 3) or not fields[0]:
+                raise ValueError()
+            workers = int(fields[1])
+            threads = int(fields[2]) if len(fields) == 3 else None
+        except ValueError:
+            raise ValueError(_("Invalid RPC worker pool '%s', expected "
+                               "<topic>:<workers>[:<threads>]") % entry)
+        topic = fields[0]
+        if topic == topics.REPORTS:
+            raise ValueError(_("Topic %s can not have a RPC worker pool, "
+                               "use rpc_state_report_workers instead") %
+                             topic)
+        if topic in [pool[0] for pool in pools]:
+            raise ValueError(_("Duplicate RPC worker pool for topic %s") %
+                             topic)
+        if workers < 1 or (threads is not None and threads < 1):
+            raise ValueError(_("Invalid RPC worker pool '%s', workers and "
+                               "threads must be positive") % entry)
+        pools.append((topic, workers, threads))
+    return pools
+
+
+def _set_executor_thread_pool_size(size):
+    # NOTE: the option belongs to oslo.messaging, the overridden value only
+    # applies to the RPC servers of the worker process
+    try:
+        cfg.CONF.set_override('executor_thread_pool_size', size)
+    except cfg.NoSuchOptError:
+        LOG.warning(_LW("Unable to set the number of RPC executor threads "
+                        "to %d, using the default one"), size)
+
+
 class RpcWorker(worker.NeutronWorker):
     """Wraps a worker to be handled by ProcessLauncher"""
     start_listeners_method = 'start_rpc_listeners'
 
-    def __init__(self, plugins):
+    def __init__(self, plugins, consumer_topics=None, excluded_topics=(),
+                 executor_threads=None):
         self._plugins = plugins
         self._servers = []
+        self._consumer_topics = consumer_topics
+        self._excluded_topics = excluded_topics
+        self._executor_threads = executor_threads
 
     def start(self):
         super(RpcWorker, self).start()
+        n_rpc.set_consumer_topics(self._consumer_topics,
+                                  self._excluded_topics)
+        if self._executor_threads:
+            _set_executor_thread_pool_size(self._executor_threads)
         for plugin in self._plugins:
             if hasattr(plugin, self.start_listeners_method):
                 try:
@@ -199,8 +257,10 @@ def serve_rpc():
         raise NotImplementedError()
 
     try:
+        pools = _get_rpc_worker_pools()
         # passing service plugins only, because core plugin is among them
-        rpc = RpcWorker(service_plugins)
+        rpc = RpcWorker(service_plugins,
+                        excluded_topics=[pool[0] for pool in pools])
         # dispose the whole pool before os.fork, otherwise there will
         # be shared DB connections in child processes which may cause
         # DB errors.
@@ -208,6 +268,15 @@ def serve_rpc():
         session.dispose()
         launcher = common_service.ProcessLauncher(cfg.CONF, wait_interval=1.0)
         launcher.launch_service(rpc, workers=cfg.CONF.rpc_workers)
+        for topic, workers, threads in pools:
+            LOG.debug('using launcher for rpc topic %(topic)s, '
+                      'workers=%(workers)s, threads=%(threads)s',
+                      {'topic': topic, 'workers': workers,
+                       'threads': threads})
+            launcher.launch_service(
+                RpcWorker(service_plugins, consumer_topics=[topic],
+                          executor_threads=threads),
+                workers=workers)
         if (cfg.CONF.rpc_state_report_workers > 0 and
             plugin.rpc_state_report_workers_supported()):
             rpc_state_rep = RpcReportsWorker([plugin])
@@ -239,6 +308,8 @@ def _run_wsgi(app_name):
 
 
 def run_wsgi_app(app):
+    if cfg.CONF.api_profiling:
+        app = profiling.RequestProfiler(app)
     server = wsgi.Server("Neutron")
     server.start(app, cfg.CONF.bind_port, cfg.CONF.bind_host,
                  workers=_get_api_workers())
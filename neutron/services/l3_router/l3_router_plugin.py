@@ -57,6 +57,11 @@ class L3RouterPlugin(service_base.ServicePluginBase,
                                    "l3-ha", "router_availability_zone",
                                    "dns-integration"]
 
+    # Routers are sorted on attributes which are not columns of their table,
+    # like ha and distributed, so only floating IPs are sorted by the DB.
+    __native_pagination_support = ('floatingips',)
+    __native_sorting_support = ('floatingips',)
+
     @resource_registry.tracked_resources(router=l3_db.Router,
                                          floatingip=l3_db.FloatingIP)
     def __init__(self):
@@ -24,10 +24,12 @@ from neutron import context
 from neutron.db import db_base_plugin_v2 as base_plugin
 from neutron.db import model_base
 from neutron.db import models_v2
-from neutron.ipam.drivers.neutrondb_ipam import db_models as ipam_models
 from neutron.tests import base
 from neutron.tests.common import base as common_base
 
+cfg.CONF.import_opt('ipam_allocation_window',
+                    'neutron.ipam.drivers.neutrondb_ipam.driver')
+
 
 def get_admin_test_context(db_url):
     """
@@ -71,9 +73,13 @@ class IpamTestCase(object):
 
     def _turn_on_pluggable_ipam(self):
         cfg.CONF.set_override('ipam_driver', 'internal')
+        # The expected allocations are the in order ones of the non
+        # pluggable IPAM
+        cfg.CONF.set_override('ipam_allocation_window', 1)
         DB_PLUGIN_KLASS = 'neutron.db.db_base_plugin_v2.NeutronDbPluginV2'
         self.setup_coreplugin(DB_PLUGIN_KLASS)
-        self.ip_availability_range = ipam_models.IpamAvailabilityRange
+        # The reference IPAM driver does not keep availability ranges
+        self.ip_availability_range = None
 
     def result_set_to_dicts(self, resultset, keys):
         dicts = []
@@ -89,6 +95,8 @@ class IpamTestCase(object):
         self.assertEqual(expected, actual)
 
     def assert_ip_avail_range_matches(self, expected):
+        if self.ip_availability_range is None:
+            return
         result_set = self.cxt.session.query(
             self.ip_availability_range).all()
         keys = ['first_ip', 'last_ip']
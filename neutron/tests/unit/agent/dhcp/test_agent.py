@@ -352,6 +352,7 @@ class TestDhcpAgent(base.BaseTestCase):
 
         with mock.patch(DHCP_PLUGIN) as plug:
             mock_plugin = mock.Mock()
+            mock_plugin.get_active_networks.return_value = active_net_ids
             mock_plugin.get_active_networks_info.return_value = active_networks
             plug.return_value = mock_plugin
 
@@ -359,10 +360,13 @@ class TestDhcpAgent(base.BaseTestCase):
 
             attrs_to_mock = dict([(a, mock.DEFAULT)
                                  for a in ['disable_dhcp_helper', 'cache',
-                                           'safe_configure_dhcp_for_network']])
+                                           'safe_configure_dhcp_for_network',
+                                           '_sync_priority']])
 
             with mock.patch.multiple(dhcp, **attrs_to_mock) as mocks:
                 mocks['cache'].get_network_ids.return_value = known_net_ids
+                mocks['cache'].get_network_by_id.return_value = None
+                mocks['_sync_priority'].return_value = 0
                 dhcp.sync_state()
 
                 diff = set(known_net_ids) - set(active_net_ids)
@@ -389,6 +393,7 @@ class TestDhcpAgent(base.BaseTestCase):
     def test_sync_state_for_all_networks_plugin_error(self):
         with mock.patch(DHCP_PLUGIN) as plug:
             mock_plugin = mock.Mock()
+            mock_plugin.get_active_networks.return_value = ['foo_network']
             mock_plugin.get_active_networks_info.side_effect = Exception
             plug.return_value = mock_plugin
 
@@ -405,6 +410,7 @@ class TestDhcpAgent(base.BaseTestCase):
         with mock.patch(DHCP_PLUGIN) as plug:
             mock_plugin = mock.Mock()
             exc = Exception()
+            mock_plugin.get_active_networks.return_value = ['foo_network']
             mock_plugin.get_active_networks_info.side_effect = exc
             plug.return_value = mock_plugin
 
@@ -417,6 +423,126 @@ class TestDhcpAgent(base.BaseTestCase):
                     self.assertTrue(log.called)
                     schedule_resync.assert_called_with(exc, 'foo_network')
 
+    def _test_sync_state_delta(self, cached_net, active_net,
+                               resync_unchanged=False, configured=True,
+                               adopted=False):
+        cfg.CONF.set_override('resync_unchanged_networks', resync_unchanged)
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            mock_plugin.get_active_networks.return_value = [active_net.id]
+            mock_plugin.get_active_networks_info.return_value = [active_net]
+            plug.return_value = mock_plugin
+
+            dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
+            dhcp.cache.put(cached_net)
+            if configured:
+                dhcp._configured_networks.add(cached_net.id)
+            with mock.patch.object(dhcp, 'safe_configure_dhcp_for_network'
+                                   ) as configure,\
+                    mock.patch.object(dhcp, '_get_driver') as get_driver,\
+                    mock.patch.object(dhcp, '_configure_metadata_proxy'
+                                      ) as configure_metadata:
+                get_driver.return_value.adopt.return_value = adopted
+                dhcp.sync_state()
+                if not configured and not resync_unchanged:
+                    get_driver.return_value.adopt.assert_called_once_with(
+                        dhcp_agent.network_fingerprint(active_net))
+                    self.assertEqual(adopted, configure_metadata.called)
+                if not configure.called:
+                    self.assertIn(active_net.id, dhcp._configured_networks)
+                    # the cached network is refreshed nonetheless
+                    self.assertIs(active_net,
+                                  dhcp.cache.get_network_by_id(active_net.id))
+                return configure.called
+
+    def test_sync_state_skips_unchanged_network(self):
+        self.assertFalse(self._test_sync_state_delta(
+            copy.deepcopy(fake_network), copy.deepcopy(fake_network)))
+
+    def test_sync_state_ignores_port_status_change(self):
+        active_net = copy.deepcopy(fake_network)
+        active_net.ports[0].status = 'DOWN'
+        self.assertFalse(self._test_sync_state_delta(
+            copy.deepcopy(fake_network), active_net))
+
+    def test_sync_state_configures_changed_network(self):
+        active_net = copy.deepcopy(fake_network)
+        active_net.ports[0].mac_address = '00:00:00:00:00:01'
+        self.assertTrue(self._test_sync_state_delta(
+            copy.deepcopy(fake_network), active_net))
+
+    def test_sync_state_configures_network_found_at_start(self):
+        self.assertTrue(self._test_sync_state_delta(
+            copy.deepcopy(fake_network), copy.deepcopy(fake_network),
+            configured=False))
+
+    def test_sync_state_adopts_running_network_found_at_start(self):
+        self.assertFalse(self._test_sync_state_delta(
+            copy.deepcopy(fake_network), copy.deepcopy(fake_network),
+            configured=False, adopted=True))
+
+    def test_sync_state_resync_unchanged_networks(self):
+        self.assertTrue(self._test_sync_state_delta(
+            copy.deepcopy(fake_network), copy.deepcopy(fake_network),
+            resync_unchanged=True))
+
+    def test_sync_state_priority(self):
+        recent = dhcp.NetModel(dict(id='recent', ports=[
+            dict(id='1', updated_at='2016-02-02T10:00:00')]))
+        big = dhcp.NetModel(dict(id='big', ports=[
+            dict(id=str(i), updated_at='2016-01-01T10:00:00')
+            for i in range(3)]))
+        small = dhcp.NetModel(dict(id='small', ports=[
+            dict(id='1', updated_at='2016-01-01T10:00:00')]))
+        networks = [small, recent, big]
+        networks.sort(key=dhcp_agent.DhcpAgent._sync_priority, reverse=True)
+        self.assertEqual(['recent', 'big', 'small'],
+                         [n.id for n in networks])
+
+    def test_fetch_active_networks_in_chunks(self):
+        net_ids = [str(i) for i in range(5)]
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            mock_plugin.get_active_networks.return_value = net_ids
+            mock_plugin.get_active_networks_info.side_effect = (
+                lambda ids: [mock.Mock(id=i) for i in ids])
+            plug.return_value = mock_plugin
+            dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
+            dhcp.sync_networks_chunk_size = 2
+            networks = dhcp._fetch_active_networks()
+            self.assertEqual(net_ids, [n.id for n in networks])
+            mock_plugin.get_active_networks_info.assert_has_calls(
+                [mock.call(['0', '1']), mock.call(['2', '3']),
+                 mock.call(['4'])])
+            self.assertEqual(2 + dhcp_agent.SYNC_NETWORKS_MIN_CHUNK_SIZE,
+                             dhcp.sync_networks_chunk_size)
+
+    def test_fetch_active_networks_timeout_decreases_chunk_size(self):
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            mock_plugin.get_active_networks.return_value = ['a']
+            mock_plugin.get_active_networks_info.side_effect = (
+                oslo_messaging.MessagingTimeout)
+            plug.return_value = mock_plugin
+            dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
+            self.assertRaises(oslo_messaging.MessagingTimeout,
+                              dhcp._fetch_active_networks)
+            self.assertEqual(dhcp_agent.SYNC_NETWORKS_MAX_CHUNK_SIZE // 2,
+                             dhcp.sync_networks_chunk_size)
+
+    def test_fetch_active_networks_unsupported_version(self):
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            mock_plugin.get_active_networks.return_value = ['a']
+            networks = [mock.Mock(id='a')]
+            mock_plugin.get_active_networks_info.side_effect = [
+                oslo_messaging.RemoteError('UnsupportedVersion'), networks]
+            plug.return_value = mock_plugin
+            dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
+            self.assertEqual(networks, dhcp._fetch_active_networks())
+            mock_plugin.get_active_networks_info.assert_has_calls(
+                [mock.call(['a']), mock.call()])
+
     def test_periodic_resync(self):
         dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
         with mock.patch.object(dhcp_agent.eventlet, 'spawn') as spawn:
@@ -615,8 +741,13 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.dhcp.enable_dhcp_helper(network.id)
         self.plugin.assert_has_calls([
             mock.call.get_network_info(network.id)])
-        self.call_driver.assert_called_once_with('enable', network)
+        self.assertEqual(
+            [mock.call('enable', network),
+             mock.call('save_fingerprint', network,
+                       fingerprint=self.cache.get_fingerprint.return_value)],
+            self.call_driver.call_args_list)
         self.cache.assert_has_calls([mock.call.put(network)])
+        self.assertIn(network.id, self.dhcp._configured_networks)
         if is_isolated_network and enable_isolated_metadata:
             self.external_process.assert_has_calls([
                 self._process_manager_constructor_call(),
@@ -733,15 +864,18 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.call_driver.assert_called_once_with('enable', fake_network)
         self.assertFalse(self.cache.called)
         self.assertFalse(self.external_process.called)
+        self.assertNotIn(fake_network.id, self.dhcp._configured_networks)
 
     def _disable_dhcp_helper_known_network(self, isolated_metadata=False):
         if isolated_metadata:
             cfg.CONF.set_override('enable_isolated_metadata', True)
         self.cache.get_network_by_id.return_value = fake_network
+        self.dhcp._configured_networks.add(fake_network.id)
         self.dhcp.disable_dhcp_helper(fake_network.id)
         self.cache.assert_has_calls(
             [mock.call.get_network_by_id(fake_network.id)])
         self.call_driver.assert_called_once_with('disable', fake_network)
+        self.assertNotIn(fake_network.id, self.dhcp._configured_networks)
         if isolated_metadata:
             self.external_process.assert_has_calls([
                 self._process_manager_constructor_call(ns=None),
@@ -909,6 +1043,45 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
             self.assertTrue(log.called)
             self.assertTrue(self.dhcp.schedule_resync.called)
 
+    def _make_revised_network(self, port_ids, **kwargs):
+        return dhcp.NetModel(dict(id='net-id',
+                                  tenant_id=fake_network.tenant_id,
+                                  admin_state_up=True,
+                                  subnets=[fake_subnet1],
+                                  ports=[dict(id=port_id)
+                                         for port_id in port_ids],
+                                  **kwargs))
+
+    def test_refresh_dhcp_helper_network_changes(self):
+        cached = self._make_revised_network(['p1', 'p2'], revision=1.0)
+        changes = self._make_revised_network(['p3'], revision=2.0,
+                                             port_ids=['p1', 'p3'])
+        self.cache.get_network_by_id.return_value = cached
+        self.plugin.get_network_info_since.return_value = changes
+        self.dhcp.refresh_dhcp_helper(cached.id)
+        self.plugin.get_network_info_since.assert_called_once_with(
+            'net-id', 1.0)
+        self.assertFalse(self.plugin.get_network_info.called)
+        network = self.cache.put.call_args[0][0]
+        self.assertEqual(['p1', 'p3'], [port.id for port in network.ports])
+        self.assertEqual(2.0, network.revision)
+        self.assertNotIn('port_ids', network)
+
+    def test_refresh_dhcp_helper_network_changes_missing_port(self):
+        cached = self._make_revised_network(['p1'], revision=1.0)
+        changes = self._make_revised_network([], revision=2.0,
+                                             port_ids=['p1', 'p3'])
+        self.cache.get_network_by_id.return_value = cached
+        self.plugin.get_network_info_since.return_value = changes
+        self.plugin.get_network_info.return_value = cached
+        self.dhcp.refresh_dhcp_helper(cached.id)
+        self.plugin.get_network_info.assert_called_once_with('net-id')
+
+    def test_merge_network_changes_full_network(self):
+        network = self._make_revised_network(['p2'], revision=2.0)
+        self.assertIs(network, self.dhcp._merge_network_changes(
+            self._make_revised_network(['p1']), network))
+
     def test_subnet_update_end(self):
         payload = dict(subnet=dict(network_id=fake_network.id))
         self.cache.get_network_by_id.return_value = fake_network
@@ -1050,13 +1223,24 @@ class TestDhcpPluginApiProxy(base.BaseTestCase):
             kwargs['host'] = proxy.host
             rpc_mock.assert_called_once_with(ctxt, method, **kwargs)
 
+    def test_get_active_networks(self):
+        self._test_dhcp_api('get_active_networks')
+
     def test_get_active_networks_info(self):
         self._test_dhcp_api('get_active_networks_info', version='1.1')
 
+    def test_get_active_networks_info_network_ids(self):
+        self._test_dhcp_api('get_active_networks_info', network_ids=['a'],
+                            version='1.4')
+
     def test_get_network_info(self):
         self._test_dhcp_api('get_network_info', network_id='fake_id',
                             return_value=None)
 
+    def test_get_network_info_since(self):
+        self._test_dhcp_api('get_network_info_since', network_id='fake_id',
+                            revision=1.0, return_value=None, version='1.5')
+
     def test_create_dhcp_port(self):
         self._test_dhcp_api('create_dhcp_port', port='fake_port',
                             return_value=None, version='1.1')
@@ -1179,6 +1363,72 @@ class TestNetworkCache(base.BaseTestCase):
         nc.put(fake_network)
         self.assertEqual(nc.get_port_by_id(fake_port1.id), fake_port1)
 
+    def test_get_port_by_mac(self):
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network)
+        self.assertEqual(fake_port1, nc.get_port_by_mac(
+            fake_network.id, fake_port1.mac_address.upper()))
+        self.assertIsNone(nc.get_port_by_mac(fake_network.id,
+                                             '00:00:00:00:00:00'))
+
+    def test_get_port_by_mac_same_mac_on_other_network(self):
+        other_port = copy.deepcopy(fake_port1)
+        other_port.id = 'other-port'
+        other_port.network_id = 'other-network'
+        other_net = dhcp.NetModel(dict(id='other-network', subnets=[],
+                                       ports=[other_port]))
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network)
+        nc.put(other_net)
+        self.assertEqual(fake_port1, nc.get_port_by_mac(
+            fake_network.id, fake_port1.mac_address))
+        self.assertEqual(other_port, nc.get_port_by_mac(
+            other_net.id, fake_port1.mac_address))
+        nc.remove(other_net)
+        self.assertEqual(fake_port1, nc.get_port_by_mac(
+            fake_network.id, fake_port1.mac_address))
+
+    def test_get_ports_by_device_id(self):
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network)
+        self.assertEqual([fake_port1],
+                         nc.get_ports_by_device_id(fake_port1.device_id))
+        self.assertEqual([], nc.get_ports_by_device_id('unknown'))
+
+    def test_remove_port_updates_indexes(self):
+        fake_net = dhcp.NetModel(
+            dict(id='12345678-1234-5678-1234567890ab',
+                 tenant_id='aaaaaaaa-aaaa-aaaa-aaaaaaaaaaaa',
+                 subnets=[fake_subnet1],
+                 ports=[fake_port1, fake_port2]))
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_net)
+        nc.remove_port(fake_port2)
+
+        self.assertIsNone(nc.get_port_by_id(fake_port2.id))
+        self.assertIsNone(nc.get_port_by_mac(fake_net.id,
+                                             fake_port2.mac_address))
+        self.assertEqual([], nc.get_ports_by_device_id(fake_port2.device_id))
+        self.assertEqual(fake_port1, nc.get_port_by_id(fake_port1.id))
+
+    def test_put_port_existing_updates_indexes(self):
+        fake_net = dhcp.NetModel(
+            dict(id='12345678-1234-5678-1234567890ab',
+                 tenant_id='aaaaaaaa-aaaa-aaaa-aaaaaaaaaaaa',
+                 subnets=[fake_subnet1],
+                 ports=[fake_port1]))
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_net)
+        updated_port = copy.deepcopy(fake_port1)
+        updated_port.mac_address = '00:00:00:00:00:01'
+        nc.put_port(updated_port)
+
+        self.assertIs(updated_port, nc.get_port_by_id(fake_port1.id))
+        self.assertIs(updated_port,
+                      nc.get_port_by_mac(fake_net.id, '00:00:00:00:00:01'))
+        self.assertIsNone(nc.get_port_by_mac(fake_net.id,
+                                             fake_port1.mac_address))
+
 
 class FakePort1(object):
     id = 'eeeeeeee-eeee-eeee-eeee-eeeeeeeeeeee'
@@ -272,6 +272,72 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
             self.assertEqual(len(stale_router_ids), destroy_proxy.call_count)
             destroy_proxy.assert_has_calls(expected_calls, any_order=True)
 
+    def test_fetch_and_sync_all_routers_skips_unchanged_routers(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent._queue = mock.Mock()
+        router = {'id': _uuid(), 'distributed': True,
+                  'external_gateway_info': {'network_id': 'ext-net'}}
+        agent.router_info[router['id']] = mock.Mock(router=router)
+        agent._router_revisions[router['id']] = 'rev'
+        self.plugin_api.get_router_ids.return_value = [router['id']]
+        self.plugin_api.get_routers.return_value = [
+            {'id': router['id'],
+             l3_constants.ROUTER_REVISION_KEY: 'rev',
+             l3_constants.ROUTER_UNCHANGED_KEY: True}]
+        ns_manager = mock.Mock()
+        agent.fetch_and_sync_all_routers(agent.context, ns_manager)
+        self.plugin_api.get_routers.assert_called_once_with(
+            agent.context, [router['id']],
+            router_revisions={router['id']: 'rev'})
+        ns_manager.keep_router.assert_called_once_with(router['id'])
+        ns_manager.keep_ext_net.assert_called_once_with('ext-net')
+        self.assertFalse(agent._queue.add.called)
+        self.assertFalse(agent.fullsync)
+
+    def test_fetch_routers_splits_chunk_timing_out(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router_ids = [_uuid() for i in range(
+            l3_agent.SYNC_ROUTERS_MIN_CHUNK_SIZE * 2)]
+
+        def get_routers(context, router_ids, router_revisions):
+            if len(router_ids) > l3_agent.SYNC_ROUTERS_MIN_CHUNK_SIZE:
+                raise oslo_messaging.MessagingTimeout()
+            return [{'id': router_id} for router_id in router_ids]
+
+        self.plugin_api.get_routers.side_effect = get_routers
+        routers = agent._fetch_routers(agent.context, router_ids, {})
+        self.assertEqual(router_ids, [r['id'] for r in routers])
+        self.assertEqual(3, self.plugin_api.get_routers.call_count)
+
+    def test_fetch_routers_timeout_with_min_chunk_size(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.plugin_api.get_routers.side_effect = (
+            oslo_messaging.MessagingTimeout)
+        self.assertRaises(oslo_messaging.MessagingTimeout,
+                          agent._fetch_routers, agent.context,
+                          [_uuid()], {})
+
+    def test_process_router_update_records_revision(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent._process_router_if_compatible = mock.Mock()
+        router = {'id': _uuid(), l3_constants.ROUTER_REVISION_KEY: 'rev'}
+        agent._queue.add(router_processing_queue.RouterUpdate(
+            router['id'],
+            router_processing_queue.PRIORITY_SYNC_ROUTERS_TASK,
+            router=router,
+            timestamp=timeutils.utcnow()))
+        agent._process_router_update()
+        self.assertEqual({router['id']: 'rev'}, agent._router_revisions)
+
+        agent._process_router_if_compatible.side_effect = RuntimeError()
+        agent._queue.add(router_processing_queue.RouterUpdate(
+            router['id'],
+            router_processing_queue.PRIORITY_SYNC_ROUTERS_TASK,
+            router=router,
+            timestamp=timeutils.utcnow()))
+        agent._process_router_update()
+        self.assertEqual({}, agent._router_revisions)
+
     def test_router_info_create(self):
         id = _uuid()
         ri = l3router.RouterInfo(id, {}, **self.ri_kwargs)
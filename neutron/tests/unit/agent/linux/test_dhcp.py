@@ -13,7 +13,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
 import os
+import sys
 
 import mock
 import netaddr
@@ -986,6 +988,13 @@ class TestDhcpLocalProcess(TestBase):
                 conf_file.assert_called_once_with('interface')
                 replace.assert_called_once_with(mock.ANY, 'tap0')
 
+    def test_save_fingerprint(self):
+        net = FakeDualNetwork()
+        lp = LocalChild(self.conf, net)
+        lp.save_fingerprint('fingerprint')
+        self.safe.assert_called_once_with(
+            '/dhcp/%s/fingerprint' % net.id, 'fingerprint')
+
 
 class TestDnsmasq(TestBase):
 
@@ -1818,6 +1827,27 @@ class TestDnsmasq(TestBase):
                                   'bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb'],
                                  sorted(result))
 
+    def _test_adopt(self, saved_fingerprint, active):
+        net = FakeDualNetwork()
+        self.useFixture(tools.OpenFixture(
+            '/dhcp/%s/fingerprint' % net.id, saved_fingerprint))
+        dm = self._get_dnsmasq(net)
+        with mock.patch.object(dhcp.Dnsmasq, 'active') as mock_active:
+            mock_active.__get__ = mock.Mock(return_value=active)
+            adopted = dm.adopt('fingerprint')
+        self.assertEqual(adopted, dm.process_monitor.register.called)
+        return adopted
+
+    def test_adopt(self):
+        self.assertTrue(self._test_adopt('fingerprint', True))
+        self.assertFalse(self.external_process.return_value.enable.called)
+
+    def test_adopt_changed_network(self):
+        self.assertFalse(self._test_adopt('old fingerprint', True))
+
+    def test_adopt_not_active(self):
+        self.assertFalse(self._test_adopt('fingerprint', False))
+
     def test__output_hosts_file_log_only_twice(self):
         dm = self._get_dnsmasq(FakeDualStackNetworkSingleDHCP())
         with mock.patch.object(dhcp, 'LOG') as logger:
@@ -2156,3 +2186,130 @@ class TestDictModel(base.BaseTestCase):
     def test_string_representation_network(self):
         net = dhcp.DictModel({'id': 'id', 'name': 'myname'})
         self.assertEqual('id=id, name=myname', str(net))
+
+    def test_nested_dicts_are_upgraded(self):
+        port = dhcp.DictModel({'id': 'id',
+                               'fixed_ips': [{'subnet_id': 'subnet_id'}],
+                               'binding:profile': {'key': 'value'}})
+        self.assertEqual('subnet_id', port.fixed_ips[0].subnet_id)
+        self.assertEqual('value', port['binding:profile'].key)
+
+    def test_attributes_are_stored_as_items(self):
+        port = dhcp.DictModel({'id': 'id'})
+        port.name = 'name'
+        self.assertEqual({'id': 'id', 'name': 'name'}, port)
+        self.assertFalse(hasattr(port, '__dict__'))
+
+
+def _models_size(model):
+    """Return the memory taken by a model and the containers it holds.
+
+    The leaf values are shared with the payload the model was built from,
+    and are not accounted.
+    """
+    size = 0
+    seen = set()
+    items = [model]
+    while items:
+        item = items.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, dict):
+            items.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            items.extend(item)
+        elif isinstance(item, dhcp.CompactModel):
+            items.extend(item.values())
+            if item._extra is not None:
+                items.append(item._extra)
+        else:
+            continue
+        size += sys.getsizeof(item)
+    return size
+
+
+class TestCompactModel(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestCompactModel, self).setUp()
+        self.payload = {
+            'id': 'port_id', 'name': '', 'network_id': 'net_id',
+            'tenant_id': 'tenant_id', 'mac_address': 'fa:16:3e:00:00:01',
+            'admin_state_up': True, 'status': 'ACTIVE',
+            'device_id': 'device_id', 'device_owner': 'compute:nova',
+            'fixed_ips': [{'subnet_id': 'subnet_id',
+                           'ip_address': '10.0.0.3'},
+                          {'subnet_id': 'subnet_v6_id',
+                           'ip_address': 'fd00::3'}],
+            'extra_dhcp_opts': [{'opt_name': 'tftp-server',
+                                 'opt_value': '10.0.0.1',
+                                 'ip_version': 4}],
+            'allowed_address_pairs': [], 'security_groups': ['sg_id'],
+            'port_security_enabled': True, 'dns_name': '',
+            'binding:host_id': 'host', 'binding:vif_type': 'ovs',
+            'binding:profile': {}}
+
+    def test_attribute_and_item_access(self):
+        port = dhcp.PortModel(self.payload)
+        self.assertEqual('port_id', port.id)
+        self.assertEqual('port_id', port['id'])
+        self.assertEqual('host', port['binding:host_id'])
+        self.assertIsInstance(port.fixed_ips[0], dhcp.FixedIpModel)
+        self.assertEqual('subnet_id', port.fixed_ips[0].subnet_id)
+        self.assertEqual('tftp-server', port.extra_dhcp_opts[0].opt_name)
+        self.assertIsInstance(port['binding:profile'], dhcp.DictModel)
+        self.assertFalse(hasattr(port, '__dict__'))
+
+    def test_missing_keys(self):
+        port = dhcp.PortModel({'id': 'port_id'})
+        self.assertNotIn('dns_assignment', port)
+        self.assertFalse(hasattr(port, 'dns_assignment'))
+        self.assertRaises(KeyError, port.__getitem__, 'dns_assignment')
+        self.assertIsNone(port.get('mac_address'))
+        self.assertEqual(['id'], list(port))
+
+    def test_unknown_keys(self):
+        port = dhcp.PortModel({'id': 'port_id', 'qos_policy_id': 'qos_id'})
+        port.subnet = {'id': 'subnet_id'}
+        self.assertEqual('qos_id', port.qos_policy_id)
+        self.assertEqual('subnet_id', port['subnet'].id)
+        del port.subnet
+        self.assertEqual({'id': 'port_id', 'qos_policy_id': 'qos_id'},
+                         dict(port))
+
+    def test_equal_to_dict_model(self):
+        port = dhcp.PortModel(self.payload)
+        self.assertEqual(dhcp.DictModel(self.payload), port)
+        self.assertEqual(port, dhcp.DictModel(self.payload))
+        self.assertNotEqual(dhcp.PortModel(id='other_id'), port)
+        self.assertEqual(str(dhcp.DictModel(id='id', name='name')),
+                         str(dhcp.PortModel(id='id', name='name')))
+
+    def test_deepcopy(self):
+        port = dhcp.PortModel(self.payload)
+        port_copy = copy.deepcopy(port)
+        self.assertEqual(port, port_copy)
+        self.assertIsNot(port.fixed_ips[0], port_copy.fixed_ips[0])
+
+    def test_net_model_upgrades_ports_and_subnets(self):
+        dict_port = dhcp.DictModel({'id': 'dict_port_id'})
+        network = dhcp.NetModel({'id': 'net_id',
+                                 'subnets': [{'id': 'subnet_id',
+                                              'host_routes': [],
+                                              'allocation_pools': [
+                                                  {'start': '10.0.0.2',
+                                                   'end': '10.0.0.254'}]}],
+                                 'ports': [self.payload, dict_port]})
+        self.assertIsInstance(network.subnets[0], dhcp.SubnetModel)
+        self.assertIsInstance(network.subnets[0].allocation_pools[0],
+                              dhcp.AllocationPoolModel)
+        self.assertIsInstance(network.ports[0], dhcp.PortModel)
+        self.assertIs(dict_port, network.ports[1])
+
+    def test_memory_compared_to_dict_model(self):
+        dict_model_size = _models_size(dhcp.DictModel(self.payload))
+        compact_size = _models_size(dhcp.PortModel(self.payload))
+        self.assertLess(compact_size, dict_model_size * 2 / 3)
+        self.assertLess(_models_size(dhcp.FixedIpModel(subnet_id='id')),
+                        _models_size(dhcp.DictModel(subnet_id='id')) / 2)
@@ -12,6 +12,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import mock
 import testtools
 
 from neutron.agent.linux import keepalived
@@ -334,3 +335,81 @@ class KeepalivedVirtualRouteTestCase(base.BaseTestCase):
     def test_virtual_route_without_dev(self):
         route = keepalived.KeepalivedVirtualRoute('50.0.0.0/8', '1.2.3.4')
         self.assertEqual('50.0.0.0/8 via 1.2.3.4', route.build_config())
+
+
+class KeepalivedManagerTestCase(base.BaseTestCase,
+                                KeepalivedConfBaseMixin):
+    def setUp(self):
+        super(KeepalivedManagerTestCase, self).setUp()
+        self.manager = keepalived.KeepalivedManager(
+            'router1', self._get_config(), mock.Mock(),
+            conf_path=self.get_temp_file_path(''), reload_interval=10)
+        self.process = mock.Mock(active=True)
+        mock.patch.object(self.manager, 'get_process',
+                          return_value=self.process).start()
+        mock.patch.object(self.manager, '_get_vrrp_process').start()
+        stopwatch = mock.patch.object(keepalived.timeutils,
+                                      'StopWatch').start()
+        self.since_reload = stopwatch.return_value.start.return_value
+        self.since_reload.elapsed.return_value = 0
+        self.spawn_after = mock.patch.object(keepalived.eventlet,
+                                             'spawn_after').start()
+
+    def test_spawn_not_active(self):
+        self.process.active = False
+        self.manager.spawn()
+        self.process.enable.assert_called_once_with()
+        self.assertFalse(self.process.reload_cfg.called)
+        self.assertEqual(self.manager.config.get_config_str(),
+                         self.manager.get_conf_on_disk())
+
+    def test_spawn_config_unchanged(self):
+        self.manager.spawn()
+        self.manager.spawn()
+        self.assertEqual(1, self.process.reload_cfg.call_count)
+        self.assertEqual(1, self.manager.reload_count)
+        self.assertEqual(2, self.manager.process_monitor.register.call_count)
+
+    def test_spawn_config_changed(self):
+        self.manager.spawn()
+        self.manager.config.get_instance(1).add_vip('10.0.0.1/24', 'eth1',
+                                                     None)
+        self.since_reload.elapsed.return_value = 11
+        self.manager.spawn()
+        self.assertEqual(2, self.process.reload_cfg.call_count)
+        self.assertFalse(self.spawn_after.called)
+
+    def test_spawn_reloads_coalesced(self):
+        self.manager.spawn()
+        for i in range(3):
+            self.manager.config.get_instance(1).add_vip(
+                '10.0.0.%d/24' % i, 'eth1', None)
+            self.manager.spawn()
+        self.spawn_after.assert_called_once_with(
+            10, self.manager._delayed_reload)
+        self.assertEqual(1, self.process.reload_cfg.call_count)
+
+        self.manager._delayed_reload()
+        self.assertEqual(2, self.process.reload_cfg.call_count)
+        self.assertEqual(2, self.manager.reload_count)
+        self.assertIsNone(self.manager._pending_reload)
+
+    def test_delayed_reload_failure_logged(self):
+        self.manager.spawn()
+        self.manager.config.get_instance(1).add_vip('10.0.0.1/24', 'eth1',
+                                                     None)
+        self.manager.spawn()
+        self.process.reload_cfg.side_effect = RuntimeError
+        with mock.patch.object(keepalived.LOG, 'exception') as log:
+            self.manager._delayed_reload()
+        self.assertTrue(log.called)
+        self.assertIsNone(self.manager._pending_reload)
+
+    def test_disable_cancels_pending_reload(self):
+        self.manager.spawn()
+        self.manager.config.get_instance(1).add_vip('10.0.0.1/24', 'eth1',
+                                                     None)
+        self.manager.spawn()
+        self.manager.disable()
+        self.spawn_after.return_value.cancel.assert_called_once_with()
+        self.assertIsNone(self.manager._pending_reload)
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
 import mock
 import testtools
 import webob
@@ -34,6 +35,7 @@ class FakeConf(object):
     nova_metadata_insecure = True
     nova_client_cert = 'nova_cert'
     nova_client_priv_key = 'nova_priv_key'
+    nova_metadata_pool_size = 2
     cache_url = ''
 
 
@@ -391,6 +393,120 @@ class TestMetadataProxyHandlerCache(TestMetadataProxyHandlerBase):
         with testtools.ExpectedException(Exception):
             self._proxy_request_test_helper(302)
 
+    def test_proxy_request_reuses_connection(self):
+        req = mock.Mock(path_info='/the_path', query_string='',
+                        headers={'X-Forwarded-For': '8.8.8.8'},
+                        method='GET', body='body')
+        resp = mock.MagicMock(status=200)
+        with mock.patch('httplib2.Http') as mock_http:
+            mock_http.return_value.request.return_value = (resp, 'content')
+            self.handler._proxy_request('the_id', 'tenant_id', req)
+            self.handler._proxy_request('the_id', 'tenant_id', req)
+        mock_http.assert_called_once_with(
+            ca_certs=None, disable_ssl_certificate_validation=True)
+        self.assertEqual(2, mock_http.return_value.request.call_count)
+
+    def _get_instance_and_tenant_id_twice_helper(self, ids):
+        req = mock.Mock(headers={'X-Forwarded-For': '192.168.1.1',
+                                 'X-Neutron-Network-ID': 'the_id'})
+        with mock.patch.object(self.handler,
+                               '_lookup_instance_and_tenant_id',
+                               return_value=ids) as lookup:
+            for i in range(2):
+                self.assertEqual(
+                    ids, self.handler._get_instance_and_tenant_id(req))
+        return lookup
+
+    def test_get_instance_and_tenant_id_twice(self):
+        lookup = self._get_instance_and_tenant_id_twice_helper(
+            ('device_id', 'tenant_id'))
+        self.assertEqual(1, lookup.call_count)
+
+    def test_get_instance_and_tenant_id_no_match_twice(self):
+        lookup = self._get_instance_and_tenant_id_twice_helper((None, None))
+        self.assertEqual(2, lookup.call_count)
+
+    def test_get_instance_and_tenant_id_concurrent(self):
+        req = mock.Mock(headers={'X-Forwarded-For': '192.168.1.1',
+                                 'X-Neutron-Network-ID': 'the_id'})
+
+        def lookup(req):
+            eventlet.sleep(0)
+            return 'device_id', 'tenant_id'
+
+        with mock.patch.object(self.handler,
+                               '_lookup_instance_and_tenant_id',
+                               side_effect=lookup) as lookup_mock:
+            threads = [
+                eventlet.spawn(self.handler._get_instance_and_tenant_id, req)
+                for i in range(3)]
+            results = [thread.wait() for thread in threads]
+        self.assertEqual([('device_id', 'tenant_id')] * 3, results)
+        self.assertEqual(1, lookup_mock.call_count)
+        self.assertEqual({}, self.handler._lookups)
+
+    def test_get_instance_and_tenant_id_concurrent_error(self):
+        req = mock.Mock(headers={'X-Forwarded-For': '192.168.1.1',
+                                 'X-Neutron-Network-ID': 'the_id'})
+
+        def lookup(req):
+            eventlet.sleep(0)
+            raise ValueError()
+
+        with mock.patch.object(self.handler,
+                               '_lookup_instance_and_tenant_id',
+                               side_effect=lookup):
+            threads = [
+                eventlet.spawn(self.handler._get_instance_and_tenant_id, req)
+                for i in range(2)]
+            for thread in threads:
+                self.assertRaises(ValueError, thread.wait)
+        self.assertEqual({}, self.handler._lookups)
+
+    def _test_call_instance_moved_helper(self):
+        req = mock.Mock(headers={'X-Forwarded-For': '192.168.1.1',
+                                 'X-Neutron-Network-ID': 'the_id'})
+        with mock.patch.object(self.handler,
+                               '_lookup_instance_and_tenant_id',
+                               side_effect=[('old_id', 'tenant_id'),
+                                            ('new_id', 'tenant_id')]),\
+                mock.patch.object(self.handler,
+                                  '_proxy_request',
+                                  side_effect=[webob.exc.HTTPNotFound(),
+                                               'value']) as proxy:
+            self.handler._get_instance_and_tenant_id(req)
+            return self.handler(req), proxy
+
+    def _test_call_path_not_found_helper(self):
+        req = mock.Mock(headers={'X-Forwarded-For': '192.168.1.1',
+                                 'X-Neutron-Network-ID': 'the_id'})
+        with mock.patch.object(self.handler,
+                               '_lookup_instance_and_tenant_id',
+                               return_value=('the_id', 'tenant_id')
+                               ) as lookup,\
+                mock.patch.object(self.handler,
+                                  '_proxy_request',
+                                  return_value=webob.exc.HTTPNotFound()
+                                  ) as proxy:
+            for i in range(3):
+                self.assertIsInstance(self.handler(req),
+                                      webob.exc.HTTPNotFound)
+        self.assertEqual(3, proxy.call_count)
+        return lookup
+
+    def test_call_path_not_found(self):
+        lookup = self._test_call_path_not_found_helper()
+        # the cached ids are checked after the first 404 only
+        lookup.assert_has_calls([mock.call(mock.ANY),
+                                 mock.call(mock.ANY, skip_cache=True)])
+        self.assertEqual(2, lookup.call_count)
+
+    def test_call_instance_moved(self):
+        retval, proxy = self._test_call_instance_moved_helper()
+        self.assertEqual('value', retval)
+        proxy.assert_has_calls([mock.call('old_id', 'tenant_id', mock.ANY),
+                                mock.call('new_id', 'tenant_id', mock.ANY)])
+
     def test_sign_instance_id(self):
         self.assertEqual(
             self.handler._sign_instance_id('foo'),
@@ -411,6 +527,20 @@ class TestMetadataProxyHandlerNoCache(TestMetadataProxyHandlerCache):
         self.assertEqual(
             2, self.handler.plugin_rpc.get_ports.call_count)
 
+    def test_get_instance_and_tenant_id_twice(self):
+        lookup = self._get_instance_and_tenant_id_twice_helper(
+            ('device_id', 'tenant_id'))
+        self.assertEqual(2, lookup.call_count)
+
+    def test_call_instance_moved(self):
+        retval, proxy = self._test_call_instance_moved_helper()
+        self.assertIsInstance(retval, webob.exc.HTTPNotFound)
+        proxy.assert_called_once_with('new_id', 'tenant_id', mock.ANY)
+
+    def test_call_path_not_found(self):
+        lookup = self._test_call_path_not_found_helper()
+        self.assertEqual(3, lookup.call_count)
+
 
 class TestUnixDomainMetadataProxy(base.BaseTestCase):
     def setUp(self):
@@ -14,6 +14,7 @@
 # limitations under the License.
 
 import mock
+from oslo_config import cfg
 from oslo_db import exception as db_exc
 
 from neutron.api.rpc.handlers import dhcp_rpc
@@ -40,6 +41,7 @@ class TestDhcpRpcCallback(base.BaseTestCase):
         self.mock_set_dirty = set_dirty_p.start()
         self.utils_p = mock.patch('neutron.plugins.common.utils.create_port')
         self.utils = self.utils_p.start()
+        cfg.CONF.set_override('track_network_changes', False)
 
     def test_get_active_networks(self):
         plugin_retval = [dict(id='a'), dict(id='b')]
@@ -76,6 +78,17 @@ class TestDhcpRpcCallback(base.BaseTestCase):
                     {'id': 'b', 'subnets': [subnet], 'ports': []}]
         self.assertEqual(expected, networks)
 
+    def test_get_active_networks_info_network_ids(self):
+        self.plugin.get_networks.return_value = [{'id': 'a'}]
+        self.plugin.get_ports.return_value = []
+        self.plugin.get_subnets.return_value = []
+        networks = self.callbacks.get_active_networks_info(
+            mock.Mock(), host='host', network_ids=['a', 'b'])
+        self.assertEqual([{'id': 'a', 'subnets': [], 'ports': []}], networks)
+        self.plugin.get_networks.assert_called_once_with(
+            mock.ANY, filters={'id': ['a', 'b'], 'admin_state_up': [True]})
+        self.assertFalse(self.plugin.auto_schedule_networks.called)
+
     def _test__port_action_with_failures(self, exc=None, action=None):
         port = {
             'network_id': 'foo_network_id',
@@ -143,6 +156,75 @@ class TestDhcpRpcCallback(base.BaseTestCase):
             exc=n_exc.IpAddressGenerationFailure(net_id='foo_network_id'),
             action='create_port')
 
+    def _setup_network_changes(self, changes):
+        cfg.CONF.set_override('track_network_changes', True)
+        mock.patch.object(dhcp_rpc.network_changes_db, 'get_revision',
+                          return_value=10.0).start()
+        mock.patch.object(dhcp_rpc.network_changes_db, 'purge_changes').start()
+        mock.patch.object(dhcp_rpc.network_changes_db, 'get_port_ids',
+                          return_value=['p1', 'p2']).start()
+        return mock.patch.object(dhcp_rpc.network_changes_db,
+                                 'get_changes_since',
+                                 return_value=changes).start()
+
+    def test_get_network_info_cached(self):
+        self._setup_network_changes(set())
+        self.plugin.get_network.return_value = {'id': 'a'}
+        self.plugin.get_subnets.return_value = []
+        self.plugin.get_ports.return_value = []
+        first = self.callbacks.get_network_info(mock.Mock(), network_id='a')
+        second = self.callbacks.get_network_info(mock.Mock(), network_id='a')
+        self.assertEqual(first, second)
+        self.assertEqual(10.0, second['revision'])
+        self.assertEqual(1, self.plugin.get_network.call_count)
+
+    def test_get_network_info_cache_invalidated(self):
+        self._setup_network_changes(set(['p1']))
+        self.plugin.get_network.side_effect = lambda *a: {'id': 'a'}
+        self.callbacks.get_network_info(mock.Mock(), network_id='a')
+        self.callbacks.get_network_info(mock.Mock(), network_id='a')
+        self.assertEqual(2, self.plugin.get_network.call_count)
+
+    def test_get_network_info_cache_size(self):
+        self._setup_network_changes(set())
+        self.plugin.get_network.side_effect = lambda ctx, id: {'id': id}
+        with mock.patch.object(dhcp_rpc, 'NETWORK_INFO_CACHE_SIZE', 2):
+            for network_id in ('a', 'b', 'c'):
+                self.callbacks.get_network_info(mock.Mock(),
+                                                network_id=network_id)
+        self.assertEqual(['b', 'c'],
+                         list(self.callbacks._network_info_cache))
+
+    def test_get_network_info_since(self):
+        self._setup_network_changes(set(['p2']))
+        self.plugin.get_network.return_value = {'id': 'a'}
+        self.plugin.get_subnets.return_value = ['subnet']
+        self.plugin.get_ports.return_value = ['port2']
+        network = self.callbacks.get_network_info_since(
+            mock.MagicMock(), network_id='a', revision=5.0, host='host')
+        expected = {'id': 'a', 'subnets': ['subnet'], 'ports': ['port2'],
+                    'port_ids': ['p1', 'p2'], 'revision': 10.0}
+        self.assertEqual(expected, network)
+        self.plugin.get_ports.assert_called_once_with(
+            mock.ANY, filters={'id': ['p2']})
+
+    def _test_get_network_info_since_full(self, changes):
+        self._setup_network_changes(changes)
+        with mock.patch.object(self.callbacks,
+                               'get_network_info') as get_network_info:
+            network = self.callbacks.get_network_info_since(
+                mock.MagicMock(), network_id='a', revision=5.0, host='host')
+        self.assertEqual(get_network_info.return_value, network)
+        get_network_info.assert_called_once_with(
+            mock.ANY, network_id='a', revision=5.0, host='host')
+        self.assertFalse(self.plugin.get_ports.called)
+
+    def test_get_network_info_since_unknown_changes(self):
+        self._test_get_network_info_since_full(None)
+
+    def test_get_network_info_since_network_changed(self):
+        self._test_get_network_info_since_full(set(['p2', None]))
+
     def test_get_network_info_return_none_on_not_found(self):
         self.plugin.get_network.side_effect = n_exc.NetworkNotFound(net_id='a')
         retval = self.callbacks.get_network_info(mock.Mock(), network_id='a')
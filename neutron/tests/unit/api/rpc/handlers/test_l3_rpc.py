@@ -65,3 +65,18 @@ class TestL3RpcCallback(testlib_api.SqlTestCase):
         updated_subnet = res[0]
         self.assertEqual(updated_subnet['cidr'], data[subnet['id']])
         self.assertEqual(updated_subnet['allocation_pools'], allocation_pools)
+
+    def test_strip_unchanged_routers(self):
+        router = {'id': 'router', 'name': 'r1'}
+        revision = self.callbacks._get_router_revision(router)
+        routers = self.callbacks._strip_unchanged_routers(
+            [dict(router)], {'router': revision})
+        self.assertEqual([{'id': 'router',
+                           constants.ROUTER_REVISION_KEY: revision,
+                           constants.ROUTER_UNCHANGED_KEY: True}], routers)
+
+        routers = self.callbacks._strip_unchanged_routers(
+            [dict(router, name='r2')], {'router': revision})
+        self.assertEqual('r2', routers[0]['name'])
+        self.assertNotEqual(revision,
+                            routers[0][constants.ROUTER_REVISION_KEY])
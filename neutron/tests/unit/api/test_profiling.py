@@ -0,0 +1,156 @@
+# Copyright (c) 2016 OpenStack Foundation.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo_config import cfg
+import sqlalchemy as sa
+
+from neutron.api import profiling
+from neutron.tests import base
+
+
+class TestRequestProfile(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRequestProfile, self).setUp()
+        self.now = 100.0
+        mock.patch.object(profiling.time, 'time',
+                          side_effect=lambda: self.now).start()
+        self.profile = profiling.RequestProfile('GET', '/v2.0/ports')
+        profiling._LOCAL.profile = self.profile
+        self.addCleanup(setattr, profiling._LOCAL, 'profile', None)
+
+    def _tick(self, seconds):
+        self.now += seconds
+
+    def test_nested_phases_are_exclusive(self):
+        with profiling.phase(profiling.PLUGIN):
+            self._tick(1)
+            with profiling.phase(profiling.POLICY):
+                self._tick(2)
+            self._tick(3)
+        self._tick(4)
+        total, timings = self.profile.get_timings()
+        self.assertEqual(10, total)
+        self.assertEqual({profiling.PLUGIN: 4, profiling.POLICY: 2,
+                          profiling.OTHER: 4}, timings)
+
+    def test_timed(self):
+        @profiling.timed(profiling.VIEW)
+        def view(value):
+            self._tick(1)
+            return value
+
+        self.assertEqual('value', view('value'))
+        self.assertEqual(1, self.profile.phases[profiling.VIEW])
+
+    def test_timed_without_profile(self):
+        profiling._LOCAL.profile = None
+        func = mock.Mock(return_value='value')
+        self.assertEqual('value',
+                         profiling.timed(profiling.PLUGIN, func)(1, arg=2))
+        func.assert_called_once_with(1, arg=2)
+
+    def _register_db_events(self):
+        profiling.register_db_events()
+        self.addCleanup(sa.event.remove, sa.engine.Engine,
+                        'before_cursor_execute',
+                        profiling._before_cursor_execute)
+        self.addCleanup(sa.event.remove, sa.engine.Engine,
+                        'after_cursor_execute',
+                        profiling._after_cursor_execute)
+        return sa.create_engine('sqlite://')
+
+    def test_db_queries(self):
+        engine = self._register_db_events()
+        engine.execute('SELECT 1')
+        engine.execute('SELECT 2')
+        self.assertEqual(2, self.profile.db_queries)
+
+    def test_failed_db_query(self):
+        engine = self._register_db_events()
+        connection = engine.connect()
+        self.addCleanup(connection.close)
+        info = dict(connection.info)
+        self.assertRaises(sa.exc.OperationalError,
+                          connection.execute, 'SELECT * FROM missing')
+        self.assertEqual(info, connection.info)
+        self.assertEqual(0, self.profile.db_queries)
+        profiling._LOCAL.profile = None
+        connection.execute('SELECT 1')
+        profiling._LOCAL.profile = self.profile
+        self._tick(1)
+        connection.execute('SELECT 2')
+        self.assertEqual(1, self.profile.db_queries)
+        self.assertEqual(0, self.profile.db_time)
+
+
+class TestRequestProfiler(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRequestProfiler, self).setUp()
+        mock.patch.object(profiling, 'register_db_events').start()
+        self.log = mock.patch.object(profiling, 'LOG').start()
+
+    def _call(self, app_iter):
+        def app(environ, start_response):
+            start_response('200 OK', [])
+            return app_iter
+
+        profiler = profiling.RequestProfiler(app)
+        start_response = mock.Mock()
+        body = list(profiler({'REQUEST_METHOD': 'GET',
+                              'PATH_INFO': '/v2.0/ports'}, start_response))
+        start_response.assert_called_once_with('200 OK', [], None)
+        return body
+
+    def test_slow_request_logged(self):
+        cfg.CONF.set_override('api_slow_request_threshold', 0)
+
+        def app_iter():
+            with profiling.phase(profiling.PLUGIN):
+                yield b'chunk'
+
+        self.assertEqual([b'chunk'], self._call(app_iter()))
+        self.assertEqual(1, self.log.warning.call_count)
+        values = self.log.warning.call_args[0][1]
+        self.assertEqual('200', values['status'])
+        self.assertIn(profiling.SERIALIZE, values['phases'])
+
+    def test_fast_request_not_logged(self):
+        cfg.CONF.set_override('api_slow_request_threshold', 60)
+        self.log.isEnabledFor.return_value = False
+        self.assertEqual([b'body'], self._call([b'body']))
+        self.assertFalse(self.log.warning.called)
+        self.assertFalse(self.log.debug.called)
+
+    def test_profiler_paths(self):
+        cfg.CONF.set_override('api_profiler_sample_rate', 1)
+        cfg.CONF.set_override('api_profiler_paths', ['/v2.0/networks'])
+        profiler = profiling.RequestProfiler(mock.Mock())
+        self.assertIsNone(profiler._get_profiler('/v2.0/ports'))
+        cprofile = profiler._get_profiler('/v2.0/networks/id')
+        self.assertIsNotNone(cprofile)
+        profiler._stop_profiler(cprofile)
+
+    def test_single_profiler(self):
+        cfg.CONF.set_override('api_profiler_sample_rate', 1)
+        profiler = profiling.RequestProfiler(mock.Mock())
+        cprofile = profiler._get_profiler('/v2.0/ports')
+        self.assertIsNotNone(cprofile)
+        self.assertIsNone(profiler._get_profiler('/v2.0/ports'))
+        profiler._stop_profiler(cprofile)
+        cprofile = profiler._get_profiler('/v2.0/ports')
+        self.assertIsNotNone(cprofile)
+        profiler._stop_profiler(cprofile)
@@ -471,6 +471,18 @@ class APIv2TestCase(APIv2TestBase):
             skipargs=['sorts', 'limit', 'marker', 'page_reverse'])
         instance.get_networks.assert_called_once_with(mock.ANY, **kwargs)
 
+    def test_native_sort_for_other_collection(self):
+        instance = self.plugin.return_value
+        instance._NeutronPluginBaseV2__native_pagination_support = ('ports',)
+        instance._NeutronPluginBaseV2__native_sorting_support = ('ports',)
+        instance.get_networks.return_value = []
+        api = webtest.TestApp(router.APIRouter())
+        api.get(_get_path('networks'), {'sort_key': ['name', 'status'],
+                                        'sort_dir': ['desc', 'asc']})
+        kwargs = self._get_collection_kwargs(
+            skipargs=['sorts', 'limit', 'marker', 'page_reverse'])
+        instance.get_networks.assert_called_once_with(mock.ANY, **kwargs)
+
     def test_emulated_sort_without_sort_field(self):
         instance = self.plugin.return_value
         instance._NeutronPluginBaseV2__native_pagination_support = False
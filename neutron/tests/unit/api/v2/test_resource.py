@@ -280,6 +280,20 @@ class ResourceTestCase(base.BaseTestCase):
         res = resource.get('', extra_environ=environ)
         self.assertEqual(200, res.status_int)
 
+    def test_index_streamed(self):
+        controller = mock.MagicMock()
+        controller.index = lambda request: {'foos': [{'id': 'bar'}]}
+
+        resource = webtest.TestApp(wsgi_resource.Resource(controller))
+
+        environ = {'wsgiorg.routing_args': (None, {'action': 'index'})}
+        with mock.patch.object(wsgi.JSONDictSerializer, 'serialize') as ser:
+            res = resource.get('', extra_environ=environ)
+        self.assertEqual(200, res.status_int)
+        self.assertFalse(ser.called)
+        self.assertEqual({'foos': [{'id': 'bar'}]},
+                         wsgi.JSONDeserializer().deserialize(res.body)['body'])
+
     def test_status_204(self):
         controller = mock.MagicMock()
         controller.test = lambda request: {'foo': 'bar'}
@@ -0,0 +1,81 @@
+# Copyright (c) 2016 OpenStack Foundation.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+
+import mock
+from oslo_config import cfg
+from oslo_serialization import jsonutils
+
+from neutron.common import json_backend
+from neutron.tests import base
+
+
+class TestJsonBackend(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestJsonBackend, self).setUp()
+        mock.patch.dict(json_backend._DUMPS, clear=True).start()
+
+    def test_dumps_sanitizes_objects(self):
+        data = {'port': {'id': 'id', 'set': object}}
+        self.assertEqual({'port': {'id': 'id', 'set': str(object)}},
+                         jsonutils.loads(json_backend.dumps(data)))
+
+    def test_is_primitive(self):
+        self.assertTrue(json_backend._is_primitive(
+            {'ports': [{'id': u'id', 'mtu': 1500, 'up': True,
+                        'device_id': None, 'fixed_ips': ('a', 'b')}]}))
+        self.assertFalse(json_backend._is_primitive({'ratio': 0.5}))
+        self.assertFalse(json_backend._is_primitive({1: 'one'}))
+        self.assertTrue(json_backend._is_primitive([-2 ** 63, 2 ** 64 - 1]))
+        self.assertFalse(json_backend._is_primitive({'id': 2 ** 64}))
+        self.assertFalse(json_backend._is_primitive([-2 ** 63 - 1]))
+        self.assertFalse(json_backend._is_primitive([{'ports': [object()]}]))
+        self.assertFalse(json_backend._is_primitive(
+            collections.OrderedDict(id='id')))
+
+    def _test_ujson_backend(self, data, ujson_used):
+        cfg.CONF.set_override('api_json_backend', 'ujson')
+        ujson = mock.Mock()
+        ujson.dumps.return_value = 'ujson'
+        with mock.patch.object(json_backend.importutils, 'try_import',
+                               return_value=ujson):
+            result = json_backend.dumps(data)
+        if ujson_used:
+            self.assertEqual('ujson', result)
+            ujson.dumps.assert_called_once_with(
+                data, escape_forward_slashes=False)
+        else:
+            self.assertEqual(data, jsonutils.loads(result))
+            self.assertFalse(ujson.dumps.called)
+
+    def test_ujson_backend(self):
+        self._test_ujson_backend({'network': {'id': 'id'}}, True)
+
+    def test_ujson_backend_not_primitive(self):
+        self._test_ujson_backend({'network': {'ratio': 0.5}}, False)
+
+    def test_ujson_backend_integer_overflow(self):
+        self._test_ujson_backend({'network': {'id': 2 ** 64}}, False)
+
+    def test_backend_not_installed(self):
+        cfg.CONF.set_override('api_json_backend', 'simplejson')
+        with mock.patch.object(json_backend.importutils, 'try_import',
+                               return_value=None),\
+                mock.patch.object(json_backend.LOG, 'warning') as warning:
+            self.assertEqual('{"id": "id"}',
+                             json_backend.dumps({'id': 'id'}))
+            json_backend.dumps({'id': 'id'})
+        self.assertEqual(1, warning.call_count)
@@ -22,6 +22,7 @@ import oslo_messaging as messaging
 from oslo_messaging import conffixture as messaging_conffixture
 
 from neutron.common import rpc
+from neutron.common import rpc_stats
 from neutron import context
 from neutron.tests import base
 
@@ -173,6 +174,18 @@ class TestRPC(base.DietTestCase):
                                          'eventlet', ser)
         self.assertEqual('server', server)
 
+    @mock.patch.object(rpc, 'RequestContextSerializer')
+    @mock.patch.object(messaging, 'get_rpc_server')
+    @mock.patch.object(rpc_stats, 'is_enabled', return_value=True)
+    def test_get_server_instrumented(self, mock_enabled, mock_get, mock_ser):
+        rpc.TRANSPORT = mock.Mock()
+        endpoint = mock.Mock()
+
+        rpc.get_server(mock.Mock(), [endpoint])
+
+        endpoints = mock_get.call_args[0][2]
+        self.assertIsInstance(endpoints[0], rpc_stats.InstrumentedEndpoint)
+
     def test_get_notifier(self):
         rpc.NOTIFIER = mock.Mock()
         mock_prep = mock.Mock()
@@ -326,6 +339,17 @@ class TestConnection(base.DietTestCase):
         mock_get.assert_called_once_with(target, 'endpoints')
         self.assertEqual([server], self.conn.servers)
 
+    @mock.patch.object(rpc, 'get_server')
+    def test_create_consumer_topic_not_consumed(self, mock_get):
+        self.addCleanup(rpc.set_consumer_topics)
+        rpc.set_consumer_topics(excluded_topics=['topic'])
+        self.conn.create_consumer('topic', 'endpoints')
+        rpc.set_consumer_topics(['other-topic'])
+        self.conn.create_consumer('topic', 'endpoints')
+
+        self.assertFalse(mock_get.called)
+        self.assertEqual([], self.conn.servers)
+
     def test_consume_in_threads(self):
         self.conn.servers = [mock.Mock(), mock.Mock()]
 
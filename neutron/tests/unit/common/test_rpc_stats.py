@@ -0,0 +1,101 @@
+# Copyright (c) 2016 OpenStack Foundation.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo_config import cfg
+
+from neutron.common import rpc_stats
+from neutron.tests import base
+
+
+class TestRpcStats(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRpcStats, self).setUp()
+        mock.patch.object(rpc_stats.loopingcall,
+                          'FixedIntervalLoopingCall').start()
+        cfg.CONF.set_override('rpc_stats_interval', 60)
+        cfg.CONF.set_override('rpc_stats_sample_rate', 1)
+        self.stats = rpc_stats.RpcStats()
+
+    def test_measure(self):
+        func = mock.Mock(return_value={'key': 'value'})
+        result = self.stats.measure(rpc_stats.CALL, 'method', func,
+                                    'ctxt', arg='value')
+        self.assertEqual({'key': 'value'}, result)
+        func.assert_called_once_with('ctxt', arg='value')
+        stats = self.stats.get_stats()['call:method']
+        self.assertEqual(1, stats['calls'])
+        self.assertEqual(0, stats['errors'])
+        self.assertEqual(0, stats['in_flight'])
+        self.assertEqual(1, stats['max_in_flight'])
+        self.assertEqual(len('{"arg": "value"}'), stats['request_bytes_avg'])
+        self.assertEqual(len('{"key": "value"}'),
+                         stats['response_bytes_avg'])
+
+    def test_measure_error(self):
+        func = mock.Mock(side_effect=ValueError)
+        self.assertRaises(ValueError, self.stats.measure,
+                          rpc_stats.DISPATCH, 'method', func, 'ctxt')
+        stats = self.stats.get_stats()['dispatch:method']
+        self.assertEqual(1, stats['calls'])
+        self.assertEqual(1, stats['errors'])
+        self.assertEqual(0, stats['in_flight'])
+        self.assertIsNone(stats['response_bytes_avg'])
+
+    def test_measure_not_sampled(self):
+        cfg.CONF.set_override('rpc_stats_sample_rate', 0)
+        self.stats.measure(rpc_stats.CALL, 'method', mock.Mock(), 'ctxt')
+        stats = self.stats.get_stats()['call:method']
+        self.assertEqual(1, stats['calls'])
+        self.assertIsNone(stats['request_bytes_avg'])
+
+    def test_latency_percentile(self):
+        stats = rpc_stats.MethodStats()
+        for latency in (0.001, 0.002, 0.2, 100):
+            stats.start_call()
+            stats.end_call(latency, False)
+        self.assertEqual(0.005, stats.get_latency_percentile(0.5))
+        self.assertEqual(0.25, stats.get_latency_percentile(0.75))
+        self.assertIsNone(stats.get_latency_percentile(0.99))
+
+    def test_report_resets_stats(self):
+        self.stats.measure(rpc_stats.CAST, 'method', mock.Mock(), 'ctxt')
+        with mock.patch.object(rpc_stats.LOG, 'info') as log:
+            self.stats.report()
+            self.assertEqual(1, log.call_count)
+        self.assertEqual(0, self.stats.get_stats()['cast:method']['calls'])
+
+    def test_instrumented_endpoint(self):
+        endpoint = mock.Mock(target='target')
+        endpoint.method.return_value = 'result'
+        instrumented = rpc_stats.InstrumentedEndpoint(endpoint)
+        self.assertEqual('target', instrumented.target)
+        with mock.patch.object(rpc_stats, 'STATS', self.stats):
+            self.assertEqual('result', instrumented.method('ctxt', arg=1))
+        endpoint.method.assert_called_once_with('ctxt', arg=1)
+        self.assertEqual(1,
+                         self.stats.get_stats()['dispatch:method']['calls'])
+
+    def test_instrumented_call_context(self):
+        call_context = mock.Mock()
+        instrumented = rpc_stats._InstrumentedCallContext(call_context)
+        with mock.patch.object(rpc_stats, 'STATS', self.stats):
+            instrumented.call('ctxt', 'method', arg=1)
+            instrumented.cast('ctxt', 'method', arg=1)
+        call_context.call.assert_called_once_with('ctxt', 'method', arg=1)
+        call_context.cast.assert_called_once_with('ctxt', 'method', arg=1)
+        stats = self.stats.get_stats()
+        self.assertEqual(1, stats['call:method']['calls'])
+        self.assertEqual(1, stats['cast:method']['calls'])
@@ -218,6 +218,31 @@ class TestQuotaDbApi(testlib_api.SqlTestCaseLight):
     def test_remove_non_existent_reservation(self):
         self.assertIsNone(quota_api.remove_reservation(self.context, 'meh'))
 
+    def _get_reserved(self, resource):
+        return quota_api.get_quota_usage_by_resource_and_tenant(
+            self.context, resource, self.tenant_id).reserved
+
+    def test_create_reservation_updates_reserved(self):
+        self._create_quota_usage('goals', 0)
+        self._create_reservation({'goals': 2, 'assists': 1})
+        self.assertEqual(2, self._get_reserved('goals'))
+        # No usage data were created for resources without them
+        self.assertIsNone(quota_api.get_quota_usage_by_resource_and_tenant(
+            self.context, 'assists', self.tenant_id))
+
+    def test_remove_reservation_updates_reserved(self):
+        self._create_quota_usage('goals', 0)
+        resv = self._create_reservation({'goals': 2})
+        self._create_reservation({'goals': 1})
+        quota_api.remove_reservation(self.context, resv.reservation_id)
+        self.assertEqual(1, self._get_reserved('goals'))
+
+    def test_create_quota_usage_counts_reserved(self):
+        self._create_reservation({'goals': 2})
+        self._create_reservation({'goals': 1, 'assists': 1})
+        usage_info = self._create_quota_usage('goals', 0)
+        self.assertEqual(3, usage_info.reserved)
+
     def _get_reservations_for_resource_helper(self):
         # create three reservation, 1 expired
         resources_1 = {'goals': 2, 'assists': 1}
@@ -279,6 +304,19 @@ class TestQuotaDbApi(testlib_api.SqlTestCaseLight):
             self.assertIsNotNone(quota_api.get_reservation(
                 self.context, resv_1.reservation_id))
 
+    def test_remove_expired_reservations_updates_reserved(self):
+        with mock.patch('neutron.db.quota.api.utcnow') as mock_utcnow:
+            mock_utcnow.return_value = datetime.datetime(
+                2015, 5, 20, 0, 0)
+            self._create_quota_usage('goals', 0)
+            self._create_reservation(
+                {'goals': 2}, expiration=datetime.datetime(2016, 3, 31))
+            self._create_reservation(
+                {'goals': 3}, expiration=datetime.datetime(2015, 3, 31))
+            self.assertEqual(5, self._get_reserved('goals'))
+            quota_api.remove_expired_reservations(self.context)
+            self.assertEqual(2, self._get_reserved('goals'))
+
     def test_remove_expired_reservations_no_tenant(self):
         with mock.patch('neutron.db.quota.api.utcnow') as mock_utcnow:
             mock_utcnow.return_value = datetime.datetime(
@@ -27,6 +27,7 @@ from neutron.common import exceptions as n_exc
 from neutron import context
 from neutron.db import agents_db
 from neutron.db import db_base_plugin_v2 as base_plugin
+from neutron.extensions import availability_zone as az_ext
 from neutron.tests import base
 from neutron.tests.unit import testlib_api
 
@@ -202,6 +203,12 @@ class TestAgentsDbMixin(TestAgentsDbBase):
         self.assertIn('test', conf1)
         self.assertEqual("1234", conf1['test'])
 
+    def test_load_agent_dict_cached(self):
+        self.addCleanup(agents_db._PARSED_DICTS.clear)
+        conf = agents_db.load_agent_dict('{"test": "1234"}')
+        self.assertEqual({'test': '1234'}, conf)
+        self.assertIs(conf, agents_db.load_agent_dict('{"test": "1234"}'))
+
     def get_configurations_dict(self):
         db_obj = mock.Mock(configurations='{"cfg1": "val1"}')
         cfg = self.plugin.get_configuration_dict(db_obj)
@@ -218,6 +225,143 @@ class TestAgentsDbMixin(TestAgentsDbBase):
         self.assertEqual(tracker.set_versions.call_count, 2)
 
 
+class TestAgentHeartbeatBuffer(TestAgentsDbBase):
+    def setUp(self):
+        super(TestAgentHeartbeatBuffer, self).setUp()
+        cfg.CONF.set_override('agent_heartbeat_flush_interval', 10)
+        mock.patch.object(agents_db.loopingcall,
+                          'FixedIntervalLoopingCall').start()
+        self.addCleanup(agents_db._HEARTBEATS.clear)
+        self.agent_status = dict(AGENT_STATUS)
+
+    def _get_agent_db(self):
+        self.context.session.expire_all()
+        return self.context.session.query(agents_db.Agent).one()
+
+    def test_heartbeat_buffered(self):
+        self.assertEqual(constants.AGENT_NEW,
+                         self.plugin.create_or_update_agent(
+                             self.context, self.agent_status))
+        stored = self._get_agent_db().heartbeat_timestamp
+        with mock.patch.object(self.plugin,
+                               '_create_or_update_agent') as update:
+            self.assertEqual(constants.AGENT_ALIVE,
+                             self.plugin.create_or_update_agent(
+                                 self.context, self.agent_status))
+        self.assertFalse(update.called)
+        self.assertEqual(stored, self._get_agent_db().heartbeat_timestamp)
+
+    def test_heartbeat_not_buffered_on_state_change(self):
+        self.plugin.create_or_update_agent(self.context, self.agent_status)
+        self.agent_status['configurations'] = {'networks': 1}
+        self.plugin.create_or_update_agent(self.context, self.agent_status)
+        self.assertEqual('{"networks": 1}',
+                         self._get_agent_db().configurations)
+
+    def test_heartbeat_not_buffered_on_start(self):
+        self.plugin.create_or_update_agent(self.context, self.agent_status)
+        self.agent_status['start_flag'] = True
+        with mock.patch.object(self.plugin, '_create_or_update_agent',
+                               return_value=constants.AGENT_ALIVE) as update:
+            self.plugin.create_or_update_agent(self.context,
+                                               self.agent_status)
+        self.assertTrue(update.called)
+
+    def test_heartbeat_not_buffered_for_down_agent(self):
+        self.plugin.create_or_update_agent(self.context, self.agent_status)
+        later = timeutils.utcnow() + datetime.timedelta(
+            seconds=cfg.CONF.agent_down_time + 1)
+        with mock.patch.object(timeutils, 'utcnow', return_value=later):
+            self.assertEqual(constants.AGENT_REVIVED,
+                             self.plugin.create_or_update_agent(
+                                 self.context, self.agent_status))
+
+    def test_buffered_heartbeat_used_for_liveness(self):
+        self.plugin.create_or_update_agent(self.context, self.agent_status)
+        agent_db = self._get_agent_db()
+        agent_db.heartbeat_timestamp -= datetime.timedelta(
+            seconds=cfg.CONF.agent_down_time + 1)
+        with self.context.session.begin():
+            self.context.session.add(agent_db)
+        self.assertFalse(self.plugin.get_agents(self.context)[0]['alive'])
+        agents_db._HEARTBEATS.remember(
+            agent_db.agent_type, agent_db.host, agent_db.id,
+            self.plugin._get_agent_state_hash(
+                self.plugin._make_agent_state_res(self.agent_status)),
+            timeutils.utcnow())
+        self.plugin.create_or_update_agent(self.context, self.agent_status)
+        self.assertTrue(self.plugin.get_agents(self.context)[0]['alive'])
+        self.assertTrue(self._get_agent_db().is_active)
+
+    def test_flush(self):
+        self.plugin.create_or_update_agent(self.context, self.agent_status)
+        later = timeutils.utcnow() + datetime.timedelta(seconds=5)
+        with mock.patch.object(timeutils, 'utcnow', return_value=later):
+            self.plugin.create_or_update_agent(self.context,
+                                               self.agent_status)
+        agents_db._HEARTBEATS.flush()
+        self.assertEqual(later, self._get_agent_db().heartbeat_timestamp)
+        self.assertEqual(1, agents_db._HEARTBEATS.flush_count)
+
+    def test_flush_forgets_deleted_agents(self):
+        self.plugin.create_or_update_agent(self.context, self.agent_status)
+        self.plugin.create_or_update_agent(self.context, self.agent_status)
+        with self.context.session.begin():
+            self.context.session.query(agents_db.Agent).delete()
+        agents_db._HEARTBEATS.flush()
+        self.assertEqual(constants.AGENT_NEW,
+                         self.plugin.create_or_update_agent(
+                             self.context, self.agent_status))
+
+
+class TestAgentRegistry(TestAgentsDbBase):
+    def setUp(self):
+        super(TestAgentRegistry, self).setUp()
+        cfg.CONF.set_override('agent_registry_ttl', 60)
+        self.addCleanup(agents_db._AGENT_REGISTRY.invalidate)
+        self.agent_status = dict(AGENT_STATUS, availability_zone='az1')
+        self.plugin.create_or_update_agent(self.context, self.agent_status)
+
+    def _get_host_agents(self):
+        return self.plugin.get_agents_by_type_and_host(
+            self.context, AGENT_STATUS['agent_type'], AGENT_STATUS['host'])
+
+    def test_get_agents_by_type_and_host(self):
+        agents = self._get_host_agents()
+        self.assertEqual(1, len(agents))
+        self.assertTrue(agents[0]['alive'])
+        self.assertEqual(TEST_RESOURCE_VERSIONS,
+                         agents[0]['resource_versions'])
+        self.assertEqual([], self.plugin.get_agents_by_type_and_host(
+            self.context, AGENT_STATUS['agent_type'], 'other-host'))
+
+    def test_agents_cached(self):
+        self._get_host_agents()
+        with mock.patch.object(self.plugin, '_make_agent_dict') as make:
+            self._get_host_agents()
+        self.assertFalse(make.called)
+
+    def test_invalidated_on_update(self):
+        agent_id = self._get_host_agents()[0]['id']
+        self.plugin.update_agent(self.context, agent_id,
+                                 {'agent': {'admin_state_up': False}})
+        self.assertFalse(self._get_host_agents()[0]['admin_state_up'])
+
+    def test_invalidated_on_state_change(self):
+        self._get_host_agents()
+        self.agent_status['configurations'] = {'networks': 1}
+        self.plugin.create_or_update_agent(self.context, self.agent_status)
+        self.assertEqual({'networks': 1},
+                         self._get_host_agents()[0]['configurations'])
+
+    def test_validate_availability_zones(self):
+        self.plugin.validate_availability_zones(
+            self.context, 'network', ['az1'])
+        self.assertRaises(az_ext.AvailabilityZoneNotFound,
+                          self.plugin.validate_availability_zones,
+                          self.context, 'network', ['az2'])
+
+
 class TestAgentsDbGetAgents(TestAgentsDbBase):
     scenarios = [
         ('Get all agents', dict(agents=5, down_agents=2,
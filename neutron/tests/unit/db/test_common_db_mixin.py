@@ -46,3 +46,114 @@ class TestCommonHelpFunctions(testlib_api.SqlTestCase):
                           self.admin_ctx, create_fn, delete_fn,
                           create_bindings)
         delete_fn.assert_called_once_with(1234)
+
+
+class FakeModel(object):
+    id = 'id'
+    name = 'name'
+    children = 'children'
+    unused = 'unused'
+
+
+class TestCommonDbMixinLoading(testlib_api.SqlTestCase):
+
+    def setUp(self):
+        super(TestCommonDbMixinLoading, self).setUp()
+        mock.patch.dict(common_db_mixin.CommonDbMixin._model_query_hooks,
+                        clear=True).start()
+        mock.patch.dict(common_db_mixin.CommonDbMixin._dict_extend_functions,
+                        clear=True).start()
+        mock.patch.dict(common_db_mixin.CommonDbMixin._dict_extend_fields,
+                        clear=True).start()
+        mock.patch.dict(common_db_mixin.CommonDbMixin._plain_fields,
+                        clear=True).start()
+        self.orm = mock.patch.object(common_db_mixin, 'orm').start()
+        self.mixin = common_db_mixin.CommonDbMixin()
+        common_db_mixin.CommonDbMixin.register_model_query_hook(
+            FakeModel, 'fake', None, None,
+            eager_loads={'children': ('children', 'child_count'),
+                         'unused': ()})
+
+    def _apply_eager_loads(self, fields):
+        query = mock.Mock()
+        query.options.return_value = query
+        self.mixin._apply_eager_loads(query, FakeModel, fields)
+        return query
+
+    def test_apply_eager_loads_without_fields(self):
+        self._apply_eager_loads(None)
+        self.orm.joinedload.assert_called_once_with('children')
+        self.orm.lazyload.assert_called_once_with('unused')
+
+    def test_apply_eager_loads_requested(self):
+        self._apply_eager_loads(['id', 'child_count'])
+        self.orm.joinedload.assert_called_once_with('children')
+        self.orm.lazyload.assert_called_once_with('unused')
+
+    def test_apply_eager_loads_not_requested(self):
+        query = self._apply_eager_loads(['id'])
+        self.assertFalse(self.orm.joinedload.called)
+        self.assertEqual(2, self.orm.lazyload.call_count)
+        self.assertEqual(2, query.options.call_count)
+
+    def test_apply_eager_loads_no_hooks(self):
+        query = mock.Mock()
+        self.assertEqual(query,
+                         self.mixin._apply_eager_loads(query, object, None))
+        self.assertFalse(query.options.called)
+
+    def _apply_dict_extend_functions(self, fields):
+        extend = mock.Mock()
+        other = mock.Mock()
+        self.mixin.extend = extend
+        self.mixin.other = other
+        common_db_mixin.CommonDbMixin.register_dict_extend_funcs(
+            'fakes', ['extend'], fields=['children'])
+        common_db_mixin.CommonDbMixin.register_dict_extend_funcs(
+            'fakes', ['other'])
+        self.mixin._apply_dict_extend_functions('fakes', {}, None, fields)
+        self.assertTrue(other.called)
+        return extend
+
+    def test_apply_dict_extend_functions_without_fields(self):
+        self.assertTrue(self._apply_dict_extend_functions(None).called)
+
+    def test_apply_dict_extend_functions_requested(self):
+        self.assertTrue(
+            self._apply_dict_extend_functions(['id', 'children']).called)
+
+    def test_apply_dict_extend_functions_not_requested(self):
+        self.assertFalse(self._apply_dict_extend_functions(['id']).called)
+
+    def test_apply_eager_loads_merges_hooks(self):
+        common_db_mixin.CommonDbMixin.register_model_query_hook(
+            FakeModel, 'other', None, None,
+            eager_loads={'children': ('children_names',)})
+        self._apply_eager_loads(['children_names'])
+        self.orm.joinedload.assert_called_once_with('children')
+        self.orm.lazyload.assert_called_once_with('unused')
+
+    def test_apply_eager_loads_plain_projection(self):
+        common_db_mixin.CommonDbMixin.register_plain_fields(
+            FakeModel, ['id', 'name'])
+        query = self._apply_eager_loads(['name'])
+        self.assertFalse(query.options.called)
+
+    def test_is_plain_projection(self):
+        common_db_mixin.CommonDbMixin.register_plain_fields(
+            FakeModel, ['id', 'name'])
+        self.assertTrue(self.mixin._is_plain_projection(FakeModel, ['name']))
+        self.assertFalse(self.mixin._is_plain_projection(FakeModel, None))
+        self.assertFalse(self.mixin._is_plain_projection(
+            FakeModel, ['name', 'children']))
+        self.assertFalse(self.mixin._is_plain_projection(object, ['id']))
+
+    def test_get_plain_collection(self):
+        query = mock.Mock()
+        # the second row is repeated by a join of the query
+        query.with_entities.return_value = [('id1', 'a'), ('id2', 'b'),
+                                            ('id2', 'b')]
+        self.assertEqual([{'name': 'a'}, {'name': 'b'}],
+                         self.mixin._get_plain_collection(query, FakeModel,
+                                                          ['name']))
+        query.with_entities.assert_called_once_with('id', 'name')
@@ -1114,6 +1114,30 @@ fixed_ips=ip_address%%3D%s&fixed_ips=ip_address%%3D%s&fixed_ips=subnet_id%%3D%s
             self._test_list_resources('port', [port1],
                                       query_params=query_params)
 
+    def test_get_ports_plain_fields(self):
+        plugin = manager.NeutronManager.get_plugin()
+        ctx = context.get_admin_context()
+        fields = ['id', 'mac_address', 'status']
+        with self.port(), self.port():
+            expected = [dict((field, port[field]) for field in fields)
+                        for port in plugin.get_ports(ctx)]
+            with mock.patch.object(plugin, '_make_port_dict') as make_dict:
+                self.assertEqual(expected,
+                                 plugin.get_ports(ctx, fields=fields))
+                self.assertFalse(make_dict.called)
+
+    def test_get_ports_plain_fields_filtered_by_fixed_ips(self):
+        plugin = manager.NeutronManager.get_plugin()
+        ctx = context.get_admin_context()
+        with self.subnet() as subnet:
+            fixed_ips = [{'subnet_id': subnet['subnet']['id']}] * 2
+            with self.port(subnet, fixed_ips=fixed_ips) as port:
+                ports = plugin.get_ports(
+                    ctx, filters={'fixed_ips': {
+                        'subnet_id': [subnet['subnet']['id']]}},
+                    fields=['name'])
+                self.assertEqual([{'name': port['port']['name']}], ports)
+
     def test_list_ports_public_network(self):
         with self.network(shared=True) as network:
             with self.subnet(network) as subnet:
@@ -4543,6 +4567,17 @@ class TestSubnetsV2(NeutronDbPluginV2TestCase):
                 subnets = (v1, v2, v3)
                 self._test_list_resources('subnet', subnets)
 
+    def test_get_subnets_with_fields(self):
+        plugin = manager.NeutronManager.get_plugin()
+        ctx = context.get_admin_context()
+        with self.subnet(host_routes=[{'destination': '12.0.0.0/8',
+                                       'nexthop': '10.0.0.3'}]):
+            for fields in (['id', 'cidr'], ['id', 'host_routes', 'shared']):
+                expected = [dict((field, subnet[field]) for field in fields)
+                            for subnet in plugin.get_subnets(ctx)]
+                self.assertEqual(expected,
+                                 plugin.get_subnets(ctx, fields=fields))
+
     def test_list_subnets_shared(self):
         with self.network(shared=True) as network:
             with self.subnet(network=network, cidr='10.0.0.0/24') as subnet:
@@ -15,6 +15,7 @@
 
 import mock
 
+from neutron.api.v2 import attributes
 from neutron.common import constants
 from neutron.db import ipam_backend_mixin
 from neutron.tests import base
@@ -155,3 +156,53 @@ class TestIpamBackendMixin(base.BaseTestCase):
                                                       self.owner_non_router)
         self.assertFalse(result)
         self.assertTrue(self.mixin._get_subnet.called)
+
+    def _test_allocate_ips_for_ports(self, ports, subnets):
+        self.mixin._get_subnets = mock.Mock(return_value=subnets)
+        self.mixin._allocate_ips_bulk = mock.Mock(
+            side_effect=lambda ctx, groups, count: [
+                [{'subnet_id': group[0]['id'], 'ip_address': str(i)}
+                 for group in groups] for i in range(count)])
+        return self.mixin.allocate_ips_for_ports(
+            self.ctx, [{'port': port} for port in ports])
+
+    def test_allocate_ips_for_ports(self):
+        subnets = [{'id': 'v4', 'ip_version': 4, 'ipv6_address_mode': None,
+                    'ipv6_ra_mode': None},
+                   {'id': 'v6', 'ip_version': 6, 'ipv6_address_mode': None,
+                    'ipv6_ra_mode': None}]
+        ports = [{'network_id': 'net',
+                  'fixed_ips': attributes.ATTR_NOT_SPECIFIED},
+                 {'network_id': 'net',
+                  'fixed_ips': attributes.ATTR_NOT_SPECIFIED},
+                 {'network_id': 'other-net',
+                  'fixed_ips': attributes.ATTR_NOT_SPECIFIED}]
+        result = self._test_allocate_ips_for_ports(ports, subnets)
+        self.assertEqual([[{'subnet_id': 'v4', 'ip_address': '0'},
+                           {'subnet_id': 'v6', 'ip_address': '0'}],
+                          [{'subnet_id': 'v4', 'ip_address': '1'},
+                           {'subnet_id': 'v6', 'ip_address': '1'}],
+                          None], result)
+        self.mixin._allocate_ips_bulk.assert_called_once_with(
+            self.ctx, [[subnets[0]], [subnets[1]]], 2)
+
+    def test_allocate_ips_for_ports_with_fixed_ips(self):
+        ports = [{'network_id': 'net',
+                  'fixed_ips': attributes.ATTR_NOT_SPECIFIED},
+                 {'network_id': 'net',
+                  'fixed_ips': attributes.ATTR_NOT_SPECIFIED},
+                 {'network_id': 'net',
+                  'fixed_ips': [{'ip_address': '10.0.0.2'}]}]
+        result = self._test_allocate_ips_for_ports(ports, [])
+        self.assertEqual([None, None, None], result)
+        self.assertFalse(self.mixin._allocate_ips_bulk.called)
+
+    def test_allocate_ips_for_ports_with_slaac_subnet(self):
+        subnets = [{'id': 'v6', 'ip_version': 6,
+                    'ipv6_address_mode': constants.IPV6_SLAAC,
+                    'ipv6_ra_mode': constants.IPV6_SLAAC}]
+        ports = [{'network_id': 'net',
+                  'fixed_ips': attributes.ATTR_NOT_SPECIFIED}] * 2
+        result = self._test_allocate_ips_for_ports(ports, subnets)
+        self.assertEqual([None, None], result)
+        self.assertFalse(self.mixin._allocate_ips_bulk.called)
@@ -108,6 +108,27 @@ class TestIpamNonPluggableBackend(base.BaseTestCase):
         self._validate_rebuild_availability_ranges(pools, allocations,
                                                    expected)
 
+    def test_allocate_ips_bulk(self):
+        v4_ranges = [('v4-a', {'first_ip': '10.0.0.2', 'last_ip': '10.0.0.2'}),
+                     ('v4-b', {'first_ip': '10.0.1.2', 'last_ip': '10.0.1.9'})]
+        v6_ranges = [('v6', {'first_ip': '2001::2', 'last_ip': '2001::3'})]
+        backend = non_ipam.IpamNonPluggableBackend()
+        context = mock.Mock()
+        with mock.patch.object(backend, '_lock_availability_ranges',
+                               side_effect=[v4_ranges, v6_ranges]):
+            allocations = backend._allocate_ips_bulk(
+                context, [['v4-a', 'v4-b'], ['v6']], 3)
+
+        # The v6 ranges only hold two addresses
+        self.assertEqual([[{'ip_address': '10.0.0.2', 'subnet_id': 'v4-a'},
+                           {'ip_address': '2001::2', 'subnet_id': 'v6'}],
+                          [{'ip_address': '10.0.1.2', 'subnet_id': 'v4-b'},
+                           {'ip_address': '2001::3', 'subnet_id': 'v6'}]],
+                         allocations)
+        context.session.delete.assert_has_calls(
+            [mock.call(v4_ranges[0][1]), mock.call(v6_ranges[0][1])])
+        self.assertEqual('10.0.1.3', v4_ranges[1][1]['first_ip'])
+
     def test_rebuild_ipv6_availability_ranges(self):
         pools = [{'id': 'a',
                   'first_ip': '2001::1',
@@ -27,11 +27,16 @@ from neutron.db import ipam_pluggable_backend
 from neutron.ipam import requests as ipam_req
 from neutron.tests.unit.db import test_db_base_plugin_v2 as test_db_base
 
+cfg.CONF.import_opt('ipam_allocation_window',
+                    'neutron.ipam.drivers.neutrondb_ipam.driver')
+
 
 class UseIpamMixin(object):
 
     def setUp(self):
         cfg.CONF.set_override("ipam_driver", 'internal')
+        # The tests expect the addresses to be allocated in order
+        cfg.CONF.set_override("ipam_allocation_window", 1)
         super(UseIpamMixin, self).setUp()
 
 
@@ -498,12 +503,11 @@ class TestDbBasePluginIpam(test_db_base.NeutronDbPluginV2TestCase):
                 mocks['subnet'].deallocate.assert_called_once_with(auto_ip)
 
     def test_recreate_port_ipam(self):
-        ip = '10.0.0.2'
         with self.subnet() as subnet:
             with self.port(subnet=subnet) as port:
                 ips = port['port']['fixed_ips']
                 self.assertEqual(1, len(ips))
-                self.assertEqual(ip, ips[0]['ip_address'])
+                ip = ips[0]['ip_address']
                 req = self.new_delete_request('ports', port['port']['id'])
                 res = req.get_response(self.api)
                 self.assertEqual(webob.exc.HTTPNoContent.code, res.status_int)
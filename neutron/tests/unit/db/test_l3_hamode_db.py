@@ -744,6 +744,46 @@ class L3HATestCase(L3HATestFramework):
             self.admin_ctx, self.agent1['host'], self.agent1)
         self.assertEqual('active', routers[0][constants.HA_ROUTER_STATE_KEY])
 
+    def test_set_router_states_one_update_per_state(self):
+        router_ids = []
+        for i in range(4):
+            router = self._create_router()
+            self._bind_router(router['id'])
+            router_ids.append(router['id'])
+        states = dict((router_id, 'active' if i % 2 else 'standby')
+                      for i, router_id in enumerate(router_ids))
+        bindings = self.plugin.get_ha_router_port_bindings(
+            self.admin_ctx, router_ids, host=self.agent1['host'])
+        with mock.patch.object(self.admin_ctx.session, 'query',
+                               wraps=self.admin_ctx.session.query) as query:
+            self.plugin._set_router_states(self.admin_ctx, bindings, states)
+        self.assertEqual(2, query.call_count)
+        for binding in bindings:
+            self.assertEqual(states[binding.router_id], binding.state)
+
+    def test_update_routers_states_standby_skips_ports(self):
+        router = self._create_router()
+        self._bind_router(router['id'])
+        with mock.patch.object(self.core_plugin, 'get_ports') as get_ports:
+            self.plugin.update_routers_states(
+                self.admin_ctx, {router['id']: 'standby'},
+                self.agent1['host'])
+        self.assertFalse(get_ports.called)
+
+    def test_update_routers_states_skips_ports_on_host(self):
+        router = self._create_router()
+        self._bind_router(router['id'])
+        port = {'id': 'foo', 'device_id': router['id'],
+                portbindings.HOST_ID: self.agent1['host']}
+        with mock.patch.object(self.core_plugin, 'get_ports',
+                               return_value=[port]),\
+                mock.patch.object(self.core_plugin,
+                                  'update_port') as update_port:
+            self.plugin.update_routers_states(
+                self.admin_ctx, {router['id']: 'active'},
+                self.agent1['host'])
+        self.assertFalse(update_port.called)
+
     def test_update_routers_states_port_not_found(self):
         router1 = self._create_router()
         self._bind_router(router1['id'])
@@ -0,0 +1,127 @@
+# Copyright (c) 2016 OpenStack Foundation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import time
+
+import mock
+from oslo_config import cfg
+from oslo_utils import timeutils
+from sqlalchemy import event
+from sqlalchemy.orm import session as se
+
+from neutron import context
+from neutron.db import models_v2
+from neutron.db import network_changes_db
+from neutron.tests.unit import testlib_api
+
+
+class NetworkChangesDbTestCase(testlib_api.SqlTestCase):
+
+    def setUp(self):
+        super(NetworkChangesDbTestCase, self).setUp()
+        cfg.CONF.set_override('track_network_changes', True)
+        network_changes_db.register_db_events()
+        self.addCleanup(event.remove, se.Session, 'before_flush',
+                        network_changes_db.record_changes)
+        self.ctx = context.get_admin_context()
+        with self.ctx.session.begin():
+            self.ctx.session.add(models_v2.Network(
+                id='net', tenant_id='tenant', name='net',
+                admin_state_up=True, status='ACTIVE'))
+        self.revision = time.time()
+
+    def _add_port(self, port_id):
+        with self.ctx.session.begin():
+            self.ctx.session.add(models_v2.Port(
+                id=port_id, tenant_id='tenant', network_id='net',
+                mac_address='fa:16:3e:00:00:01', admin_state_up=True,
+                status='ACTIVE', device_id='dev', device_owner='compute:a'))
+
+    def _get_changes(self):
+        return set((change.network_id, change.port_id) for change in
+                   self.ctx.session.query(network_changes_db.NetworkChange))
+
+    def test_network_change_recorded(self):
+        self.assertEqual(set([('net', None)]), self._get_changes())
+
+    def test_port_change_recorded(self):
+        self._add_port('port')
+        self.assertIn(('net', 'port'), self._get_changes())
+
+    def test_port_child_change_recorded(self):
+        self._add_port('port')
+        with self.ctx.session.begin():
+            self.ctx.session.add(models_v2.Subnet(
+                id='subnet', tenant_id='tenant', network_id='net',
+                ip_version=4, cidr='10.0.0.0/24'))
+        self._clear_changes()
+        with self.ctx.session.begin():
+            self.ctx.session.add(models_v2.IPAllocation(
+                port_id='port', ip_address='10.0.0.2', subnet_id='subnet',
+                network_id='net'))
+        self.assertEqual(set([('net', 'port')]), self._get_changes())
+
+    def _clear_changes(self):
+        with self.ctx.session.begin():
+            self.ctx.session.query(network_changes_db.NetworkChange).delete()
+
+    def test_port_status_change_ignored(self):
+        self._add_port('port')
+        self._clear_changes()
+        with self.ctx.session.begin():
+            port = self.ctx.session.query(models_v2.Port).one()
+            port.status = 'DOWN'
+        self.assertEqual(set(), self._get_changes())
+        with self.ctx.session.begin():
+            port.device_id = 'other-dev'
+        self.assertEqual(set([('net', 'port')]), self._get_changes())
+
+    def test_record_change(self):
+        self._clear_changes()
+        with self.ctx.session.begin():
+            network_changes_db.record_change(self.ctx.session, 'net')
+        self.assertEqual(set([('net', None)]), self._get_changes())
+
+    def test_get_changes_since(self):
+        self._add_port('port')
+        self.assertEqual(set([None, 'port']),
+                         network_changes_db.get_changes_since(
+                             self.ctx, 'net', self.revision))
+        self.assertEqual(set(), network_changes_db.get_changes_since(
+            self.ctx, 'other-net', self.revision))
+
+    def test_get_changes_since_expired(self):
+        revision = self.revision - cfg.CONF.network_changes_retention
+        self.assertIsNone(network_changes_db.get_changes_since(
+            self.ctx, 'net', revision))
+
+    def test_get_changes_since_not_tracked(self):
+        cfg.CONF.set_override('track_network_changes', False)
+        self.assertIsNone(network_changes_db.get_revision())
+        self.assertIsNone(network_changes_db.get_changes_since(
+            self.ctx, 'net', self.revision))
+
+    def test_get_port_ids(self):
+        self._add_port('port')
+        self.assertEqual(['port'],
+                         network_changes_db.get_port_ids(self.ctx, 'net'))
+
+    def test_purge_changes(self):
+        later = timeutils.utcnow() + datetime.timedelta(
+            seconds=cfg.CONF.network_changes_retention + 1)
+        with mock.patch.object(timeutils, 'utcnow', return_value=later):
+            network_changes_db.purge_changes(self.ctx)
+        self.assertEqual(set(), self._get_changes())
@@ -15,6 +15,7 @@
 
 import mock
 import netaddr
+from oslo_config import cfg
 
 from neutron.api.v2 import attributes
 from neutron.common import constants
@@ -29,10 +30,6 @@ from neutron.tests.unit.db import test_db_base_plugin_v2 as test_db_plugin
 from neutron.tests.unit import testlib_api
 
 
-def convert_firstip_to_ipaddress(range_item):
-    return netaddr.IPAddress(range_item['first_ip'])
-
-
 class TestNeutronDbIpamMixin(object):
 
     def _create_network(self, plugin, ctx, shared=False):
@@ -280,74 +277,20 @@ class TestNeutronDbIpamSubnet(testlib_api.SqlTestCase,
                           self.ctx.session,
                           '10.0.0.0')
 
-    def test__allocate_specific_ip(self):
-        cidr = '10.0.0.0/24'
-        ipam_subnet = self._create_and_allocate_ipam_subnet(cidr)[0]
-        with self.ctx.session.begin():
-            ranges = ipam_subnet._allocate_specific_ip(
-                self.ctx.session, '10.0.0.33')
-        self.assertEqual(2, len(ranges))
-        # 10.0.0.1 should be allocated for gateway ip
-        ranges.sort(key=convert_firstip_to_ipaddress)
-        self.assertEqual('10.0.0.2', ranges[0]['first_ip'])
-        self.assertEqual('10.0.0.32', ranges[0]['last_ip'])
-        self.assertEqual('10.0.0.34', ranges[1]['first_ip'])
-        self.assertEqual('10.0.0.254', ranges[1]['last_ip'])
-        # Limit test - first address in range
-        ranges = ipam_subnet._allocate_specific_ip(
-            self.ctx.session, '10.0.0.2')
-        self.assertEqual(2, len(ranges))
-        ranges.sort(key=convert_firstip_to_ipaddress)
-        self.assertEqual('10.0.0.3', ranges[0]['first_ip'])
-        self.assertEqual('10.0.0.32', ranges[0]['last_ip'])
-        self.assertEqual('10.0.0.34', ranges[1]['first_ip'])
-        self.assertEqual('10.0.0.254', ranges[1]['last_ip'])
-        # Limit test - last address in range
-        ranges = ipam_subnet._allocate_specific_ip(
-            self.ctx.session, '10.0.0.254')
-        self.assertEqual(2, len(ranges))
-        ranges.sort(key=convert_firstip_to_ipaddress)
-        self.assertEqual('10.0.0.3', ranges[0]['first_ip'])
-        self.assertEqual('10.0.0.32', ranges[0]['last_ip'])
-        self.assertEqual('10.0.0.34', ranges[1]['first_ip'])
-        self.assertEqual('10.0.0.253', ranges[1]['last_ip'])
-
-    def test__allocate_specific_ips_multiple_ranges(self):
+    def test__get_free_ips(self):
         cidr = '10.0.0.0/24'
         ipam_subnet = self._create_and_allocate_ipam_subnet(
             cidr,
             allocation_pools=[{'start': '10.0.0.10', 'end': '10.0.0.19'},
                               {'start': '10.0.0.30', 'end': '10.0.0.39'}])[0]
-        with self.ctx.session.begin():
-            ranges = ipam_subnet._allocate_specific_ip(
-                self.ctx.session, '10.0.0.33')
-        self.assertEqual(3, len(ranges))
-        # 10.0.0.1 should be allocated for gateway ip
-        ranges.sort(key=convert_firstip_to_ipaddress)
-        self.assertEqual('10.0.0.10', ranges[0]['first_ip'])
-        self.assertEqual('10.0.0.19', ranges[0]['last_ip'])
-        self.assertEqual('10.0.0.30', ranges[1]['first_ip'])
-        self.assertEqual('10.0.0.32', ranges[1]['last_ip'])
-        self.assertEqual('10.0.0.34', ranges[2]['first_ip'])
-        self.assertEqual('10.0.0.39', ranges[2]['last_ip'])
-
-    def test__allocate_specific_ip_out_of_range(self):
-        cidr = '10.0.0.0/24'
-        subnet = self._create_subnet(
-            self.plugin, self.ctx, self.net_id, cidr)
-        subnet_req = ipam_req.SpecificSubnetRequest(
-            'tenant_id', subnet['id'], cidr, gateway_ip=subnet['gateway_ip'])
-        ipam_subnet = self.ipam_pool.allocate_subnet(subnet_req)
-        with self.ctx.session.begin():
-            ranges = ipam_subnet._allocate_specific_ip(
-                self.ctx.session, '192.168.0.1')
-        # In this case _allocate_specific_ips does not fail, but
-        # simply does not update availability ranges at all
-        self.assertEqual(1, len(ranges))
-        # 10.0.0.1 should be allocated for gateway ip
-        ranges.sort(key=convert_firstip_to_ipaddress)
-        self.assertEqual('10.0.0.2', ranges[0]['first_ip'])
-        self.assertEqual('10.0.0.254', ranges[0]['last_ip'])
+        ipam_subnet.allocate(ipam_req.SpecificAddressRequest('10.0.0.33'))
+        free_ips = ipam_subnet._get_free_ips(self.ctx.session,
+                                             excluded_ips=['10.0.0.10'])
+        self.assertEqual(18, free_ips.size)
+        self.assertEqual(netaddr.IPAddress('10.0.0.11'), free_ips[0])
+        self.assertEqual(netaddr.IPAddress('10.0.0.30'), free_ips[9])
+        self.assertEqual(netaddr.IPAddress('10.0.0.34'), free_ips[12])
+        self.assertEqual(netaddr.IPAddress('10.0.0.39'), free_ips[17])
 
     def _allocate_address(self, cidr, ip_version, address_request):
         ipam_subnet = self._create_and_allocate_ipam_subnet(
@@ -357,18 +300,24 @@ class TestNeutronDbIpamSubnet(testlib_api.SqlTestCase,
     def test_allocate_any_v4_address_succeeds(self):
         ip_address = self._allocate_address(
             '10.0.0.0/24', 4, ipam_req.AnyAddressRequest)
-        # As the DB IPAM driver allocation logic is strictly sequential, we can
-        # expect this test to allocate the .2 address as .1 is used by default
-        # as subnet gateway
-        self.assertEqual('10.0.0.2', ip_address)
+        self.assertIn(netaddr.IPAddress(ip_address),
+                      netaddr.IPRange('10.0.0.2', '10.0.0.254'))
 
     def test_allocate_any_v6_address_succeeds(self):
         ip_address = self._allocate_address(
             'fde3:abcd:4321:1::/64', 6, ipam_req.AnyAddressRequest)
-        # As the DB IPAM driver allocation logic is strictly sequential, we can
-        # expect this test to allocate the .2 address as .1 is used by default
-        # as subnet gateway
-        self.assertEqual('fde3:abcd:4321:1::2', ip_address)
+        self.assertIn(netaddr.IPAddress(ip_address),
+                      netaddr.IPNetwork('fde3:abcd:4321:1::/64'))
+        self.assertNotEqual('fde3:abcd:4321:1::1', ip_address)
+
+    def test_allocate_any_address_in_order(self):
+        cfg.CONF.set_override('ipam_allocation_window', 1)
+        # As the allocation window is 1, the DB IPAM driver allocation logic
+        # is strictly sequential, we can expect this test to allocate the .2
+        # address as .1 is used by default as subnet gateway
+        ip_address = self._allocate_address(
+            '10.0.0.0/24', 4, ipam_req.AnyAddressRequest)
+        self.assertEqual('10.0.0.2', ip_address)
 
     def test_allocate_specific_v4_address_succeeds(self):
         ip_address = self._allocate_address(
@@ -404,7 +353,6 @@ class TestNeutronDbIpamSubnet(testlib_api.SqlTestCase,
                           addr_req)
 
     def test_allocate_any_address_exhausted_pools_fails(self):
-        # Same as above, the ranges will be recalculated always
         ipam_subnet = self._create_and_allocate_ipam_subnet(
             '192.168.0.0/30', ip_version=4)[0]
         ipam_subnet.allocate(ipam_req.AnyAddressRequest)
@@ -413,6 +361,28 @@ class TestNeutronDbIpamSubnet(testlib_api.SqlTestCase,
                           ipam_subnet.allocate,
                           ipam_req.AnyAddressRequest)
 
+    def test_bulk_allocate_addresses(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '192.168.0.0/29', ip_version=4)[0]
+        ip_addresses = ipam_subnet.bulk_allocate(
+            ipam_req.BulkAddressRequest(3))
+        self.assertEqual(3, len(set(ip_addresses)))
+        ip_addresses.append(ipam_subnet.allocate(ipam_req.AnyAddressRequest))
+        self.assertEqual(4, len(set(ip_addresses)))
+        for ip_address in ip_addresses:
+            self.assertIn(netaddr.IPAddress(ip_address),
+                          netaddr.IPRange('192.168.0.2', '192.168.0.6'))
+
+    def test_bulk_allocate_addresses_exhausted_pools_fails(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '192.168.0.0/29', ip_version=4)[0]
+        self.assertRaises(ipam_exc.IpAddressGenerationFailure,
+                          ipam_subnet.bulk_allocate,
+                          ipam_req.BulkAddressRequest(6))
+        # A failed bulk request does not consume any address
+        self.assertEqual(5, len(ipam_subnet.bulk_allocate(
+            ipam_req.BulkAddressRequest(5))))
+
     def _test_deallocate_address(self, cidr, ip_version):
         ipam_subnet = self._create_and_allocate_ipam_subnet(
             cidr, ip_version=ip_version)[0]
@@ -434,9 +404,57 @@ class TestNeutronDbIpamSubnet(testlib_api.SqlTestCase,
         self.assertRaises(ipam_exc.IpAddressAllocationNotFound,
                           ipam_subnet.deallocate, '10.0.0.2')
 
-    def test_allocate_all_pool_addresses_triggers_range_recalculation(self):
-        # This test instead might be made to pass, but for the wrong reasons!
-        pass
+    def test_allocate_deallocated_address(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '192.168.0.0/30', ip_version=4)[0]
+        ip_address = ipam_subnet.allocate(ipam_req.AnyAddressRequest)
+        ipam_subnet.deallocate(ip_address)
+        self.assertEqual(ip_address,
+                         ipam_subnet.allocate(ipam_req.AnyAddressRequest))
+
+    def test_allocate_address_probes_window(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '10.0.0.0/24', ip_version=4,
+            allocation_pools=[{'start': '10.0.0.10', 'end': '10.0.0.19'},
+                              {'start': '10.0.0.30', 'end': '10.0.0.39'}])[0]
+        subnet_manager = ipam_subnet.subnet_manager
+        with mock.patch.object(driver.random, 'randrange',
+                               return_value=13) as randrange,\
+                mock.patch.object(
+                    subnet_manager, 'list_allocated_ips',
+                    wraps=subnet_manager.list_allocated_ips) as probe,\
+                mock.patch.object(subnet_manager,
+                                  'list_allocations') as list_all:
+            ip_address = ipam_subnet.allocate(ipam_req.AnyAddressRequest)
+        self.assertEqual(cfg.CONF.ipam_allocation_window,
+                         randrange.call_count)
+        randrange.assert_called_with(20)
+        probe.assert_called_once_with(self.ctx.session, ['10.0.0.33'])
+        self.assertFalse(list_all.called)
+        self.assertEqual('10.0.0.33', ip_address)
+
+    def test_allocate_address_probed_allocated_falls_back(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '10.0.0.0/24', ip_version=4)[0]
+        ipam_subnet.allocate(ipam_req.SpecificAddressRequest('10.0.0.5'))
+        with mock.patch.object(driver.random, 'randrange',
+                               return_value=3) as randrange:
+            ip_address = ipam_subnet.allocate(ipam_req.AnyAddressRequest)
+        # The probed address is allocated, the fourth free address of the
+        # first ipam_allocation_window ones is picked instead
+        randrange.assert_called_with(cfg.CONF.ipam_allocation_window)
+        self.assertEqual('10.0.0.6', ip_address)
+
+    def test_allocate_address_concurrently_allocated_retries(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '10.0.0.0/24', ip_version=4)[0]
+        with mock.patch.object(ipam_subnet, '_claim_ips',
+                               side_effect=[False, True]) as claim:
+            ip_address = ipam_subnet.allocate(ipam_req.AnyAddressRequest)
+        self.assertEqual(2, claim.call_count)
+        first_ips = claim.call_args_list[0][0][1]
+        self.assertEqual([ip_address], claim.call_args_list[1][0][1])
+        self.assertNotIn(ip_address, first_ips)
 
     def test_allocate_subnet_for_non_existent_subnet_pass(self):
         # This test should pass because ipam subnet is no longer
@@ -446,17 +464,21 @@ class TestNeutronDbIpamSubnet(testlib_api.SqlTestCase,
             'tenant_id', 'meh', '192.168.0.0/24')
         self.ipam_pool.allocate_subnet(subnet_req)
 
-    def test__allocate_specific_ip_raises_exception(self):
-        cidr = '10.0.0.0/24'
-        ip = '10.0.0.15'
-        ipam_subnet = self._create_and_allocate_ipam_subnet(cidr)[0]
-        ipam_subnet.subnet_manager = mock.Mock()
-        ipam_subnet.subnet_manager.list_ranges_by_subnet_id.return_value = [{
-            'first_ip': '10.0.0.15', 'last_ip': '10.0.0.15'}]
-        ipam_subnet.subnet_manager.delete_range.return_value = 0
+    def test_allocate_address_concurrently_allocated_fails(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '10.0.0.0/24', ip_version=4)[0]
 
         @ndb_api.retry_db_errors
         def go():
-            ipam_subnet._allocate_specific_ip(self.ctx.session, ip)
+            ipam_subnet.allocate(ipam_req.AnyAddressRequest)
+
+        with mock.patch.object(ipam_subnet, '_claim_ips', return_value=False):
+            self.assertRaises(ipam_exc.IPAllocationFailed, go)
 
-        self.assertRaises(ipam_exc.IPAllocationFailed, go)
+    def test_allocate_specific_address_concurrently_allocated_fails(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '10.0.0.0/24', ip_version=4)[0]
+        with mock.patch.object(ipam_subnet, '_claim_ips', return_value=False):
+            self.assertRaises(ipam_exc.IpAddressAlreadyAllocated,
+                              ipam_subnet.allocate,
+                              ipam_req.SpecificAddressRequest('10.0.0.33'))
@@ -23,6 +23,7 @@ from neutron.api.v2 import attributes
 from neutron.common import constants
 from neutron.common import exceptions as n_exc
 from neutron import context
+from neutron.db import subnetpool_index_db
 from neutron.ipam import requests as ipam_req
 from neutron.ipam import subnet_alloc
 from neutron import manager
@@ -171,7 +172,7 @@ class TestSubnetAllocation(testlib_api.SqlTestCase):
                                       ['10.1.0.0/16', '192.168.1.0/24'],
                                       21, 4)
         sa = subnet_alloc.SubnetAllocator(sp, self.ctx)
-        value = sa._allocations_used_by_tenant(32)
+        value = sa._allocations_used_by_tenant(self._tenant_id)
         self.assertEqual(0, value)
 
     def test_subnetpool_default_quota_exceeded(self):
@@ -198,3 +199,102 @@ class TestSubnetAllocation(testlib_api.SqlTestCase):
                                          'fe80::/63')
         with mock.patch("sqlalchemy.orm.query.Query.update", return_value=0):
             self.assertRaises(db_exc.RetryRequest, sa.allocate_subnet, req)
+
+    def _allocate_subnet(self, sp_id, request):
+        with self.ctx.session.begin(subtransactions=True):
+            sp = self.plugin._get_subnetpool(self.ctx, sp_id)
+            sa = subnet_alloc.SubnetAllocator(sp, self.ctx)
+            return str(sa.allocate_subnet(request).get_details().subnet_cidr)
+
+    def _create_pool_subnet(self, sp_id, prefixlen):
+        network = self.plugin.create_network(self.ctx, {'network': {
+            'name': 'net', 'tenant_id': self._tenant_id,
+            'admin_state_up': True, 'shared': False}})
+        subnet = {'subnet': {'network_id': network['id'],
+                             'tenant_id': self._tenant_id,
+                             'subnetpool_id': sp_id,
+                             'prefixlen': prefixlen,
+                             'ip_version': 4,
+                             'name': 'subnet',
+                             'cidr': attributes.ATTR_NOT_SPECIFIED,
+                             'gateway_ip': attributes.ATTR_NOT_SPECIFIED,
+                             'allocation_pools':
+                                 attributes.ATTR_NOT_SPECIFIED,
+                             'dns_nameservers': attributes.ATTR_NOT_SPECIFIED,
+                             'host_routes': attributes.ATTR_NOT_SPECIFIED,
+                             'ipv6_address_mode':
+                                 attributes.ATTR_NOT_SPECIFIED,
+                             'ipv6_ra_mode': attributes.ATTR_NOT_SPECIFIED,
+                             'enable_dhcp': False}}
+        return self.plugin.create_subnet(self.ctx, subnet)
+
+    def _get_free_prefixes(self, sp_id):
+        query = self.ctx.session.query(
+            subnetpool_index_db.SubnetPoolFreePrefix.cidr)
+        return set(row.cidr for row in query.filter_by(subnetpool_id=sp_id))
+
+    def _get_usage(self, sp_id):
+        sp = self.plugin._get_subnetpool(self.ctx, sp_id)
+        sa = subnet_alloc.SubnetAllocator(sp, self.ctx)
+        return sa._allocations_used_by_tenant(self._tenant_id)
+
+    def test_allocate_any_subnet_splits_free_prefix(self):
+        sp = self._create_subnet_pool(self.plugin, self.ctx, 'test-sp',
+                                      ['10.1.0.0/22'], 21, 4)
+        req = ipam_req.AnySubnetRequest(self._tenant_id,
+                                        uuidutils.generate_uuid(),
+                                        constants.IPv4, 24)
+        self.assertEqual('10.1.0.0/24', self._allocate_subnet(sp['id'], req))
+        self.assertEqual(set(['10.1.1.0/24', '10.1.2.0/23']),
+                         self._get_free_prefixes(sp['id']))
+        self.assertEqual('10.1.1.0/24', self._allocate_subnet(sp['id'], req))
+        self.assertEqual(set(['10.1.2.0/23']),
+                         self._get_free_prefixes(sp['id']))
+        self.assertEqual(512, self._get_usage(sp['id']))
+
+    def test_allocate_specific_subnet_splits_free_prefix(self):
+        sp = self._create_subnet_pool(self.plugin, self.ctx, 'test-sp',
+                                      ['10.1.0.0/22'], 21, 4)
+        req = ipam_req.SpecificSubnetRequest(self._tenant_id,
+                                             uuidutils.generate_uuid(),
+                                             '10.1.2.0/24')
+        self.assertEqual('10.1.2.0/24', self._allocate_subnet(sp['id'], req))
+        self.assertEqual(set(['10.1.0.0/23', '10.1.3.0/24']),
+                         self._get_free_prefixes(sp['id']))
+        self.assertRaises(n_exc.SubnetAllocationError,
+                          self._allocate_subnet, sp['id'], req)
+
+    def test_index_built_from_existing_subnets(self):
+        sp = self._create_subnet_pool(self.plugin, self.ctx, 'test-sp',
+                                      ['10.1.0.0/22'], 21, 4)
+        subnet = self._create_pool_subnet(sp['id'], 24)
+        subnetpool_index_db.invalidate_index(self.ctx, sp['id'])
+        req = ipam_req.AnySubnetRequest(self._tenant_id,
+                                        uuidutils.generate_uuid(),
+                                        constants.IPv4, 24)
+        cidr = self._allocate_subnet(sp['id'], req)
+        self.assertNotEqual(subnet['cidr'], cidr)
+        self.assertEqual(512, self._get_usage(sp['id']))
+
+    def test_delete_subnet_merges_free_prefixes(self):
+        sp = self._create_subnet_pool(self.plugin, self.ctx, 'test-sp',
+                                      ['10.1.0.0/22'], 21, 4)
+        subnet = self._create_pool_subnet(sp['id'], 24)
+        self.assertEqual(set(['10.1.1.0/24', '10.1.2.0/23']),
+                         self._get_free_prefixes(sp['id']))
+        self.plugin.delete_subnet(self.ctx, subnet['id'])
+        self.assertEqual(set(['10.1.0.0/22']),
+                         self._get_free_prefixes(sp['id']))
+        self.assertEqual(0, self._get_usage(sp['id']))
+
+    def test_update_subnetpool_prefixes_invalidates_index(self):
+        sp = self._create_subnet_pool(self.plugin, self.ctx, 'test-sp',
+                                      ['10.1.0.0/24'], 21, 4)
+        req = ipam_req.AnySubnetRequest(self._tenant_id,
+                                        uuidutils.generate_uuid(),
+                                        constants.IPv4, 24)
+        self._create_pool_subnet(sp['id'], 24)
+        self.plugin.update_subnetpool(self.ctx, sp['id'], {'subnetpool': {
+            'prefixes': ['10.1.0.0/24', '10.2.0.0/24']}})
+        self.assertEqual(set(), self._get_free_prefixes(sp['id']))
+        self.assertEqual('10.2.0.0/24', self._allocate_subnet(sp['id'], req))
@@ -87,3 +87,25 @@ class TestIpamUtils(base.BaseTestCase):
         cidr = '::/64'
         expected = [netaddr.IPRange('::1', '::FFFF:FFFF:FFFF:FFFF')]
         self.assertEqual(expected, utils.generate_pools(cidr, None))
+
+    def test_free_ip_intervals(self):
+        pools = [netaddr.IPRange('1.1.1.10', '1.1.1.12'),
+                 netaddr.IPRange('1.1.1.2', '1.1.1.5')]
+        allocated = ['1.1.1.3', '1.1.1.10', '1.1.1.11', '1.1.1.100']
+        free_ips = utils.FreeIPIntervals(pools, allocated, 4)
+        self.assertEqual(4, free_ips.size)
+        self.assertEqual([netaddr.IPAddress('1.1.1.2'),
+                          netaddr.IPAddress('1.1.1.4'),
+                          netaddr.IPAddress('1.1.1.5'),
+                          netaddr.IPAddress('1.1.1.12')],
+                         [free_ips[i] for i in range(free_ips.size)])
+        self.assertRaises(IndexError, free_ips.__getitem__, 4)
+
+    def test_free_ip_intervals_v6_large_pool(self):
+        pools = [netaddr.IPRange('::1', '::FFFF:FFFF:FFFF:FFFF')]
+        free_ips = utils.FreeIPIntervals(pools, ['::1', '::3'], 6)
+        self.assertEqual(2 ** 64 - 3, free_ips.size)
+        self.assertEqual(netaddr.IPAddress('::2'), free_ips[0])
+        self.assertEqual(netaddr.IPAddress('::4'), free_ips[1])
+        self.assertEqual(netaddr.IPAddress('::FFFF:FFFF:FFFF:FFFF'),
+                         free_ips[free_ips.size - 1])
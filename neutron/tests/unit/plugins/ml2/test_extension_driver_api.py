@@ -150,6 +150,18 @@ class ExtensionDriverTestCase(test_plugin.Ml2PluginV2TestCase):
             self.assertTrue(ext_update_net.called)
             self.assertTrue(ext_net_dict.called)
 
+    def test_extend_network_dicts(self):
+        driver = self._plugin.extension_manager.ordered_ext_drivers[0].obj
+        with self.network(), self.network():
+            with mock.patch.object(driver,
+                                   'extend_network_dict') as ext_net_dict,\
+                    mock.patch.object(
+                        driver, 'extend_network_dicts',
+                        wraps=driver.extend_network_dicts) as ext_net_dicts:
+                self._plugin.get_networks(self._ctxt)
+            self.assertEqual(1, ext_net_dicts.call_count)
+            self.assertEqual(2, ext_net_dict.call_count)
+
     def test_extend_subnet_dict(self):
         with mock.patch.object(ext_test.TestExtensionDriver,
                                'process_update_subnet') as ext_update_subnet,\
@@ -316,6 +316,27 @@ class TestMl2NetworksV2(test_plugin.TestNetworksV2,
         for expected, actual in zip(expected_segments, segments):
             self.assertEqual(expected, actual)
 
+    def test_list_networks_with_provider_filters(self):
+        self._create_and_verify_networks(self.nets)
+        plugin = manager.NeutronManager.get_plugin()
+        ctx = context.get_admin_context()
+        filters = {pnet.PHYSICAL_NETWORK: ['physnet2'],
+                   pnet.SEGMENTATION_ID: [1, 220]}
+        networks = plugin.get_networks(ctx, filters=filters,
+                                       sorts=[('name', True)])
+        self.assertEqual(['net3', 'net4'], [n['name'] for n in networks])
+        self.assertEqual(2, plugin.get_networks_count(ctx, filters=filters))
+
+    def test_list_networks_with_provider_filters_paginated(self):
+        self._create_and_verify_networks(self.nets)
+        plugin = manager.NeutronManager.get_plugin()
+        ctx = context.get_admin_context()
+        # net1 sorts first but does not match
+        networks = plugin.get_networks(
+            ctx, filters={pnet.PHYSICAL_NETWORK: ['physnet2']},
+            fields=['name'], sorts=[('name', True)], limit=2)
+        self.assertEqual([{'name': 'net2'}, {'name': 'net3'}], networks)
+
     def test_create_network_segment_allocation_fails(self):
         plugin = manager.NeutronManager.get_plugin()
         with mock.patch.object(
@@ -592,6 +613,22 @@ class TestMl2PortsV2(test_plugin.TestPortsV2, Ml2PluginV2TestCase):
                 self._validate_behavior_on_bulk_failure(
                     res, 'ports', webob.exc.HTTPServerError.code)
 
+    def test_create_ports_bulk_allocates_ips_in_bulk(self):
+        ctx = context.get_admin_context()
+        plugin = manager.NeutronManager.get_plugin()
+        with self.network() as net, self.subnet(network=net) as subnet,\
+                mock.patch.object(plugin.ipam,
+                                  '_allocate_ips_for_port') as allocate:
+            res = self._create_port_bulk(self.fmt, 3, net['network']['id'],
+                                         'test', True, context=ctx)
+            ports = self.deserialize(self.fmt, res)['ports']
+            self.assertFalse(allocate.called)
+            ips = [port['fixed_ips'] for port in ports]
+            for ip_address, fixed_ips in zip(['10.0.0.2', '10.0.0.3',
+                                              '10.0.0.4'], ips):
+                self.assertEqual([{'subnet_id': subnet['subnet']['id'],
+                                   'ip_address': ip_address}], fixed_ips)
+
     def test_create_ports_bulk_with_sec_grp(self):
         ctx = context.get_admin_context()
         plugin = manager.NeutronManager.get_plugin()
@@ -189,15 +189,18 @@ class TestTrackedResources(BaseTestTrackedResources):
             self.ctx, resource_name, self._tenant_id)
         self.assertEqual(expected_value, usage.dirty)
 
-    def test_create_delete_network_marks_dirty(self):
+    def _verify_usage(self, resource_name, expected_used):
+        usage = quota_db_api.get_quota_usage_by_resource_and_tenant(
+            self.ctx, resource_name, self._tenant_id)
+        self.assertEqual(expected_used, usage.used)
+        self.assertFalse(usage.dirty)
+
+    def test_create_delete_network_updates_usage(self):
         self._test_init('network')
         net = self._make_network('json', 'meh', True)['network']
-        self._verify_dirty_bit('network')
-        # Clear the dirty bit
-        quota_db_api.set_quota_usage_dirty(
-            self.ctx, 'network', self._tenant_id, dirty=False)
+        self._verify_usage('network', 1)
         self._delete('networks', net['id'])
-        self._verify_dirty_bit('network')
+        self._verify_usage('network', 0)
 
     def test_list_networks_clears_dirty(self):
         self._test_init('network')
@@ -206,16 +209,13 @@ class TestTrackedResources(BaseTestTrackedResources):
         self._list('networks', neutron_context=self.ctx)
         self._verify_dirty_bit('network', expected_value=False)
 
-    def test_create_delete_port_marks_dirty(self):
+    def test_create_delete_port_updates_usage(self):
         self._test_init('port')
         net = self._make_network('json', 'meh', True)['network']
         port = self._make_port('json', net['id'])['port']
-        self._verify_dirty_bit('port')
-        # Clear the dirty bit
-        quota_db_api.set_quota_usage_dirty(
-            self.ctx, 'port', self._tenant_id, dirty=False)
+        self._verify_usage('port', 1)
         self._delete('ports', port['id'])
-        self._verify_dirty_bit('port')
+        self._verify_usage('port', 0)
 
     def test_list_ports_clears_dirty(self):
         self._test_init('port')
@@ -225,31 +225,25 @@ class TestTrackedResources(BaseTestTrackedResources):
         self._list('ports', neutron_context=self.ctx)
         self._verify_dirty_bit('port', expected_value=False)
 
-    def test_create_delete_subnet_marks_dirty(self):
+    def test_create_delete_subnet_updates_usage(self):
         self._test_init('subnet')
         net = self._make_network('json', 'meh', True)
         subnet = self._make_subnet('json', net, '10.0.0.1',
                                    '10.0.0.0/24')['subnet']
-        self._verify_dirty_bit('subnet')
-        # Clear the dirty bit
-        quota_db_api.set_quota_usage_dirty(
-            self.ctx, 'subnet', self._tenant_id, dirty=False)
+        self._verify_usage('subnet', 1)
         self._delete('subnets', subnet['id'])
-        self._verify_dirty_bit('subnet')
+        self._verify_usage('subnet', 0)
 
-    def test_create_delete_network_with_subnet_marks_dirty(self):
+    def test_create_delete_network_with_subnet_updates_usage(self):
         self._test_init('network')
         self._test_init('subnet')
         net = self._make_network('json', 'meh', True)
         self._make_subnet('json', net, '10.0.0.1',
                           '10.0.0.0/24')['subnet']
-        self._verify_dirty_bit('subnet')
-        # Clear the dirty bit
-        quota_db_api.set_quota_usage_dirty(
-            self.ctx, 'subnet', self._tenant_id, dirty=False)
+        self._verify_usage('subnet', 1)
         self._delete('networks', net['network']['id'])
-        self._verify_dirty_bit('network')
-        self._verify_dirty_bit('subnet')
+        self._verify_usage('network', 0)
+        self._verify_usage('subnet', 0)
 
     def test_list_subnets_clears_dirty(self):
         self._test_init('subnet')
@@ -260,17 +254,14 @@ class TestTrackedResources(BaseTestTrackedResources):
         self._list('subnets', neutron_context=self.ctx)
         self._verify_dirty_bit('subnet', expected_value=False)
 
-    def test_create_delete_subnetpool_marks_dirty(self):
+    def test_create_delete_subnetpool_updates_usage(self):
         self._test_init('subnetpool')
         pool = self._make_subnetpool('json', ['10.0.0.0/8'],
                                      name='meh',
                                      tenant_id=self._tenant_id)['subnetpool']
-        self._verify_dirty_bit('subnetpool')
-        # Clear the dirty bit
-        quota_db_api.set_quota_usage_dirty(
-            self.ctx, 'subnetpool', self._tenant_id, dirty=False)
+        self._verify_usage('subnetpool', 1)
         self._delete('subnetpools', pool['id'])
-        self._verify_dirty_bit('subnetpool')
+        self._verify_usage('subnetpool', 0)
 
     def test_list_subnetpools_clears_dirty(self):
         self._test_init('subnetpool')
@@ -281,16 +272,13 @@ class TestTrackedResources(BaseTestTrackedResources):
         self._list('subnetpools', neutron_context=self.ctx)
         self._verify_dirty_bit('subnetpool', expected_value=False)
 
-    def test_create_delete_securitygroup_marks_dirty(self):
+    def test_create_delete_securitygroup_updates_usage(self):
         self._test_init('security_group')
         sec_group = self._make_security_group(
             'json', 'meh', 'meh', tenant_id=self._tenant_id)['security_group']
-        self._verify_dirty_bit('security_group')
-        # Clear the dirty bit
-        quota_db_api.set_quota_usage_dirty(
-            self.ctx, 'security_group', self._tenant_id, dirty=False)
+        self._verify_usage('security_group', 1)
         self._delete('security-groups', sec_group['id'])
-        self._verify_dirty_bit('security_group')
+        self._verify_usage('security_group', 0)
 
     def test_list_securitygroups_clears_dirty(self):
         self._test_init('security_group')
@@ -300,7 +288,7 @@ class TestTrackedResources(BaseTestTrackedResources):
         self._list('security-groups', neutron_context=self.ctx)
         self._verify_dirty_bit('security_group', expected_value=False)
 
-    def test_create_delete_securitygrouprule_marks_dirty(self):
+    def test_create_delete_securitygrouprule_updates_usage(self):
         self._test_init('security_group_rule')
         sec_group = self._make_security_group(
             'json', 'meh', 'meh', tenant_id=self._tenant_id)['security_group']
@@ -308,12 +296,10 @@ class TestTrackedResources(BaseTestTrackedResources):
             sec_group['id'], 'ingress', 'TCP', tenant_id=self._tenant_id)
         sec_group_rule = self._make_security_group_rule(
             'json', rule_req)['security_group_rule']
-        self._verify_dirty_bit('security_group_rule')
-        # Clear the dirty bit
-        quota_db_api.set_quota_usage_dirty(
-            self.ctx, 'security_group_rule', self._tenant_id, dirty=False)
+        # The security group was created with 2 rules
+        self._verify_usage('security_group_rule', 3)
         self._delete('security-group-rules', sec_group_rule['id'])
-        self._verify_dirty_bit('security_group_rule')
+        self._verify_usage('security_group_rule', 2)
 
     def test_list_securitygrouprules_clears_dirty(self):
         self._test_init('security_group_rule')
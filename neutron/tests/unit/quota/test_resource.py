@@ -112,17 +112,33 @@ class TestTrackedResource(testlib_api.SqlTestCaseLight):
         self._register_events(res)
         return res
 
-    def test_count_first_call_with_dirty_false(self):
+    def test_count_trusts_usage_updated_in_transaction(self):
         quota_api.set_quota_usage(
             self.context, self.resource, self.tenant_id, in_use=1)
         res = self._create_resource()
         self._add_data()
-        # explicitly set dirty flag to False
-        quota_api.set_all_quota_usage_dirty(
-            self.context, self.resource, dirty=False)
-        # Expect correct count to be returned anyway since the first call to
-        # count() always resyncs with the db
-        self.assertEqual(2, res.count(self.context, None, self.tenant_id))
+        # The usage counter was incremented when the data were added, and
+        # is trusted without counting the data again
+        self.assertNotIn(self.tenant_id, res._dirty_tenants)
+        self.assertEqual(3, res.count(self.context, None, self.tenant_id))
+
+    def test_delete_data_updates_usage(self):
+        res = self._create_resource()
+        quota_api.set_quota_usage(
+            self.context, res.name, self.tenant_id, in_use=0)
+        self._add_data()
+        self._delete_data()
+        usage_info = quota_api.get_quota_usage_by_resource_and_tenant(
+            self.context, res.name, self.tenant_id)
+        self.assertEqual(0, usage_info.used)
+        self.assertFalse(usage_info.dirty)
+        self.assertNotIn(self.tenant_id, res._dirty_tenants)
+
+    def test_count_includes_reserved(self):
+        res = self._test_count()
+        quota_api.create_reservation(
+            self.context, self.tenant_id, {res.name: 2})
+        self.assertEqual(4, res.count(self.context, None, self.tenant_id))
 
     def _test_count(self):
         res = self._create_resource()
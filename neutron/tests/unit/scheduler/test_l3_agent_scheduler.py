@@ -36,11 +36,13 @@ from neutron.db import l3_dvr_ha_scheduler_db
 from neutron.db import l3_dvrscheduler_db
 from neutron.db import l3_hamode_db
 from neutron.db import l3_hascheduler_db
+from neutron.db import models_v2
 from neutron.extensions import l3
 from neutron.extensions import l3_ext_ha_mode as l3_ha
 from neutron.extensions import l3agentscheduler as l3agent
 from neutron.extensions import portbindings
 from neutron import manager
+from neutron.plugins.ml2 import models as ml2_models
 from neutron.scheduler import l3_agent_scheduler
 from neutron.tests import base
 from neutron.tests.common import helpers
@@ -1183,6 +1185,50 @@ class L3DvrSchedulerTestCase(testlib_api.SqlTestCase):
                     self.adminContext, {'r1', 'r2'}, 'host1'))
             self.assertFalse(self.dut.l3_rpc_notifier.routers_updated.called)
 
+    def _create_dvr_ports(self):
+        session = self.adminContext.session
+        with session.begin():
+            session.add(models_v2.Network(id='net', tenant_id='tenant',
+                                          name='net', admin_state_up=True,
+                                          status='ACTIVE'))
+            session.add(models_v2.Subnet(id='subnet', tenant_id='tenant',
+                                         network_id='net', ip_version=4,
+                                         cidr='10.0.0.0/24'))
+        ports = [('rtr-port', 'r1', constants.DEVICE_OWNER_DVR_INTERFACE,
+                  '10.0.0.1', None),
+                 ('vm-port', 'vm', DEVICE_OWNER_COMPUTE, '10.0.0.2',
+                  'vm-host')]
+        for port_id, device_id, device_owner, ip_address, host in ports:
+            with session.begin():
+                session.add(models_v2.Port(
+                    id=port_id, tenant_id='tenant', network_id='net',
+                    mac_address=port_id, admin_state_up=True,
+                    status='ACTIVE', device_id=device_id,
+                    device_owner=device_owner))
+                session.add(models_v2.IPAllocation(
+                    port_id=port_id, ip_address=ip_address,
+                    subnet_id='subnet', network_id='net'))
+                if host:
+                    session.add(ml2_models.PortBinding(
+                        port_id=port_id, host=host, vif_type='ovs'))
+
+    def test__get_dvr_hosts_for_routers(self):
+        self._create_dvr_ports()
+        hosts = self.dut._get_dvr_hosts_for_routers(self.adminContext,
+                                                    ['r1', 'r2'])
+        self.assertEqual(set(['vm-host']), hosts['r1'])
+        self.assertEqual(set(), hosts['r2'])
+
+    def test__get_dvr_serviceable_subnet_ids_on_host(self):
+        self._create_dvr_ports()
+        self.assertEqual(
+            set(['subnet']),
+            self.dut._get_dvr_serviceable_subnet_ids_on_host(
+                self.adminContext, 'vm-host', ['subnet']))
+        self.assertEqual(
+            set(), self.dut._get_dvr_serviceable_subnet_ids_on_host(
+                self.adminContext, 'other-host', ['subnet']))
+
     def test_get_dvr_routers_by_subnet_ids(self):
         subnet_id = '80947d4a-fbc8-484b-9f92-623a6bfcf3e0'
         dvr_port = {
@@ -1503,6 +1549,60 @@ class L3AgentSchedulerDbMixinTestCase(L3HATestCaseMixin):
         self.assertIn(agent.id, [ha_port.l3_agent_id for ha_port in ha_ports])
 
 
+class L3BulkSchedulingTestCase(L3HATestCaseMixin):
+
+    def setUp(self):
+        super(L3BulkSchedulingTestCase, self).setUp()
+        self.plugin.router_scheduler = importutils.import_object(
+            'neutron.scheduler.l3_agent_scheduler.LeastRoutersScheduler')
+        self.router_ids = [self._create_ha_router(ha=False)['id']
+                           for i in range(4)]
+        with self.adminContext.session.begin():
+            self.adminContext.session.query(
+                l3_agentschedulers_db.RouterL3AgentBinding).delete()
+
+    def _get_loads(self):
+        return self.plugin.router_scheduler._get_agent_loads(
+            self.adminContext, [self.agent_id1, self.agent_id2])
+
+    def test_schedule_routers(self):
+        self.plugin.schedule_routers(self.adminContext, self.router_ids)
+        for router_id in self.router_ids:
+            self.assertEqual(1, len(self.plugin.get_l3_agents_hosting_routers(
+                self.adminContext, [router_id])))
+        self.assertEqual({self.agent_id1: 2, self.agent_id2: 2},
+                         self._get_loads())
+
+    def test_schedule_routers_skips_hosted_routers(self):
+        self.plugin.router_scheduler.bind_router(
+            self.adminContext, self.router_ids[0], self.agent1)
+        self.plugin.schedule_routers(self.adminContext, self.router_ids)
+        self.assertEqual([self.agent_id1],
+                         [agent.id for agent in
+                          self.plugin.get_l3_agents_hosting_routers(
+                              self.adminContext, [self.router_ids[0]])])
+        self.assertEqual({self.agent_id1: 2, self.agent_id2: 2},
+                         self._get_loads())
+
+    def test_rebalance_routers(self):
+        for router_id in self.router_ids:
+            self.plugin.router_scheduler.bind_router(
+                self.adminContext, router_id, self.agent1)
+        moves = self.plugin.rebalance_routers(self.adminContext,
+                                              dry_run=True)
+        self.assertEqual(2, len(moves))
+        for move in moves:
+            self.assertEqual(self.agent_id1, move['from_agent_id'])
+            self.assertEqual(self.agent_id2, move['to_agent_id'])
+        self.assertEqual({self.agent_id1: 4, self.agent_id2: 0},
+                         self._get_loads())
+
+        self.plugin.rebalance_routers(self.adminContext)
+        self.assertEqual({self.agent_id1: 2, self.agent_id2: 2},
+                         self._get_loads())
+        self.assertEqual([], self.plugin.rebalance_routers(self.adminContext))
+
+
 class L3HAChanceSchedulerTestCase(L3HATestCaseMixin):
 
     def test_scheduler_with_ha_enabled(self):
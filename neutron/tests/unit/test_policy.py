@@ -15,6 +15,8 @@
 
 """Test of Policy Engine For Neutron"""
 
+import os
+
 import mock
 from oslo_db import exception as db_exc
 from oslo_policy import fixture as op_fixture
@@ -55,6 +57,22 @@ class PolicyFileTestCase(base.BaseTestCase):
                           action,
                           self.target)
 
+    def test_filter_authorized_reloads_modified_policy(self):
+        tmpfilename = self.get_temp_file_path('policy')
+        with open(tmpfilename, "w") as policyfile:
+            policyfile.write("""{"get_port": ""}""")
+        policy.refresh(policy_file=tmpfilename)
+        targets = [{'tenant_id': 'fake'}, {'tenant_id': 'fake_tenant'}]
+        self.assertEqual(targets, policy.filter_authorized(
+            self.context, 'get_port', targets))
+        with open(tmpfilename, "w") as policyfile:
+            policyfile.write("""{"get_port": "tenant_id:%(tenant_id)s"}""")
+        # the modification time has to change for the file to be reloaded
+        mtime = os.path.getmtime(tmpfilename) + 1
+        os.utime(tmpfilename, (mtime, mtime))
+        self.assertEqual([targets[0]], policy.filter_authorized(
+            self.context, 'get_port', targets))
+
 
 class PolicyTestCase(base.BaseTestCase):
     def setUp(self):
@@ -105,6 +123,29 @@ class PolicyTestCase(base.BaseTestCase):
         result = policy.enforce(self.context, action, self.target)
         self.assertTrue(result)
 
+    def test_enforce_reuses_context_credentials(self):
+        with mock.patch.object(self.context, 'to_dict',
+                               wraps=self.context.to_dict) as to_dict:
+            policy.enforce(self.context, "example:allowed", self.target)
+            policy.check(self.context, "example:allowed", self.target)
+        self.assertEqual(1, to_dict.call_count)
+
+    def test_check_credentials_follow_context_changes(self):
+        action = "example:my_file"
+        target = {'tenant_id': 'other'}
+        self.assertFalse(policy.check(self.context, action, target))
+        self.context.tenant_id = 'other'
+        self.assertTrue(policy.check(self.context, action, target))
+
+    def test_build_match_rule_cached_until_reset(self):
+        action = "example:allowed"
+        match_rule = policy._build_match_rule(action, self.target, None)
+        self.assertIs(match_rule,
+                      policy._build_match_rule(action, self.target, None))
+        policy.reset()
+        self.assertIsNot(match_rule,
+                         policy._build_match_rule(action, self.target, None))
+
     def test_enforce_http_true(self):
         self.useFixture(op_fixture.HttpCheckFixture())
         action = "example:get_http"
@@ -588,6 +629,62 @@ class NeutronPolicyTestCase(base.BaseTestCase):
     def test_enforce_tenant_id_check_invalid_parent_resource_raises(self):
         self._test_enforce_tenant_id_raises('tenant_id:%(foobaz_tenant_id)s')
 
+    def _test_filter_authorized(self, context, targets, action='get_port'):
+        self.fakepolicyinit()
+        with mock.patch.object(policy._ENFORCER, 'enforce',
+                               wraps=policy._ENFORCER.enforce) as enforce:
+            result = policy.filter_authorized(context, action, targets)
+        return result, enforce.call_count
+
+    def test_filter_authorized_admin(self):
+        targets = [{'tenant_id': 'somebody_else'}]
+        result, calls = self._test_filter_authorized(
+            context.get_admin_context(), targets)
+        self.assertEqual(targets, result)
+        self.assertEqual(0, calls)
+
+    def test_filter_authorized_owner(self):
+        own = [{'id': i, 'tenant_id': 'fake'} for i in range(3)]
+        others = [{'id': i, 'tenant_id': 'somebody_else'} for i in range(3)]
+        result, calls = self._test_filter_authorized(self.context,
+                                                     own + others)
+        self.assertEqual(own, result)
+        self.assertEqual(2, calls)
+
+    def test_filter_authorized_parent_resource(self):
+        self._set_rules(get_port="rule:admin_or_network_owner")
+        targets = [{'network_id': 'net1'}, {'network_id': 'net2'},
+                   {'network_id': 'net1'}]
+        plugin = manager.NeutronManager.get_instance().plugin
+        with mock.patch.object(
+                plugin, 'get_network',
+                side_effect=lambda ctx, id, fields: {
+                    'tenant_id': 'fake' if id == 'net1' else 'other'}) as get:
+            result, calls = self._test_filter_authorized(self.context,
+                                                         targets)
+        self.assertEqual([targets[0], targets[2]], result)
+        self.assertEqual(2, get.call_count)
+        # the parent fields are not added to the targets
+        self.assertNotIn('network:tenant_id', targets[0])
+
+    def test_filter_authorized_http_check(self):
+        self._set_rules(get_port="http://somewhere/%(tenant_id)s")
+        targets = [{'tenant_id': 'fake'}, {'tenant_id': 'fake'}]
+        with mock.patch.object(policy, 'check',
+                               return_value=True) as check:
+            result, calls = self._test_filter_authorized(self.context,
+                                                         targets)
+        self.assertEqual(targets, result)
+        self.assertEqual(2, check.call_count)
+
+    def test_filter_authorized_attribute_based_action(self):
+        targets = [{'tenant_id': 'fake'}, {'tenant_id': 'fake'}]
+        with mock.patch.object(policy, 'check',
+                               return_value=True) as check:
+            self._test_filter_authorized(self.context, targets,
+                                         action='update_port')
+        self.assertEqual(2, check.call_count)
+
     def test_process_rules(self):
         action = "create_" + FAKE_RESOURCE_NAME
         # Construct RuleChecks for an action, attribute and subattribute
@@ -14,8 +14,11 @@
 #    under the License.
 
 import mock
+from oslo_config import cfg
 
+from neutron.common import rpc as n_rpc
 from neutron import service
+from neutron.tests import base
 from neutron.tests.unit import test_wsgi
 
 
@@ -25,3 +28,41 @@ class TestRpcWorker(test_wsgi.TestServiceBase):
         _plugin = mock.Mock()
         rpc_worker = service.RpcWorker(_plugin)
         self._test_reset(rpc_worker)
+
+    def test_start_restricts_consumer_topics(self):
+        self.addCleanup(n_rpc.set_consumer_topics)
+        plugin = mock.Mock()
+        plugin.start_rpc_listeners.return_value = []
+        rpc_worker = service.RpcWorker([plugin], consumer_topics=['topic'])
+        rpc_worker.start()
+        self.assertTrue(n_rpc.is_consumed_topic('topic'))
+        self.assertFalse(n_rpc.is_consumed_topic('other-topic'))
+
+
+class TestRpcWorkerPools(base.BaseTestCase):
+
+    def test_get_rpc_worker_pools(self):
+        cfg.CONF.set_override('rpc_worker_pools',
+                              ['q-l3-plugin:2:32', 'q-plugin:4'])
+        self.assertEqual([('q-l3-plugin', 2, 32), ('q-plugin', 4, None)],
+                         service._get_rpc_worker_pools())
+
+    def _test_get_rpc_worker_pools_invalid(self, pools):
+        cfg.CONF.set_override('rpc_worker_pools', pools)
+        self.assertRaises(ValueError, service._get_rpc_worker_pools)
+
+    def test_get_rpc_worker_pools_invalid_format(self):
+        self._test_get_rpc_worker_pools_invalid(['q-plugin'])
+        self._test_get_rpc_worker_pools_invalid(['q-plugin:two'])
+        self._test_get_rpc_worker_pools_invalid([':2'])
+
+    def test_get_rpc_worker_pools_invalid_workers(self):
+        self._test_get_rpc_worker_pools_invalid(['q-plugin:0'])
+        self._test_get_rpc_worker_pools_invalid(['q-plugin:2:0'])
+
+    def test_get_rpc_worker_pools_duplicate_topic(self):
+        self._test_get_rpc_worker_pools_invalid(['q-plugin:2',
+                                                 'q-plugin:4'])
+
+    def test_get_rpc_worker_pools_reports_topic(self):
+        self._test_get_rpc_worker_pools_invalid(['q-reports-plugin:2'])
@@ -537,6 +537,25 @@ class JSONDictSerializerTest(base.BaseTestCase):
 
         self.assertEqual(expected_json, result)
 
+    def test_serialize_iter(self):
+        input_dict = {'ports': [{'id': i} for i in range(5)],
+                      'ports_links': [{'rel': 'next'}]}
+        serializer = wsgi.JSONDictSerializer()
+        serializer.chunk_size = 2
+        chunks = list(serializer.serialize_iter(input_dict))
+
+        self.assertEqual(serializer.serialize(input_dict), b''.join(chunks))
+        # the five ports are serialized in three chunks
+        self.assertEqual(3, len([chunk for chunk in chunks
+                                 if b'"id"' in chunk]))
+
+    def test_serialize_iter_empty(self):
+        serializer = wsgi.JSONDictSerializer()
+        for input_dict in ({}, {'ports': []}):
+            self.assertEqual(
+                serializer.serialize(input_dict),
+                b''.join(serializer.serialize_iter(input_dict)))
+
 
 class TextDeserializerTest(base.BaseTestCase):
 
@@ -40,6 +40,7 @@ import webob.exc
 from neutron._i18n import _, _LE, _LI
 from neutron.common import config
 from neutron.common import exceptions as exception
+from neutron.common import json_backend
 from neutron import context
 from neutron.db import api
 from neutron import worker
@@ -309,6 +310,10 @@ class DictSerializer(ActionDispatcher):
     def serialize(self, data, action='default'):
         return self.dispatch(data, action=action)
 
+    def serialize_iter(self, data, action='default'):
+        """Serialize data as an iterable of body chunks."""
+        return [self.serialize(data, action=action)]
+
     def default(self, data):
         return ""
 
@@ -316,10 +321,44 @@ class DictSerializer(ActionDispatcher):
 class JSONDictSerializer(DictSerializer):
     """Default JSON request body serialization."""
 
+    # Number of list members serialized in each chunk of a streamed body
+    chunk_size = 100
+
+    @staticmethod
+    def _dumps(data):
+        return json_backend.dumps(data)
+
     def default(self, data):
-        def sanitizer(obj):
-            return six.text_type(obj)
-        return encode_body(jsonutils.dumps(data, default=sanitizer))
+        return encode_body(self._dumps(data))
+
+    def serialize_iter(self, data, action='default'):
+        """Serialize a dict of collections as a sequence of JSON chunks.
+
+        The members of the lists in data are serialized chunk_size at a
+        time, so that the body of a large collection is never built as a
+        whole. The chunks add up to the same document as serialize().
+        """
+        if action != 'default' or not isinstance(data, dict):
+            return super(JSONDictSerializer, self).serialize_iter(data,
+                                                                  action)
+        return self._iter_chunks(data)
+
+    def _iter_chunks(self, data):
+        separator = '{'
+        for key, value in six.iteritems(data):
+            yield encode_body('%s%s: ' % (separator, self._dumps(key)))
+            separator = ', '
+            if not isinstance(value, list):
+                yield encode_body(self._dumps(value))
+                continue
+            yield b'['
+            for start in six.moves.range(0, len(value), self.chunk_size):
+                chunk = self._dumps(value[start:start + self.chunk_size])
+                # strip the brackets of the chunk, they enclose all of them
+                yield encode_body('%s%s' % (', ' if start else '',
+                                            chunk[1:-1]))
+            yield b']'
+        yield b'}' if separator == ', ' else b'{}'
 
 
 class ResponseHeaderSerializer(ActionDispatcher):